@@ -1,10 +1,10 @@
 ## Antaa tiedot monellako kirkolla on osoite ja/tai koordinaatit
 import json
 import re
+from utils.exporters import load_churches
 
-# Load the JSON file
-with open("output/churches_with_coordinates.json", 'r', encoding='utf-8') as f:
-    churches = json.load(f)
+# Load the JSON file (or its faster binary export)
+churches = load_churches("output/churches_with_coordinates.json")
 
 # Initialize counters
 total_churches = len(churches)
@@ -1,5 +1,13 @@
 # Osaa ajaa useamman tiedoston kerrallaan ja käyttää CoordinateExtractor-luokkaa koordinaattien poimimiseen.
 from coordinate_extractor import CoordinateExtractor
+from utils.exporters import export_all
+from utils.logging_setup import add_logging_arguments, setup_from_args
+from utils.scheduler import Budget
+from utils.negative_cache import NegativeCache, DEFAULT_TTL_DAYS
+from utils.work_queue import WorkQueue
+from utils.http_transport import configure_transport
+from utils.profiling import add_profiling_arguments, profiling_from_args, stage
+import argparse
 import json
 import os
 
@@ -28,10 +36,46 @@ def combine_results(output_file='output/all_churches_with_coordinates.json'):
     # Save the combined results
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(all_churches, f, ensure_ascii=False, indent=4)
+    export_all(all_churches, output_file)
     
     print(f"\nCombined {len(all_churches)} churches into {output_file}")
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract coordinates for every church type and combine the results")
+    parser.add_argument('--workers', type=int, default=1, help="Pages fetched and parsed at a time")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help="Cap the parsed pages in flight to fit this RSS budget")
+    parser.add_argument('--trace-memory', action='store_true', help="Report peak memory per stage (tracemalloc)")
+    parser.add_argument('--no-canonicalize', dest='canonicalize', action='store_false',
+                        help="Do not resolve the links through the API before fetching")
+    parser.add_argument('--time-budget', type=float, default=None, metavar='SECONDS',
+                        help="Stop fetching after this long, most promising pages first")
+    parser.add_argument('--max-requests', type=int, default=None, help="Stop fetching after this many pages")
+    parser.add_argument('--prioritize', action='store_true',
+                        help="Fetch the pages most likely to give new data first even without a budget")
+    parser.add_argument('--negative-ttl', type=float, default=DEFAULT_TTL_DAYS, metavar='DAYS',
+                        help="Skip pages that gave no coordinates or address for this long, unless edited")
+    parser.add_argument('--no-negative-cache', dest='negative_cache', action='store_false',
+                        help="Fetch pages that gave no data on earlier runs as well")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stop reading each article once its coordinates or infobox have arrived")
+    parser.add_argument('--no-interlanguage', dest='interlanguage', action='store_false',
+                        help="Do not look for coordinates in the sv/en articles of churches without them")
+    parser.add_argument('--queue', metavar='PATH',
+                        help="Share the pages through this work queue with 'coordinate_extractor.py --queue-worker' processes")
+    parser.add_argument('--http2', action='store_true', help="Use HTTP/2 connections (needs httpx and h2)")
+    parser.add_argument('--lease', type=float, default=60.0, help="Seconds a claimed page stays leased without a heartbeat")
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args(argv)
+    setup_from_args(args)
+    if args.http2:
+        configure_transport(http2=True)
+    with profiling_from_args(args, 'batch'):
+        process_all(args)
+
+def process_all(args):
+    """Extract the coordinates of each church type and combine the results"""
     print("Starting Finnish Churches Batch Processing")
     print("==========================================")
     
@@ -54,20 +98,42 @@ def main():
         }
     ]
     
+    # Pages already extracted in this run, so churches on several lists are fetched once
+    shared_results = {}
+    # Interlanguage coordinates looked up in this run, shared the same way
+    shared_interlanguage = {}
+    # One budget for the whole run, shared by the three church types
+    budget = Budget(args.time_budget, args.max_requests)
+    negative_cache = NegativeCache(ttl_days=args.negative_ttl) if args.negative_cache else None
+    queue = WorkQueue(args.queue, args.lease) if args.queue else None
     for church_type in church_types:
         if os.path.exists(church_type["input"]):
             print(f"\nProcessing {church_type['name']} churches...")
             extractor = CoordinateExtractor(
                 input_file=church_type["input"],
-                output_file=church_type["output"]
+                output_file=church_type["output"],
+                workers=args.workers,
+                memory_budget_mb=args.memory_budget,
+                trace_memory=args.trace_memory,
+                canonicalize=args.canonicalize,
+                shared_results=shared_results,
+                shared_interlanguage=shared_interlanguage,
+                budget=budget,
+                prioritize=args.prioritize,
+                negative_cache=negative_cache,
+                stream=args.stream,
+                queue=queue,
+                interlanguage=args.interlanguage
             )
-            extractor.process_churches()
+            with stage(church_type["name"].lower()):
+                extractor.process_churches()
         else:
             print(f"\nSkipping {church_type['name']} churches: Input file {church_type['input']} not found.")
     
     # Combine all results
     print("\nCombining all results...")
-    combine_results()
+    with stage("combine"):
+        combine_results()
     
     print("\nBatch processing completed!")
 
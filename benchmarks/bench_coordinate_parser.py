@@ -0,0 +1,94 @@
+# Throughput and coverage of utils/coordinate_parser.py against the regexes the extractor used
+# before (two DMS searches plus dms_to_decimal, then a decimal-degrees search). The strings are
+# the coordinate texts of the synthetic Wikipedia (DMS, decimal minutes, decimal commas) and the
+# geo microformat / wgCoordinates originals, repeated up to --strings.
+# Usage: python benchmarks/bench_coordinate_parser.py [--strings 200000] [--churches 2000]
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin.wikipedia_server import SyntheticWiki, coordinate_text
+from utils.coordinate_parser import parse_coordinate, parse_many
+
+
+def legacy_dms_to_decimal(dms_str):
+    direction = dms_str[-1]
+    parts = re.findall(r'(\d+)°(\d+)′(\d+(?:\.\d+)?)″', dms_str[:-1])
+    if not parts:
+        return None
+    degrees, minutes, seconds = map(float, parts[0])
+    decimal = degrees + minutes / 60 + seconds / 3600
+    return -decimal if direction in ['S', 'W'] else decimal
+
+
+def legacy_parse(text):
+    """(lat, lon) the way methods 1-3 and 5 parsed the text before, or None"""
+    lat_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[NS])', text)
+    lon_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[EW])', text)
+    if lat_match and lon_match:
+        return legacy_dms_to_decimal(lat_match.group(1)), legacy_dms_to_decimal(lon_match.group(1))
+    decimal_match = re.search(r'(\d+\.\d+)°[NS].*?(\d+\.\d+)°[EW]', text)
+    if decimal_match:
+        return float(decimal_match.group(1)), float(decimal_match.group(2))
+    geo_match = re.match(r'([\d\.-]+);\s*([\d\.-]+)', text)
+    if geo_match:
+        return float(geo_match.group(1)), float(geo_match.group(2))
+    return None
+
+
+def sample_strings(churches, n):
+    texts, truth = [], []
+    for i, church in enumerate(churches):
+        if i % 5 == 0:
+            texts.append(f"{church['lat']}; {church['lon']}")
+        else:
+            texts.append(coordinate_text(church))
+        truth.append((church["lat"], church["lon"]))
+    repeat = -(-n // len(texts))
+    return (texts * repeat)[:n], np.array((truth * repeat)[:n])
+
+
+def accuracy(lat, lon, truth, tolerance=1e-3):
+    ok = (np.abs(lat - truth[:, 0]) <= tolerance) & (np.abs(lon - truth[:, 1]) <= tolerance)
+    return int(ok.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batch coordinate parser")
+    parser.add_argument('--strings', type=int, default=200_000)
+    parser.add_argument('--churches', type=int, default=2000)
+    args = parser.parse_args()
+
+    texts, truth = sample_strings(SyntheticWiki(args.churches).churches, args.strings)
+    print(f"{len(texts)} coordinate strings\n")
+    print(f"{'parser':<28} {'time':>8} {'strings/s':>11} {'correct':>16}")
+
+    def report(name, elapsed, lat, lon):
+        correct = accuracy(lat, lon, truth)
+        print(f"{name:<28} {elapsed:>7.2f}s {len(texts) / elapsed:>11,.0f} {correct:>8}/{len(texts)}")
+
+    start = time.perf_counter()
+    results = [legacy_parse(text) or (np.nan, np.nan) for text in texts]
+    elapsed = time.perf_counter() - start
+    report("previous regexes", elapsed, *np.array(results, dtype=float).T)
+
+    start = time.perf_counter()
+    results = [parse_coordinate(text) for text in texts]
+    elapsed = time.perf_counter() - start
+    report("parse_coordinate per string", elapsed,
+           np.array([r["lat"] if r else np.nan for r in results]), np.array([r["lon"] if r else np.nan for r in results]))
+
+    start = time.perf_counter()
+    frame = parse_many(texts)
+    elapsed = time.perf_counter() - start
+    report("parse_many (batch)", elapsed, frame["lat"].to_numpy(), frame["lon"].to_numpy())
+    print("\nFormats: " + ", ".join(f"{n} {fmt}" for fmt, n in frame["format"].value_counts().items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Times the density and coverage-gap rasters (utils/density_raster.py) on synthetic points
+# scattered over Finland, against adding one folium marker per point as the map does above the
+# overview zoom. Binning and colouring are reported apart from the boundary filter, which the
+# visualizer runs once for the markers anyway.
+# Usage: python benchmarks/bench_density_raster.py [--points 1000000] [--markers 5000]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import folium
+import numpy as np
+from folium.plugins import MarkerCluster
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.density_raster import DensityGrid, add_overlays, rasters, save_png
+
+
+def synthetic_points(n, seed=1):
+    """Points clustered around a few towns, denser in the south, plus a uniform background"""
+    rng = np.random.default_rng(seed)
+    towns = np.column_stack([rng.uniform(60.0, 66.0, 40), rng.uniform(21.5, 30.0, 40)])
+    clustered = n * 3 // 4
+    which = rng.integers(0, len(towns), clustered)
+    lat = np.concatenate([towns[which, 0] + rng.normal(0, 0.15, clustered), rng.uniform(59.8, 70.0, n - clustered)])
+    lon = np.concatenate([towns[which, 1] + rng.normal(0, 0.3, clustered), rng.uniform(20.5, 31.5, n - clustered)])
+    geocoded = rng.random(n) < 0.1
+    return lat, lon, geocoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the density rasters against per-marker rendering")
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--markers', type=int, default=5000, help="Markers to time (per-marker cost is linear)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lat, lon, geocoded = synthetic_points(args.points)
+    grid = DensityGrid()
+    grid.land  # boundary polygon and land mask are built once per grid
+
+    start = time.perf_counter()
+    inside = grid.boundary.contains(lat, lon)
+    filter_time = time.perf_counter() - start
+
+    lat, lon, geocoded = lat[inside], lon[inside], geocoded[inside]
+    best = {"rasters": float('inf'), "png": float('inf'), "overlay": float('inf')}
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            images, counts, _ = rasters(grid, lat, lon, geocoded)
+            best["rasters"] = min(best["rasters"], time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for name, rgba in images.items():
+                save_png(rgba, os.path.join(workdir, f"{name}.png"))
+            best["png"] = min(best["png"], time.perf_counter() - start)
+
+            start = time.perf_counter()
+            m = folium.Map(location=[64.5, 26.0], zoom_start=6)
+            add_overlays(m, images, grid)
+            m.save(os.path.join(workdir, 'rasters.html'))
+            overlay_size = os.path.getsize(os.path.join(workdir, 'rasters.html'))
+            best["overlay"] = min(best["overlay"], time.perf_counter() - start)
+
+        start = time.perf_counter()
+        m = folium.Map(location=[64.5, 26.0], zoom_start=6)
+        cluster = MarkerCluster().add_to(m)
+        for i in range(min(args.markers, len(lat))):
+            folium.Marker(location=[float(lat[i]), float(lon[i])], tooltip=str(i)).add_to(cluster)
+        m.save(os.path.join(workdir, 'markers.html'))
+        marker_time = time.perf_counter() - start
+        marker_size = os.path.getsize(os.path.join(workdir, 'markers.html'))
+    markers = min(args.markers, len(lat))
+
+    total = best["rasters"] + best["png"] + best["overlay"]
+    print(f"{args.points} points, {len(lat)} inside the boundary, {grid.shape[0]}x{grid.shape[1]} grid "
+          f"({int((counts > 0).sum())} occupied cells)")
+    print(f"  boundary filter:      {filter_time * 1000:8.1f} ms")
+    print(f"  histograms + colours: {best['rasters'] * 1000:8.1f} ms")
+    print(f"  two PNGs:             {best['png'] * 1000:8.1f} ms")
+    print(f"  map with overlays:    {best['overlay'] * 1000:8.1f} ms, {overlay_size / 1024:.0f} KiB")
+    print(f"  rasters in total:     {total * 1000:8.1f} ms")
+    print(f"  {markers} markers:        {marker_time * 1000:8.1f} ms, {marker_size / 1024:.0f} KiB "
+          f"(~{marker_time / markers * len(lat):.0f} s and {marker_size / markers * len(lat) / 1024 ** 2:.0f} MiB "
+          f"for all {len(lat)} points)")
+
+
+if __name__ == "__main__":
+    main()
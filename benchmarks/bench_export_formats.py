@@ -0,0 +1,58 @@
+# Compares write time, read time and file size of the export formats against the pretty-printed JSON
+# Usage: python benchmarks/bench_export_formats.py [input_json] [--scale N]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import EXPORTERS, LOADERS, available_formats
+
+
+def write_json(churches, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(churches, f, ensure_ascii=False, indent=4)
+
+
+def timed(func, *args, repeat=3):
+    """Best of `repeat` runs, in seconds"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input', nargs='?', default='output/churches_with_coordinates_updated_from_addresses.json')
+    parser.add_argument('--scale', type=int, default=100, help="Repeat the dataset this many times")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        churches = json.load(f) * args.scale
+
+    print(f"Benchmarking {len(churches)} churches ({args.input} x{args.scale})\n")
+    print(f"{'format':<10}{'write (s)':>12}{'read (s)':>12}{'size (MB)':>12}{'size vs json':>14}")
+
+    exporters = dict(EXPORTERS, json=write_json)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_size = None
+        for fmt in ['json'] + available_formats():
+            path = os.path.join(tmp, f'churches.{fmt}')
+            write_time, _ = timed(exporters[fmt], churches, path)
+            read_time, loaded = timed(LOADERS[fmt], path)
+            assert len(loaded) == len(churches)
+
+            size = os.path.getsize(path)
+            json_size = json_size or size
+            print(f"{fmt:<10}{write_time:>12.3f}{read_time:>12.3f}{size / 1e6:>12.2f}{size / json_size:>13.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# Times the boundary polygon test and the haversine mismatch check for 1k-1M random points
+# Usage: python benchmarks/bench_geo_validation.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.geo_validation import PolygonIndex, haversine_km, DEFAULT_BOUNDARY_FILE
+
+
+def main():
+    boundary = PolygonIndex.from_file(DEFAULT_BOUNDARY_FILE)
+    rng = np.random.default_rng(42)
+
+    print(f"{'points':>10}{'contains (s)':>16}{'haversine (s)':>16}{'points/s':>14}")
+    for n in [1_000, 10_000, 100_000, 1_000_000]:
+        lat = rng.uniform(59, 71, n)
+        lon = rng.uniform(19, 32, n)
+
+        start = time.perf_counter()
+        boundary.contains(lat, lon)
+        contains_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        haversine_km(lat, lon, lat + rng.normal(0, 0.01, n), lon + rng.normal(0, 0.01, n))
+        haversine_time = time.perf_counter() - start
+
+        print(f"{n:>10}{contains_time:>16.4f}{haversine_time:>16.4f}{n / contains_time:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Compares single-provider and hedged geocoding against two local stand-in geocoders: a
+# Nominatim-like one with a slow tail and a Photon-like one that is a bit slower on average but
+# steadier. Reports wall time, per-address p50/p99 latency and the per-provider stats.
+# Usage: python benchmarks/bench_geocoding.py [--addresses 300] [--hedge-after 0.25] [--slow-rate 0.1]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin.geocoders import GeocoderData, start_server
+from utils.geocoding import HedgedGeocoder, NominatimProvider, PhotonProvider, OfflineProvider, percentile
+from utils.request_controller import configure_controller
+
+PLACES = {"Helsinki": (60.17, 24.94), "Tampere": (61.50, 23.76), "Turku": (60.45, 22.27),
+          "Oulu": (65.01, 25.47), "Kuopio": (62.89, 27.68), "Rovaniemi": (66.50, 25.73)}
+STREETS = ["Kirkkokatu", "Kirkkotie", "Puistokatu", "Rantatie", "Kappelintie"]
+
+
+def synthetic_addresses(count, seed=1):
+    """{address: (lat, lon)}; a few are unknown to both geocoders and only match the municipality"""
+    rng = random.Random(seed)
+    addresses = {}
+    while len(addresses) < count:
+        place = rng.choice(list(PLACES))
+        lat, lon = PLACES[place]
+        address = f"{rng.choice(STREETS)} {rng.randint(1, 99)}, {place}"
+        addresses[address] = (lat + rng.uniform(-0.05, 0.05), lon + rng.uniform(-0.1, 0.1))
+    return addresses
+
+
+def run(name, geocoder, queries):
+    latencies = []
+    found = 0
+    start = time.perf_counter()
+    for address in queries:
+        t = time.perf_counter()
+        if geocoder.geocode(address):
+            found += 1
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    print(f"\n{name}: {elapsed:.2f}s for {len(queries)} addresses, {found} found, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    geocoder.report()
+    geocoder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged geocoding against stand-in geocoders")
+    parser.add_argument('--addresses', type=int, default=300)
+    parser.add_argument('--hedge-after', type=float, default=0.25)
+    parser.add_argument('--slow-rate', type=float, default=0.1, help="Share of slow Nominatim responses")
+    parser.add_argument('--slow-latency', type=float, default=2.0)
+    args = parser.parse_args()
+
+    addresses = synthetic_addresses(args.addresses)
+    known = dict(list(addresses.items())[:int(len(addresses) * 0.9)])
+    nominatim, nominatim_url, _ = start_server(GeocoderData(known, PLACES), latency=0.02,
+                                               slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    photon, photon_url, _ = start_server(GeocoderData(known, PLACES, jitter=0.0005, seed=2), latency=0.05,
+                                         slow_rate=0.01, slow_latency=args.slow_latency)
+    configure_controller(initial_rate=1000, max_rate=1000, initial_concurrency=16, max_concurrency=16)
+    queries = list(addresses)
+
+    def providers():
+        return [NominatimProvider(nominatim_url + '/search', timeout=5),
+                PhotonProvider(photon_url + '/api', timeout=5),
+                OfflineProvider(municipalities=PLACES)]
+
+    run("Nominatim only", HedgedGeocoder(providers()[:1]), queries)
+    run(f"Hedged after {args.hedge_after * 1000:.0f} ms", HedgedGeocoder(providers(), args.hedge_after), queries)
+
+    nominatim.shutdown()
+    photon.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Compares parsing a church list page the old way (whole page into a tree, then find_all('tr'))
+# with the streaming row extractor of scrapers/base_scraper.py, which reads the page in 64 KiB
+# chunks as they would download and builds no tree. Reports the best time and the tracemalloc
+# peak of each on the Lutheran list page.
+# Usage: python benchmarks/bench_list_parsing.py [--html saved_lutheran_list.html]
+#            [--churches 10000] [--chrome-kb 300] [--repeat 3]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bs4 import BeautifulSoup
+from scrapers.lutheran_scraper import LutheranScraper
+from standin.wikipedia_server import SyntheticWiki
+
+
+def full_tree(content):
+    """Data rows the way the scrapers used to read them"""
+    soup = BeautifulSoup(content, 'html.parser')
+    table = soup.find('table', class_='wikitable sortable')
+    rows = [row for row in table.find_all('tr')[1:] if row.find_all('td')] if table else []
+    return len(rows)
+
+
+def streamed(content, chunk_size=64 * 1024):
+    scraper = LutheranScraper()
+    chunks = (content[i:i + chunk_size] for i in range(0, len(content), chunk_size))
+    return sum(1 for _ in scraper.table_rows(chunks))
+
+
+def measure(function, content, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = function(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    function(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list page parsing")
+    parser.add_argument('--html', help="A saved list page; by default a synthetic Lutheran list is generated")
+    parser.add_argument('--churches', type=int, default=10000, help="Churches on the synthetic list")
+    parser.add_argument('--chrome-kb', type=int, default=300,
+                        help="Article text, navigation boxes etc. around the synthetic table")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.html:
+        with open(args.html, 'rb') as f:
+            content = f.read()
+    else:
+        wiki = SyntheticWiki(args.churches, page_kb=args.chrome_kb // 2)
+        # Synthetic lists are all table; put the rest of a real page before and after it
+        html = wiki.list_page("Lutheran").replace('<div id="bodyContent">', '<div id="bodyContent">' + wiki.filler)
+        content = html.replace('</table>', '</table>' + wiki.filler).encode('utf-8')
+    print(f"List page: {len(content) / 1024:.0f} KiB")
+
+    for name, function in (("Full tree", full_tree), ("Streamed rows", streamed)):
+        rows, best, peak = measure(function, content, args.repeat)
+        print(f"- {name}: {rows} rows in {best * 1000:.0f} ms, peak {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Overhead of --profile (utils/profiling.py) on the extractor's CPU-bound work: the articles of
+# the synthetic Wikipedia are parsed with html.parser and run through the five coordinate methods
+# and enhanced_extract_address, in "parse", "coordinates" and "address" stages, without a
+# profiler, with the sampler and with cProfile. The network waits of a real run cost neither
+# profiler anything, so this is the worst case for both.
+# Usage: python benchmarks/bench_profiling.py [--pages 300] [--repeat 3] [--keep DIR]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from coordinate_extractor import CoordinateExtractor
+from standin.wikipedia_server import SyntheticWiki
+from utils.profiling import profiling, stage
+
+
+def extract(extractor, pages):
+    with stage("parse"):
+        soups = [BeautifulSoup(html, 'html.parser') for html in pages]
+    with stage("coordinates"):
+        found = sum(1 for soup in soups if extractor.extract_coordinates(soup))
+    with stage("address"):
+        for soup in soups:
+            extractor.enhanced_extract_address(soup)
+    return found
+
+
+def timed(mode, extractor, pages, output_dir):
+    start = time.perf_counter()
+    with profiling(mode, f"bench-{mode}", output_dir):
+        extract(extractor, pages)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of the sampling profiler and cProfile")
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--keep', metavar='DIR', help="Keep the profile files in DIR")
+    args = parser.parse_args()
+
+    wiki = SyntheticWiki(args.pages)
+    pages = [wiki.article(church) for church in wiki.churches]
+    extractor = CoordinateExtractor(interlanguage=False)
+    print(f"{len(pages)} articles, {sum(map(len, pages)) / 2 ** 20:.1f} MiB of HTML, "
+          f"{extract(extractor, pages)} with coordinates\n")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        output_dir = args.keep or workdir
+        best = {}
+        # Interleaved so drift in machine speed hits every mode alike
+        for _ in range(args.repeat):
+            for mode in (None, 'sample', 'cprofile'):
+                elapsed = timed(mode, extractor, pages, output_dir)
+                best[mode] = min(best.get(mode, elapsed), elapsed)
+
+    print(f"\n{'profiler':<10} {'time':>8} {'overhead':>9}")
+    for mode, elapsed in best.items():
+        print(f"{mode or 'none':<10} {elapsed:>7.2f}s {(elapsed / best[None] - 1) * 100:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
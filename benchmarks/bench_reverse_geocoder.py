@@ -0,0 +1,71 @@
+# Benchmarks the municipality lookup at 1k and 1M points on a synthetic grid of
+# ~300 municipality polygons, against testing every polygon for every point
+# Usage: python benchmarks/bench_reverse_geocoder.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.reverse_geocoder import MunicipalityIndex
+
+
+def synthetic_municipalities(cols=20, rows=15, vertices_per_side=10):
+    """Square municipalities over Finland's bounding box, each with 4 * vertices_per_side vertices"""
+    features = []
+    width = (32 - 19) / cols
+    height = (71 - 59) / rows
+    steps = np.linspace(0, 1, vertices_per_side, endpoint=False)
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = 19 + c * width, 59 + r * height
+            ring = ([(x0 + s * width, y0) for s in steps] +
+                    [(x0 + width, y0 + s * height) for s in steps] +
+                    [(x0 + width - s * width, y0 + height) for s in steps] +
+                    [(x0, y0 + height - s * height) for s in steps])
+            ring.append(ring[0])
+            features.append({
+                "type": "Feature",
+                "properties": {"municipality": f"Kunta {r}-{c}", "region": f"Maakunta {r // 3}"},
+                "geometry": {"type": "Polygon", "coordinates": [ring]}
+            })
+    return features
+
+
+def naive_lookup(index, lat, lon):
+    result = np.full(lat.shape, -1, dtype=int)
+    for i, polygon in enumerate(index.polygons):
+        inside = polygon.contains(lat, lon) & (result == -1)
+        result[inside] = i
+    return result
+
+
+def main():
+    features = synthetic_municipalities()
+    start = time.perf_counter()
+    index = MunicipalityIndex(features)
+    print(f"Built index of {len(features)} polygons in {time.perf_counter() - start:.3f}s\n")
+
+    rng = np.random.default_rng(1)
+    print(f"{'points':>10}{'indexed (s)':>14}{'naive (s)':>12}{'points/s':>14}")
+    for n in [1_000, 1_000_000]:
+        lat = rng.uniform(59, 71, n)
+        lon = rng.uniform(19, 32, n)
+
+        start = time.perf_counter()
+        result = index.lookup(lat, lon)
+        indexed_time = time.perf_counter() - start
+
+        naive = ''
+        if n <= 100_000:
+            start = time.perf_counter()
+            expected = naive_lookup(index, lat, lon)
+            naive = f"{time.perf_counter() - start:.3f}"
+            assert (expected == result).all()
+
+        print(f"{n:>10}{indexed_time:>14.3f}{naive:>12}{n / indexed_time:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Compares full and streamed (early-terminating) article fetches against the synthetic Wikipedia
+# of standin/wikipedia_server.py. For each coordinate layout it reports the bytes downloaded (as sent,
+# gzip-compressed) and the time per page in both modes, how often the streamed read stopped early,
+# and whether both modes extracted the same coordinates and address.
+# Usage: python benchmarks/bench_streamed_fetch.py [--churches 300] [--page-kb 80]
+#            [--bandwidth-kb 2000] [--latency 0.01]
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from coordinate_extractor import CoordinateExtractor
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.logging_setup import setup_logging
+from utils.page_stream import wire_bytes
+from utils.request_controller import configure_controller, get_controller
+
+
+class MeasuredExtractor(CoordinateExtractor):
+    """Remembers how many bytes the last fetch downloaded"""
+
+    def fetch_html(self, url):
+        if self.stream:
+            before = self.stream_stats["bytes"]
+            html = super().fetch_html(url)
+            self.last_size = self.stream_stats["bytes"] - before
+            return html
+        response = get_controller().get(url)
+        response.raise_for_status()
+        html = response.content
+        self.last_size = wire_bytes(response)
+        return html
+
+
+def fetch_all(extractor, base_url, churches):
+    """{title: (result, bytes downloaded, seconds)} fetching and extracting one article at a time"""
+    results = {}
+    for church in churches:
+        url = base_url + SyntheticWiki.link(church["title"])
+        start = time.perf_counter()
+        result = extractor.extract_page(url, want_address=True)
+        results[church["title"]] = (result, extractor.last_size, time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streamed article fetches")
+    parser.add_argument('--churches', type=int, default=300)
+    parser.add_argument('--page-kb', type=int, default=80, help="Approximate size of an article page")
+    parser.add_argument('--bandwidth-kb', type=float, default=2000, help="KiB/sec per response (0 = unlimited)")
+    parser.add_argument('--latency', type=float, default=0.01)
+    args = parser.parse_args()
+
+    setup_logging('WARNING', progress=False)
+    wiki = SyntheticWiki(args.churches, page_kb=args.page_kb)
+    server, base_url, _ = start_server(wiki, latency=args.latency,
+                                       bandwidth=args.bandwidth_kb * 1024 if args.bandwidth_kb else None)
+    configure_controller(initial_rate=1000, max_rate=1000, initial_concurrency=4, max_concurrency=4)
+
+    full = fetch_all(MeasuredExtractor(), base_url, wiki.churches)
+    streamed_extractor = MeasuredExtractor(stream=True)
+    streamed = fetch_all(streamed_extractor, base_url, wiki.churches)
+    server.shutdown()
+
+    by_layout = defaultdict(list)
+    for church in wiki.churches:
+        by_layout[church["layout"]].append(church["title"])
+
+    print(f"{args.churches} articles of ~{args.page_kb} KiB, bandwidth "
+          f"{f'{args.bandwidth_kb:.0f} KiB/s' if args.bandwidth_kb else 'unlimited'}, latency {args.latency * 1000:.0f} ms")
+    print(f"{'layout':<16}{'pages':>6}{'full KiB':>10}{'stream KiB':>12}{'full ms':>9}{'stream ms':>11}{'same':>6}")
+    totals = [0, 0, 0.0, 0.0, 0]
+    for layout, titles in by_layout.items():
+        full_kb = sum(full[t][1] for t in titles) / 1024
+        stream_kb = sum(streamed[t][1] for t in titles) / 1024
+        full_s = sum(full[t][2] for t in titles)
+        stream_s = sum(streamed[t][2] for t in titles)
+        same = sum(1 for t in titles if full[t][0] == streamed[t][0])
+        n = len(titles)
+        print(f"{layout:<16}{n:>6}{full_kb / n:>10.1f}{stream_kb / n:>12.1f}"
+              f"{full_s / n * 1000:>9.1f}{stream_s / n * 1000:>11.1f}{same:>6}")
+        for i, value in enumerate((full_kb, stream_kb, full_s, stream_s, same)):
+            totals[i] += value
+    n = len(wiki.churches)
+    print(f"{'all':<16}{n:>6}{totals[0] / n:>10.1f}{totals[1] / n:>12.1f}"
+          f"{totals[2] / n * 1000:>9.1f}{totals[3] / n * 1000:>11.1f}{totals[4]:>6}")
+    stats = streamed_extractor.stream_stats
+    print(f"\nStreamed reads stopped early on {stats['stopped_early']}/{stats['pages']} pages; "
+          f"{(1 - totals[1] / totals[0]) * 100:.0f}% fewer bytes, {(1 - totals[3] / totals[2]) * 100:.0f}% less time")
+
+
+if __name__ == "__main__":
+    main()
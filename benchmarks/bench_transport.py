@@ -0,0 +1,84 @@
+# Compares the pooled transport (utils/http_transport.py) with a new connection per request, the way
+# every fetch went out before, against the synthetic Wikipedia of standin/wikipedia_server.py.
+# Each mode fetches the same articles through the request controller; the server counts the TCP
+# connections it accepted and the bytes it sent. A third mode turns compression off to show how
+# much of the saving comes from gzip. Over TLS to the real Wikipedia each avoided connection also
+# saves a handshake, which the plain-HTTP stand-in does not show.
+# Usage: python benchmarks/bench_transport.py [--churches 300] [--workers 4] [--latency 0.01]
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.http_transport import USER_AGENT, configure_transport
+from utils.request_controller import configure_controller
+
+
+def new_connection_per_request(method, url, **kwargs):
+    """How requests went out before the transport: a fresh connection each time"""
+    return requests.request(method, url, **kwargs)
+
+
+def run_mode(name, base_url, stats, churches, args, send=None, headers=None):
+    transport = configure_transport()
+    timings = []
+    transport.add_hook(lambda timing: timings.append(timing["elapsed"]))
+    controller = configure_controller(initial_rate=1000, max_rate=1000, initial_concurrency=args.workers,
+                                      max_concurrency=args.workers, send=send)
+    urls = [base_url + SyntheticWiki.link(church["title"]) for church in churches]
+    headers = dict({'User-Agent': USER_AGENT}, **(headers or {}))
+
+    def fetch(url):
+        response = controller.get(url, headers=headers)
+        response.raise_for_status()
+        return len(response.content)
+
+    with stats["lock"]:
+        before = {key: stats.get(key, 0) for key in ("connections", "bytes")}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.workers) as pool:
+        content = sum(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    with stats["lock"]:
+        used = {key: stats.get(key, 0) - before[key] for key in before}
+    transport.close()
+
+    latency = f"{sum(timings) / len(timings) * 1000:6.1f} ms" if timings else "     -   "
+    print(f"{name:<32} {used['connections']:>6} {used['bytes'] / 1024 / 1024:>8.2f} "
+          f"{content / 1024 / 1024:>8.2f} {latency} {elapsed:>7.2f}s {len(urls) / elapsed:>7.1f}/s")
+    return used, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure connection reuse and compression of the HTTP transport")
+    parser.add_argument('--churches', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=4, help="Requests in flight")
+    parser.add_argument('--latency', type=float, default=0.01, help="Mean server response delay in seconds")
+    parser.add_argument('--page-kb', type=int, default=20, help="Approximate size of an article page")
+    args = parser.parse_args()
+
+    wiki = SyntheticWiki(args.churches, page_kb=args.page_kb)
+    server, base_url, stats = start_server(wiki, latency=args.latency)
+    try:
+        print(f"{args.churches} articles, {args.workers} in flight, {args.latency * 1000:.0f} ms server latency\n")
+        print(f"{'mode':<32} {'conns':>6} {'wire MiB':>8} {'page MiB':>8} {'mean req':>9} {'time':>8} {'rate':>9}")
+        before, before_time = run_mode("new connection per request", base_url, stats, wiki.churches, args,
+                                       send=new_connection_per_request)
+        plain, _ = run_mode("pooled, uncompressed", base_url, stats, wiki.churches, args,
+                            headers={'Accept-Encoding': 'identity'})
+        after, after_time = run_mode("pooled transport (gzip)", base_url, stats, wiki.churches, args)
+    finally:
+        server.shutdown()
+
+    print(f"\nPooled transport: {after['connections']} instead of {before['connections']} connections, "
+          f"{(1 - after_time / before_time) * 100:.0f}% less time than a new connection per request; "
+          f"gzip sends {(1 - after['bytes'] / max(plain['bytes'], 1)) * 100:.0f}% fewer bytes than uncompressed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Load test for church_service.py: keep-alive clients send a mix of queries and the script
+# reports requests/sec and p50/p99 latency.
+# Usage: python benchmarks/load_test_service.py [--url http://127.0.0.1:8080] [--spawn] [--clients 50] [--seconds 10]
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def random_target(rng):
+    kind = rng.random()
+    if kind < 0.3:
+        return f"/churches/nearest?lat={rng.uniform(60, 68):.3f}&lon={rng.uniform(21, 30):.3f}&k=5"
+    if kind < 0.55:
+        lat, lon = rng.uniform(60, 67), rng.uniform(21, 29)
+        return f"/churches/bbox?min_lat={lat:.2f}&min_lon={lon:.2f}&max_lat={lat + 0.5:.2f}&max_lon={lon + 1:.2f}"
+    if kind < 0.8:
+        return f"/churches/prefix?q={rng.choice(['pyh', 'kirk', 'hel', 'ou', 'tu', 'ka', 'ev'])}"
+    return f"/churches?type={rng.choice(['Lutheran', 'Orthodox', 'Catholic'])}&limit=20"
+
+
+async def client(host, port, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            target = random_target(rng)
+            start = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not status_line.startswith(b'HTTP/1.1 200'):
+                errors.append(status_line)
+    finally:
+        writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(url, clients, seconds):
+    parsed = urlparse(url)
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(parsed.hostname, parsed.port or 80, deadline, latencies, errors, seed)
+                           for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(latencies)} requests in {elapsed:.1f}s with {clients} clients")
+    print(f"- Requests/sec: {len(latencies) / elapsed:.0f}")
+    print(f"- p50 latency: {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"- p99 latency: {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"- Errors: {len(errors)}")
+
+
+def spawn_service(input_file, port):
+    from church_service import ChurchService
+    service = ChurchService(input_file)
+    thread = threading.Thread(target=lambda: asyncio.run(service.serve('127.0.0.1', port)), daemon=True)
+    thread.start()
+    time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--spawn', action='store_true', help="Start the service in this process first")
+    parser.add_argument('--input', default='output/churches_with_coordinates_updated_from_addresses.json')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    if args.spawn:
+        spawn_service(args.input, urlparse(args.url).port or 8080)
+    asyncio.run(run(args.url, args.clients, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
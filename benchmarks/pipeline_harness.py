@@ -0,0 +1,138 @@
+# End-to-end load harness: runs main.py (list scraping) and batch_process.py (coordinate
+# extraction and combining) against the synthetic Wikipedia of standin/wikipedia_server.py
+# and reports throughput per stage and how many of the generated coordinates came back right.
+# Each run works in its own temporary directory, so the real output/ is never touched.
+# Usage: python benchmarks/pipeline_harness.py [--sizes 1000 10000 100000] [--latency 0.02]
+#            [--error-rate 0.01] [--rate-429 0.005] [--rate 200] [--concurrency 8] [--workers 8]
+#            [--profile [sample|cprofile]] [--profile-dir output/profiles]
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import main as scrape_main
+import batch_process
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.helpers import title_from_link
+from utils.profiling import add_profiling_arguments
+from utils.request_controller import configure_controller
+
+COMBINED_FILE = 'output/all_churches_with_coordinates.json'
+COORDINATE_TOLERANCE = 1e-3     # degrees; the DMS layouts are rounded to 0.1″
+
+
+def check_results(churches, wiki):
+    """Counts of churches found, with correct coordinates and with addresses, against the generated data"""
+    expected = wiki.expected()
+    results = {"records": len(churches), "expected": len(expected), "coordinates": 0,
+               "correct": 0, "addresses": 0, "coordinates_expected": 0}
+    # Churches without coordinates of their own get them from an sv/en article when it has some
+    results["coordinates_expected"] = sum(1 for c in expected.values() if c["layout"] not in ("address_only", "none")
+                                          or c.get("interlanguage_coordinates"))
+    # Churches listed twice (once through a redirect) are counted once
+    seen = set()
+    for church in churches:
+        title = wiki.resolve(title_from_link(church['wikipedia_link']))
+        if title in seen:
+            continue
+        seen.add(title)
+        truth = expected.get(title)
+        coords = church.get('coordinates') or {}
+        if church.get('address'):
+            results["addresses"] += 1
+        if coords.get('lat') is None:
+            continue
+        results["coordinates"] += 1
+        if truth and math.isclose(coords['lat'], truth['lat'], abs_tol=COORDINATE_TOLERANCE) \
+                and math.isclose(coords['lon'], truth['lon'], abs_tol=COORDINATE_TOLERANCE):
+            results["correct"] += 1
+    results["churches"] = len(seen)
+    return results
+
+
+def run(size, args):
+    wiki = SyntheticWiki(size, args.seed, page_kb=args.page_kb)
+    server, base_url, server_stats = start_server(wiki, latency=args.latency, error_rate=args.error_rate,
+                                                  rate_429=args.rate_429, retry_after=args.retry_after)
+    controller = configure_controller(initial_rate=args.rate, max_rate=args.rate,
+                                      initial_concurrency=args.concurrency, max_concurrency=args.concurrency,
+                                      backoff_base=0.05, backoff_max=2.0, circuit_cooldown=5.0)
+    cwd = os.getcwd()
+    # Profiles are kept after the temporary directory is gone
+    profile = ['--profile', args.profile, '--profile-dir', os.path.abspath(args.profile_dir)] if args.profile else []
+    timings = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            # The pipeline prints a few lines per church; keep the report readable
+            log = open(os.devnull, 'w') if args.quiet else sys.stdout
+            with log if args.quiet else contextlib.nullcontext(), contextlib.redirect_stdout(log):
+                start = time.perf_counter()
+                sys.argv = ['main.py', '--base-url', base_url, '--log-level', 'WARNING', '--no-progress'] + profile
+                scrape_main.main()
+                timings["scrape"] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                batch_process.main(['--workers', str(args.workers), '--log-level', 'WARNING', '--no-progress']
+                                   + (['--memory-budget', str(args.memory_budget)] if args.memory_budget else [])
+                                   + profile)
+                timings["extract"] = time.perf_counter() - start
+
+            with open(COMBINED_FILE, 'r', encoding='utf-8') as f:
+                churches = json.load(f)
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    results = check_results(churches, wiki)
+    host_stats = next(iter(controller.stats().values()), {})
+    total = timings["scrape"] + timings["extract"]
+    pages = server_stats.get("pages", 0)
+
+    print(f"\n{size} churches")
+    print(f"  scrape:  {timings['scrape']:.2f}s for 3 list pages")
+    print(f"  extract: {timings['extract']:.2f}s, {results['records'] / max(timings['extract'], 1e-9):.1f} churches/sec")
+    print(f"  total:   {total:.2f}s, {pages / max(total, 1e-9):.1f} pages/sec, "
+          f"{server_stats.get('bytes', 0) / max(total, 1e-9) / 2 ** 20:.1f} MiB/sec")
+    print(f"  server:  {pages} pages, {server_stats.get('throttled', 0)} throttled (429), "
+          f"{server_stats.get('errors', 0)} errors (503)")
+    print(f"  client:  {host_stats.get('requests', 0)} requests, {host_stats.get('retries', 0)} retries, "
+          f"final rate {host_stats.get('rate')}/s, concurrency {host_stats.get('concurrency')}")
+    print(f"  results: {results['churches']}/{results['expected']} churches listed in {results['records']} records, "
+          f"{results['correct']}/{results['coordinates_expected']} correct coordinates "
+          f"({results['coordinates'] - results['correct']} wrong), {results['addresses']} addresses")
+    return dict(results, size=size, seconds=total, **timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scrape and extraction pipeline against a synthetic Wikipedia")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000], help="Numbers of churches to generate")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.02, help="Mean server response delay in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.01, help="Share of requests answered with 503")
+    parser.add_argument('--rate-429', type=float, default=0.005, help="Share of requests answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--page-kb', type=int, default=20, help="Approximate size of an article page")
+    parser.add_argument('--rate', type=float, default=200.0, help="Request controller rate limit (requests/sec)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Request controller concurrency limit")
+    parser.add_argument('--workers', type=int, default=8, help="Extraction workers (batch_process.py --workers)")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help="Extraction memory budget (batch_process.py --memory-budget)")
+    parser.add_argument('--verbose', dest='quiet', action='store_false', help="Show the pipeline's own output")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"Latency {args.latency * 1000:.0f} ms, {args.error_rate:.1%} errors, {args.rate_429:.1%} throttled")
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Multi-process check of the work queue (utils/work_queue.py) on one machine: scrapes the
+# synthetic Wikipedia of standin/wikipedia_server.py, then runs batch_process.py --queue as the
+# coordinator next to several 'coordinate_extractor.py --queue-worker' processes. One worker is
+# killed part-way through, so its leases have to expire and be picked up by the others. Reports
+# how the pages were shared, how many were fetched more than once and whether the results are right.
+# Usage: python benchmarks/queue_harness.py [--churches 500] [--processes 3] [--kill-after 3]
+import argparse
+import contextlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import main as scrape_main
+import batch_process
+from benchmarks.pipeline_harness import check_results, COMBINED_FILE
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.request_controller import configure_controller
+from utils.work_queue import WorkQueue
+
+QUEUE_FILE = 'output/queue.db'
+
+
+def start_worker(args):
+    command = [sys.executable, os.path.join(REPO_ROOT, 'coordinate_extractor.py'), '--queue-worker', QUEUE_FILE,
+               '--workers', str(args.workers), '--lease', str(args.lease), '--idle-exit', str(args.idle_exit),
+               '--log-level', 'WARNING', '--no-progress']
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the extraction through the work queue with several processes")
+    parser.add_argument('--churches', type=int, default=500)
+    parser.add_argument('--processes', type=int, default=3, help="Worker processes besides the coordinator")
+    parser.add_argument('--workers', type=int, default=2, help="Pages in flight per process")
+    parser.add_argument('--latency', type=float, default=0.05, help="Mean server response delay in seconds")
+    parser.add_argument('--lease', type=float, default=3.0, help="Lease length in seconds")
+    parser.add_argument('--idle-exit', type=float, default=5.0)
+    parser.add_argument('--kill-after', type=float, default=3.0,
+                        help="Seconds after which one worker is killed (0 = none)")
+    args = parser.parse_args()
+
+    wiki = SyntheticWiki(args.churches)
+    server, base_url, server_stats = start_server(wiki, latency=args.latency)
+    configure_controller(initial_rate=50, max_rate=50, initial_concurrency=args.workers,
+                         max_concurrency=args.workers)
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+                sys.argv = ['main.py', '--base-url', base_url, '--log-level', 'WARNING', '--no-progress']
+                scrape_main.main()
+                list_pages = server_stats.get("pages", 0)
+
+                # Create the queue before the workers look for it
+                WorkQueue(QUEUE_FILE).close()
+                workers = [start_worker(args) for _ in range(args.processes)]
+                start = time.perf_counter()
+                killed = None
+                if args.kill_after and workers:
+                    def kill(signum, frame):
+                        nonlocal killed
+                        killed = workers[0]
+                        killed.send_signal(signal.SIGKILL)
+                    signal.signal(signal.SIGALRM, kill)
+                    signal.setitimer(signal.ITIMER_REAL, args.kill_after)
+
+                batch_process.main(['--queue', QUEUE_FILE, '--lease', str(args.lease), '--workers', str(args.workers),
+                                    '--no-negative-cache', '--log-level', 'WARNING', '--no-progress'])
+                elapsed = time.perf_counter() - start
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                for worker in workers:
+                    worker.wait()
+
+            queue = WorkQueue(QUEUE_FILE)
+            counts = queue.counts()
+            with queue.lock:
+                claims = queue.db.execute("SELECT attempts, COUNT(*) FROM tasks GROUP BY attempts").fetchall()
+            queue.close()
+            with open(COMBINED_FILE, 'r', encoding='utf-8') as f:
+                churches = json.load(f)
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    results = check_results(churches, wiki)
+    pages = sum(counts.values())
+    fetched = server_stats.get("pages", 0) - list_pages
+    print(f"{args.churches} churches, coordinator + {args.processes} worker processes, lease {args.lease:.0f}s"
+          + (f", worker {killed.pid} killed after {args.kill_after:.0f}s" if killed else ""))
+    print(f"  queue:   {pages} pages, " + ', '.join(f"{n} {state}" for state, n in sorted(counts.items())))
+    print("  claims:  " + ', '.join(f"{n} pages claimed {attempts}x" for attempts, n in claims))
+    print(f"  fetched: {fetched} article requests for {pages} pages ({fetched - pages} repeated) "
+          f"in {elapsed:.1f}s, exit codes {[w.returncode for w in workers]}")
+    print(f"  results: {results['churches']}/{results['expected']} churches listed, "
+          f"{results['correct']}/{results['coordinates_expected']} correct coordinates "
+          f"({results['coordinates'] - results['correct']} wrong)")
+
+
+if __name__ == "__main__":
+    main()
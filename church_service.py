@@ -0,0 +1,297 @@
+# Local HTTP query service over the church dataset.
+# Loads the dataset once into in-memory indexes (by type, by name prefix and a spatial grid)
+# and answers JSON queries with ETags and a response cache. The dataset file is watched and
+# reloaded when it changes.
+#
+# Usage: python church_service.py serve [--port 8080] [--input output/churches_with_coordinates_updated_from_addresses.json]
+#
+# Endpoints:
+#   /churches?type=Lutheran&limit=100&offset=0
+#   /churches/prefix?q=pyh
+#   /churches/bbox?min_lat=60&min_lon=24&max_lat=61&max_lon=25
+#   /churches/nearest?lat=60.17&lon=24.94&k=5
+#   /stats
+import argparse
+import asyncio
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import os
+from collections import defaultdict
+from urllib.parse import urlparse, parse_qs
+
+from utils.exporters import load_churches
+
+DEFAULT_INPUT = 'output/churches_with_coordinates_updated_from_addresses.json'
+CELL_SIZE = 0.5             # degrees per spatial grid cell
+KM_PER_DEGREE = 111.195
+
+
+class ChurchIndex:
+    """In-memory indexes over one snapshot of the dataset"""
+
+    def __init__(self, churches):
+        self.churches = churches
+        self.by_type = defaultdict(list)
+        self.grid = defaultdict(list)
+        self.located = []
+
+        for i, church in enumerate(churches):
+            self.by_type[(church.get('type') or '').lower()].append(i)
+            coords = church.get('coordinates') or {}
+            lat, lon = coords.get('lat'), coords.get('lon')
+            if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+                self.located.append(i)
+                self.grid[self.cell(lat, lon)].append(i)
+
+        # Occupied (min row, min col, max row, max col) of the grid, None when nothing is located
+        rows = [row for row, _ in self.grid]
+        cols = [col for _, col in self.grid]
+        self.extent = (min(rows), min(cols), max(rows), max(cols)) if self.grid else None
+
+        # Sorted (lower-case name, index) pairs for prefix search with bisect
+        self.names = sorted(((church.get('name') or '').lower(), i) for i, church in enumerate(churches))
+
+    @staticmethod
+    def cell(lat, lon):
+        return (math.floor(lat / CELL_SIZE), math.floor(lon / CELL_SIZE))
+
+    def coords(self, i):
+        coords = self.churches[i]['coordinates']
+        return coords['lat'], coords['lon']
+
+    def of_type(self, church_type):
+        if not church_type:
+            return range(len(self.churches))
+        return self.by_type.get(church_type.lower(), [])
+
+    def prefix(self, query):
+        query = query.lower()
+        start = bisect.bisect_left(self.names, (query, -1))
+        results = []
+        for name, i in self.names[start:]:
+            if not name.startswith(query):
+                break
+            results.append(i)
+        return results
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        if self.extent is None:
+            return []
+        row0, col0 = self.cell(min_lat, min_lon)
+        row1, col1 = self.cell(max_lat, max_lon)
+        # Cells outside the occupied extent are empty anyway
+        row0, col0 = max(row0, self.extent[0]), max(col0, self.extent[1])
+        row1, col1 = min(row1, self.extent[2]), min(col1, self.extent[3])
+        if row0 > row1 or col0 > col1:
+            return []
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self.grid):
+            # Fewer occupied cells than cells in the range
+            cells = sorted(cell for cell in self.grid if row0 <= cell[0] <= row1 and col0 <= cell[1] <= col1)
+        else:
+            cells = [(row, col) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)]
+        results = []
+        for cell in cells:
+            for i in self.grid.get(cell, ()):
+                lat, lon = self.coords(i)
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    results.append(i)
+        return results
+
+    def nearest(self, lat, lon, k):
+        """k nearest churches, searching grid rings outwards until no closer cell can exist"""
+        k = min(k, len(self.located))
+        if k <= 0:
+            return []
+        row, col = self.cell(lat, lon)
+        lon_scale = math.cos(math.radians(lat))
+        best = []
+        radius = 0
+        max_radius = int(180 / CELL_SIZE)
+        while radius <= max_radius:
+            for r in range(row - radius, row + radius + 1):
+                # Only the cells on the ring's perimeter
+                step = 1 if abs(r - row) == radius else max(1, 2 * radius)
+                for c in range(col - radius, col + radius + 1, step):
+                    for i in self.grid.get((r, c), ()):
+                        clat, clon = self.coords(i)
+                        distance = math.hypot(clat - lat, (clon - lon) * lon_scale) * KM_PER_DEGREE
+                        heapq.heappush(best, (-distance, i))
+                        if len(best) > k:
+                            heapq.heappop(best)
+            # Everything outside the searched rings is at least this far away
+            reach = radius * CELL_SIZE * lon_scale * KM_PER_DEGREE
+            if len(best) == k and -best[0][0] <= reach:
+                break
+            radius += 1
+        return [(i, -distance) for distance, i in sorted(best, reverse=True)]
+
+
+class ChurchService:
+    def __init__(self, input_file=DEFAULT_INPUT, reload_interval=1.0, cache_size=1024):
+        self.input_file = input_file
+        self.reload_interval = reload_interval
+        self.cache_size = cache_size
+        self.cache = {}
+        self.version = None
+        self.index = None
+        self.mtime = None
+        self.load()
+
+    def load(self):
+        mtime = os.path.getmtime(self.input_file)
+        churches = load_churches(self.input_file)
+        self.index = ChurchIndex(churches)
+        with open(self.input_file, 'rb') as f:
+            self.version = hashlib.sha256(f.read()).hexdigest()[:16]
+        self.mtime = mtime
+        self.cache.clear()
+        print(f"Loaded {len(churches)} churches from {self.input_file} (version {self.version})")
+
+    async def watch(self):
+        """Reload the dataset whenever the file changes"""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if os.path.getmtime(self.input_file) != self.mtime:
+                    self.load()
+            except (OSError, ValueError) as e:
+                print(f"Reload failed, keeping the previous dataset: {e}")
+
+    def handle(self, path, params):
+        """(status, payload) for a request"""
+        index = self.index
+
+        def number(name, default=None):
+            value = params.get(name, default)
+            if value is None:
+                raise ValueError(f"Missing parameter: {name}")
+            value = float(value)
+            if not math.isfinite(value):
+                raise ValueError(f"Parameter {name} must be a finite number")
+            return value
+
+        limit = int(params.get('limit', 100))
+        offset = int(params.get('offset', 0))
+
+        if path == '/churches':
+            ids = list(index.of_type(params.get('type')))
+        elif path == '/churches/prefix':
+            ids = index.prefix(params.get('q', ''))
+            if params.get('type'):
+                ids = [i for i in ids if (index.churches[i].get('type') or '').lower() == params['type'].lower()]
+        elif path == '/churches/bbox':
+            ids = index.bbox(number('min_lat'), number('min_lon'), number('max_lat'), number('max_lon'))
+        elif path == '/churches/nearest':
+            found = index.nearest(number('lat'), number('lon'), int(params.get('k', 5)))
+            return 200, {
+                "count": len(found),
+                "results": [dict(index.churches[i], distance_km=round(distance, 3)) for i, distance in found]
+            }
+        elif path == '/stats':
+            return 200, {
+                "total": len(index.churches),
+                "with_coordinates": len(index.located),
+                "by_type": {t: len(ids) for t, ids in index.by_type.items()},
+                "version": self.version
+            }
+        else:
+            return 404, {"error": f"Unknown endpoint {path}"}
+
+        return 200, {
+            "count": len(ids),
+            "offset": offset,
+            "results": [index.churches[i] for i in ids[offset:offset + limit]]
+        }
+
+    def respond(self, target, if_none_match=None):
+        """(status, headers, body) for a request target, served from the cache when possible"""
+        key = (self.version, target)
+        cached = self.cache.get(key)
+        if cached is None:
+            url = urlparse(target)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                status, payload = self.handle(url.path.rstrip('/') or '/', params)
+            except (ValueError, OverflowError) as e:
+                status, payload = 400, {"error": str(e)}
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            etag = '"' + hashlib.sha1(self.version.encode('utf-8') + body).hexdigest()[:20] + '"'
+            cached = (status, etag, body)
+            if status == 200:
+                if len(self.cache) >= self.cache_size:
+                    self.cache.pop(next(iter(self.cache)))
+                self.cache[key] = cached
+
+        status, etag, body = cached
+        if status == 200 and if_none_match == etag:
+            return 304, {"ETag": etag}, b''
+        return status, {"ETag": etag, "Content-Type": "application/json; charset=utf-8"}, body
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                if method != 'GET':
+                    status, response_headers, body = 405, {"Content-Type": "application/json"}, b'{"error": "GET only"}'
+                else:
+                    status, response_headers, body = self.respond(target, headers.get('if-none-match'))
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                response_headers["Content-Length"] = str(len(body))
+                response_headers["Connection"] = 'keep-alive' if keep_alive else 'close'
+                head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n" + ''.join(
+                    f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+                writer.write(head.encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        watcher = asyncio.create_task(self.watch())
+        print(f"Serving churches at http://{host}:{port}/")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query service over the church dataset")
+    parser.add_argument('mode', choices=['serve'])
+    parser.add_argument('--input', default=DEFAULT_INPUT)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    service = ChurchService(args.input)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
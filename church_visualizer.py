@@ -1,4 +1,5 @@
 # Piirtää kirkot kartalle ja tekee statseja
+import argparse
 import json
 import folium
 from folium.plugins import MarkerCluster
@@ -6,18 +7,26 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 from collections import defaultdict
+from utils.exporters import load_churches
+from utils.geo_validation import GeoValidator, DEFAULT_BOUNDARY_FILE
+from utils.density_raster import DensityGrid, ZoomSwitch, add_overlays, church_points, rasters, write_rasters
+from utils.profiling import add_profiling_arguments, profiling_from_args, stage
+
+# Up to this zoom level the map shows the density raster instead of the church markers
+OVERVIEW_ZOOM = 7
 
 class ChurchVisualizer:
-    def __init__(self, input_file='output/churches_with_coordinates.json'):
+    def __init__(self, input_file='output/churches_with_coordinates.json', boundary_file=DEFAULT_BOUNDARY_FILE):
         print(input_file)
         self.input_file = input_file
+        self.boundary_file = boundary_file
         self.churches = self.load_churches()
+        self.grid = DensityGrid(boundary_file=boundary_file)
 
     def load_churches(self):
-        """Load the churches from the JSON file"""
+        """Load the churches from the fastest available export of the JSON file"""
         try:
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_churches(self.input_file)
         except FileNotFoundError:
             print(f"Error: File {self.input_file} not found.")
             return []
@@ -26,29 +35,11 @@ class ChurchVisualizer:
             return []
 
     def filter_valid_churches(self):
-        """Filter out churches without valid coordinates"""
-        valid_churches = []
-
-        for church in self.churches:
-            coords = church.get('coordinates', {})
-            if coords and 'lat' in coords and 'lon' in coords:
-                # Make sure coordinates are numbers
-                try:
-                    lat = float(coords['lat'])
-                    lon = float(coords['lon'])
-
-                    # Check if coordinates are in a reasonable range for Finland
-                    if 59 <= lat <= 71 and 19 <= lon <= 32:
-                        church['coordinates']['lat'] = lat
-                        church['coordinates']['lon'] = lon
-                        valid_churches.append(church)
-                except (ValueError, TypeError):
-                    pass
-
-        return valid_churches
+        """Filter out churches without valid coordinates inside the Finland boundary polygon"""
+        return GeoValidator(self.boundary_file).valid_churches(self.churches)
 
-    def create_map(self, output_file='output/finnish_churches_map.html'):
-        """Create an interactive map of the churches"""
+    def create_map(self, output_file='output/finnish_churches_map.html', overview_zoom=OVERVIEW_ZOOM):
+        """Create an interactive map of the churches, with density rasters at overview zoom levels"""
         # Filter churches with valid coordinates
         valid_churches = self.filter_valid_churches()
 
@@ -59,11 +50,20 @@ class ChurchVisualizer:
         # Create a map centered on Finland
         m = folium.Map(location=[64.5, 26.0], zoom_start=6)
 
-        # Add marker clusters
-        marker_cluster = MarkerCluster().add_to(m)
+        # Add marker clusters, one toggleable layer per region when regions are known
+        layers = {}
+        has_regions = any(church.get('region') for church in valid_churches)
+        if not has_regions:
+            marker_cluster = MarkerCluster().add_to(m)
 
         # Add markers for each church
         for church in valid_churches:
+            if has_regions:
+                region = church.get('region') or 'Unknown region'
+                if region not in layers:
+                    layers[region] = MarkerCluster(name=region).add_to(m)
+                marker_cluster = layers[region]
+
             lat = church['coordinates']['lat']
             lon = church['coordinates']['lon']
 
@@ -75,6 +75,9 @@ class ChurchVisualizer:
             if church.get('address'):
                 popup_html += f"Address: {church['address']}<br>"
 
+            if church.get('municipality'):
+                popup_html += f"Municipality: {church['municipality']}<br>"
+
             popup_html += f"""
             Coordinates: {lat:.6f}, {lon:.6f}<br>
             <a href="{church['wikipedia_link']}" target="_blank">Wikipedia Page</a>
@@ -88,6 +91,14 @@ class ChurchVisualizer:
                 icon=folium.Icon(icon="church", prefix="fa")
             ).add_to(marker_cluster)
 
+        # Density and coverage-gap overlays; up to overview_zoom the density raster replaces the markers
+        lat, lon, geocoded = church_points(valid_churches)
+        images, _, _ = rasters(self.grid, lat, lon, geocoded)
+        overlays = add_overlays(m, images, self.grid)
+        clusters = list(layers.values()) if layers else [marker_cluster]
+        m.add_child(ZoomSwitch([overlays["density"]], clusters, overview_zoom))
+        folium.LayerControl().add_to(m)
+
         # Save the map
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         m.save(output_file)
@@ -154,19 +165,74 @@ class ChurchVisualizer:
             f.write(f"Churches with non-detailed address: {counts['non_detailed_address']}\n")
             f.write(f"Churches with no details: {counts['no_details']}\n\n")
 
+            for dimension in ['region', 'municipality']:
+                by_group = self.group_counts(dimension)
+                if not by_group:
+                    continue
+                f.write(f"By {dimension} (with coordinates / total)\n")
+                for group, (with_coords, total) in sorted(by_group.items(), key=lambda item: -item[1][1]):
+                    f.write(f"- {group}: {with_coords}/{total}\n")
+                f.write("\n")
+
+        # Density and coverage-gap rasters of the churches inside the boundary
+        write_rasters(self.churches, output_dir, self.grid)
+
+        by_region = self.group_counts('region')
+        if by_region:
+            self.create_group_chart(by_region, 'region', f"{output_dir}/churches_by_region_bar.png")
+
         print(f"Statistics created in directory: {output_dir}")
 
-def main():
+    def group_counts(self, dimension):
+        """(churches with coordinates, all churches) per value of a field such as 'region'"""
+        counts = defaultdict(lambda: [0, 0])
+        for church in self.churches:
+            group = church.get(dimension)
+            if not group:
+                continue
+            coords = church.get('coordinates') or {}
+            if coords.get('lat') is not None and coords.get('lon') is not None:
+                counts[group][0] += 1
+            counts[group][1] += 1
+        return {group: tuple(values) for group, values in counts.items()}
+
+    def create_group_chart(self, by_group, dimension, output_file):
+        """Bar chart of coordinate coverage per group"""
+        groups = sorted(by_group, key=lambda group: -by_group[group][1])
+        totals = [by_group[group][1] for group in groups]
+        with_coords = [by_group[group][0] for group in groups]
+
+        plt.figure(figsize=(14, 6))
+        plt.bar(groups, totals, color='lightskyblue', label='All churches')
+        plt.bar(groups, with_coords, color='gold', label='With coordinates')
+        plt.title(f'Churches by {dimension}', fontsize=16)
+        plt.ylabel('Count', fontsize=14)
+        plt.xticks(rotation=60, ha='right', fontsize=10)
+        plt.legend()
+        plt.grid(axis='y', linestyle='--', alpha=0.7)
+        plt.tight_layout()
+        plt.savefig(output_file)
+        plt.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw the churches on a map and plot statistics")
+    add_profiling_arguments(parser)
+    args = parser.parse_args(argv)
+
     print("Starting Finnish Churches Visualization")
     print("=======================================")
 
-    input_file = 'output\churches_with_coordinates_updated_from_addresses.json'
+    input_file = 'output/churches_with_coordinates_updated_from_addresses.json'
 
-    visualizer = ChurchVisualizer(input_file)
-    valid_churches = visualizer.create_map()
+    with profiling_from_args(args, 'visualizer'):
+        with stage("load"):
+            visualizer = ChurchVisualizer(input_file)
+        with stage("map"):
+            valid_churches = visualizer.create_map()
 
-    if valid_churches:
-        visualizer.create_statistics()
+        if valid_churches:
+            with stage("statistics"):
+                visualizer.create_statistics()
 
     print("\nVisualization completed!")
 
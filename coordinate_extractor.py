@@ -1,15 +1,74 @@
 # Kaivaa yksittäisestä jsonista wikipedialinkit ja kaivaa osoitteet ja koordinaatit
+import argparse
 import json
+import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import requests
 from bs4 import BeautifulSoup
-import random
+from utils.request_controller import get_controller
+from utils.http_transport import configure_transport
+from utils.memory import MemoryBudget, StageMemory
+from utils.profiling import add_profiling_arguments, profiling_from_args, stage
+from utils.logging_setup import add_logging_arguments, get_logger, Progress, setup_from_args
+from utils.canonicalize import canonicalize_links, group_by_canonical
+from utils.scheduler import Budget, page_revisions, prioritize, record_attempt
+from utils.negative_cache import NegativeCache, DEFAULT_TTL_DAYS, MANUAL_FILE, load_manual, merge_manual
+from utils.page_stream import fetch_until_located
+from utils.work_queue import WorkQueue, worker_id
+from utils.exporters import export_all
+from utils.interlanguage import interlanguage_coordinates
+from utils.coordinate_parser import parse_coordinate, to_decimal
+from utils.wikitext_address import WikitextAddressBackend, is_detailed
+
+logger = get_logger('extractor')
 
 class CoordinateExtractor:
-    def __init__(self, input_file='output/all_churches.json', output_file='output/churches_with_coordinates.json'):
+    def __init__(self, input_file='output/all_churches.json', output_file='output/churches_with_coordinates.json',
+                 export_formats=None, address_backend='html', api_url=None,
+                 workers=1, memory_budget_mb=None, trace_memory=False, canonicalize=True, shared_results=None,
+                 budget=None, prioritize=False, negative_cache=None, stream=False, queue=None,
+                 interlanguage=True, shared_interlanguage=None, manual_file=MANUAL_FILE):
         self.input_file = input_file
         self.output_file = output_file
+        # Extra formats written next to the final JSON output (None = all available)
+        self.export_formats = export_formats
+        # 'html' reads everything from the fetched page; 'wikitext' reads the coordinates and the infobox
+        # address from the pages' wikitext, 50 pages per API request, and fetches the HTML only of pages
+        # whose wikitext has no {{Coord}}
+        self.address_backend = address_backend
+        self.api_url = api_url
+        # Pages fetched and parsed at once; with a memory budget the parsed documents
+        # in flight are further capped so their trees fit in the budget
+        self.workers = max(1, workers)
+        self.memory_budget = MemoryBudget(memory_budget_mb) if memory_budget_mb else None
+        self.stage_memory = StageMemory(trace_memory)
+        # Normalize titles and resolve redirects so each article is fetched once
+        self.canonicalize = canonicalize
+        # {page url: extracted fields}, shared between extractors so that a church on
+        # several list pages is fetched only once per run
+        self.shared_results = {} if shared_results is None else shared_results
+        # Time/request limits (can be shared between extractors) and whether to fetch the pages
+        # most likely to give new data first; a limited budget always prioritizes
+        self.budget = budget or Budget()
+        self.prioritize = prioritize or self.budget.limited
+        # NegativeCache of pages known to give neither coordinates nor an address (None = fetch them all)
+        self.negative_cache = negative_cache
+        # Hand-checked addresses merged into the records before extraction
+        self.manual_file = manual_file
+        # Read each article only until its coordinates (or the end of its infobox) have arrived
+        self.stream = stream
+        self.stream_lock = threading.Lock()
+        self.stream_stats = {"pages": 0, "stopped_early": 0, "bytes": 0}
+        # WorkQueue shared with worker processes; the pages are then fetched by whichever
+        # process claims them, this one included
+        self.queue = queue
+        # Look up coordinates in the sv/en articles of churches whose fi page has none;
+        # {page url: coordinates or None}, shared between extractors like shared_results
+        self.interlanguage = interlanguage
+        self.shared_interlanguage = {} if shared_interlanguage is None else shared_interlanguage
         # Add counters for method statistics
         self.method_stats = {
             "method_1": 0,
@@ -17,6 +76,8 @@ class CoordinateExtractor:
             "method_3": 0,
             "method_4": 0,  # Method for wgCoordinates in RLCONF
             "method_5": 0,  # Method for geo metadata tags
+            "wikitext": 0,  # {{Coord}} in the page's wikitext (wikitext backend)
+            "interlanguage": 0,  # Coordinates from another language edition
             "no_coords": 0,
             "address_found": 0,
             "detailed_address": 0
@@ -28,30 +89,89 @@ class CoordinateExtractor:
             with open(self.input_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except FileNotFoundError:
-            print(f"Error: File {self.input_file} not found.")
+            logger.error("File %s not found.", self.input_file)
             return []
     
+    def merge_checkpoint(self, churches):
+        """Carry over what an earlier, possibly budget-limited, run saved in the output file"""
+        if not os.path.exists(self.output_file) or os.path.abspath(self.output_file) == os.path.abspath(self.input_file):
+            return 0
+        try:
+            with open(self.output_file, 'r', encoding='utf-8') as f:
+                saved = {church['wikipedia_link']: church for church in json.load(f)}
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Could not read the checkpoint in %s, starting over", self.output_file)
+            return 0
+        merged = 0
+        for church in churches:
+            previous = saved.get(church['wikipedia_link'])
+            if not previous:
+                continue
+            for key in ('coordinates', 'address', 'address_fields', 'detailed_address', 'extraction'):
+                if previous.get(key) and not church.get(key):
+                    church[key] = previous[key]
+            merged += 1
+        return merged
+
     def save_churches(self, churches):
         """Save the churches to the JSON file"""
         with open(self.output_file, 'w', encoding='utf-8') as f:
             json.dump(churches, f, ensure_ascii=False, indent=4)
     
-    def fetch_page(self, url):
-        """Fetch the Wikipedia page with a delay to avoid hitting rate limits"""
-        # Random delay between 1-3 seconds to be polite to Wikipedia
-        time.sleep(random.uniform(1, 3))
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
+    def fetch_html(self, url):
+        """Fetch the Wikipedia page through the shared request controller, which paces and retries requests"""
         try:
-            response = requests.get(url, headers=headers)
+            if self.stream:
+                html, stopped, received = fetch_until_located(url)
+                with self.stream_lock:
+                    self.stream_stats["pages"] += 1
+                    self.stream_stats["stopped_early"] += stopped is not None
+                    self.stream_stats["bytes"] += received
+                return html
+            response = get_controller().get(url)
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            return response.content
         except requests.RequestException as e:
-            print(f"Error fetching {url}: {e}")
+            logger.warning("Error fetching %s: %s", url, e, extra={"url": url})
+            return None
+
+    def fetch_page(self, url):
+        html = self.fetch_html(url)
+        return BeautifulSoup(html, 'html.parser') if html is not None else None
+
+    def extract_coordinates(self, soup):
+        """Try the extraction methods in order and return the first coordinates found"""
+        for method in (self.extract_coordinates_method_1, self.extract_coordinates_method_2,
+                       self.extract_coordinates_method_3, self.extract_coordinates_method_4,
+                       self.extract_coordinates_method_5):
+            coords = method(soup)
+            if coords:
+                return coords
+        return None
+
+    def extract_page(self, url, want_address):
+        """
+        Fetch and parse one article and keep only the extracted fields.
+        The parse tree is decomposed before returning, so no tree outlives its page.
+        Returns None if the page could not be fetched.
+        """
+        html = self.fetch_html(url)
+        if html is None:
             return None
+
+        def extract():
+            soup = BeautifulSoup(html, 'html.parser')
+            try:
+                coords = self.extract_coordinates(soup)
+                address = self.enhanced_extract_address(soup) if not coords and want_address else None
+                return {"coordinates": coords, "address": address}
+            finally:
+                soup.decompose()
+
+        if self.memory_budget:
+            with self.memory_budget.document(len(html)):
+                return extract()
+        return extract()
     
     def extract_coordinates_method_1(self, soup):
         """
@@ -62,50 +182,7 @@ class CoordinateExtractor:
         if not coord_span:
             return None
         
-        # Look for the actual coordinate text
-        coord_text = coord_span.get_text().strip()
-        
-        # Extract latitude and longitude using regex
-        lat_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[NS])', coord_text)
-        lon_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[EW])', coord_text)
-        
-        if lat_match and lon_match:
-            lat_dms = lat_match.group(1)
-            lon_dms = lon_match.group(1)
-            
-            # Convert DMS to decimal degrees
-            lat_decimal = self.dms_to_decimal(lat_dms)
-            lon_decimal = self.dms_to_decimal(lon_dms)
-            
-            return {
-                "lat": lat_decimal,
-                "lon": lon_decimal,
-                "format": "DMS",
-                "original": f"{lat_dms}, {lon_dms}",
-                "method": "method_1"
-            }
-        
-        # Alternative format: decimal degrees
-        decimal_match = re.search(r'(\d+\.\d+)°[NS].*?(\d+\.\d+)°[EW]', coord_text)
-        if decimal_match:
-            lat = float(decimal_match.group(1))
-            lon = float(decimal_match.group(2))
-            
-            # Check if we need to negate based on direction
-            if 'S' in coord_text:
-                lat = -lat
-            if 'W' in coord_text:
-                lon = -lon
-            
-            return {
-                "lat": lat,
-                "lon": lon,
-                "format": "decimal",
-                "original": coord_text,
-                "method": "method_1"
-            }
-        
-        return None
+        return self.parse_coordinates(coord_span.get_text(), "method_1")
     
     def extract_coordinates_method_2(self, soup):
         """
@@ -119,30 +196,7 @@ class CoordinateExtractor:
         if not coord_span:
             return None
         
-        # Extract the text from the span
-        coord_text = coord_span.get_text().strip()
-        
-        # Extract latitude and longitude using regex
-        lat_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[NS])', coord_text)
-        lon_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[EW])', coord_text)
-        
-        if lat_match and lon_match:
-            lat_dms = lat_match.group(1)
-            lon_dms = lon_match.group(1)
-            
-            # Convert DMS to decimal degrees
-            lat_decimal = self.dms_to_decimal(lat_dms)
-            lon_decimal = self.dms_to_decimal(lon_dms)
-            
-            return {
-                "lat": lat_decimal,
-                "lon": lon_decimal,
-                "format": "DMS",
-                "original": f"{lat_dms}, {lon_dms}",
-                "method": "method_2"
-            }
-        
-        return None
+        return self.parse_coordinates(coord_span.get_text(), "method_2")
     
     def extract_coordinates_method_3(self, soup):
         """
@@ -173,30 +227,7 @@ class CoordinateExtractor:
         if not coord_span:
             return None
         
-        # Extract the text
-        coord_text = coord_span.get_text().strip()
-        
-        # Extract latitude and longitude using regex
-        lat_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[NS])', coord_text)
-        lon_match = re.search(r'(\d+°\d+′\d+(?:\.\d+)?″[EW])', coord_text)
-        
-        if lat_match and lon_match:
-            lat_dms = lat_match.group(1)
-            lon_dms = lon_match.group(1)
-            
-            # Convert DMS to decimal degrees
-            lat_decimal = self.dms_to_decimal(lat_dms)
-            lon_decimal = self.dms_to_decimal(lon_dms)
-            
-            return {
-                "lat": lat_decimal,
-                "lon": lon_decimal,
-                "format": "DMS",
-                "original": f"{lat_dms}, {lon_dms}",
-                "method": "method_3"
-            }
-        
-        return None
+        return self.parse_coordinates(coord_span.get_text(), "method_3")
     
     def extract_coordinates_method_4(self, soup):
         """
@@ -252,20 +283,11 @@ class CoordinateExtractor:
         geo_span = soup.find('span', class_='geo')
         if geo_span:
             coords_text = geo_span.get_text().strip()
-            coords_match = re.match(r'([\d\.-]+);\s*([\d\.-]+)', coords_text)
-            if coords_match:
-                try:
-                    lat = float(coords_match.group(1))
-                    lon = float(coords_match.group(2))
-                    return {
-                        "lat": lat,
-                        "lon": lon,
-                        "format": "decimal",
-                        "original": f"geo microformat: {coords_text}",
-                        "method": "method_5"
-                    }
-                except ValueError:
-                    pass
+            coords = parse_coordinate(coords_text)
+            if coords:
+                coords["original"] = f"geo microformat: {coords_text}"
+                coords["method"] = "method_5"
+                return coords
         
         return None
     
@@ -291,7 +313,7 @@ class CoordinateExtractor:
                     address = td.get_text().strip()
                     # Clean up the address
                     address = re.sub(r'\s+', ' ', address)
-                    print(f"  - Found address using method 1: {address}")
+                    logger.debug("Found address using method 1: %s", address)
                     break
         
         # Method 2: Alternative format - look for "font-weight:bold" style in td
@@ -303,7 +325,7 @@ class CoordinateExtractor:
                     if value_td:
                         address = value_td.get_text().strip()
                         address = re.sub(r'\s+', ' ', address)
-                        print(f"  - Found address using method 2: {address}")
+                        logger.debug("Found address using method 2: %s", address)
                         break
         
         # If we found an address, check if it's a detailed one
@@ -315,7 +337,7 @@ class CoordinateExtractor:
             if has_street_number and has_comma:
                 return address
             else:
-                print(f"  - Found address but it may not be detailed enough: {address}")
+                logger.debug("Found address but it may not be detailed enough: %s", address)
                 # Still return it, but log that it might not be ideal
                 return address
         
@@ -328,36 +350,339 @@ class CoordinateExtractor:
         """
         return self.enhanced_extract_address(soup)
     
+    def fetch_interlanguage_coordinates(self, churches_by_url):
+        """Fill in coordinates from the sv/en articles linked from the churches' fi pages ({page url: [churches]})"""
+        if not self.interlanguage or not churches_by_url:
+            return
+        # Pages already looked up for another file of this run are not asked again
+        urls = [url for url in churches_by_url if url not in self.shared_interlanguage]
+        if urls:
+            logger.info("Looking up interlanguage coordinates for %d pages without coordinates...", len(urls))
+            found, stats = interlanguage_coordinates(urls, api_url=self.api_url)
+            for url in urls:
+                self.shared_interlanguage[url] = found.get(url)
+            logger.info("%d of %d pages have interlanguage links, %d with coordinates (%d API requests)",
+                        stats["linked"], stats["links"], stats["found"], stats["requests"])
+
+        for url, churches in churches_by_url.items():
+            coords = self.shared_interlanguage[url]
+            if not coords:
+                continue
+            for church in churches:
+                church['coordinates'] = dict(coords)
+                self.method_stats["interlanguage"] += 1
+                if church.get('extraction'):
+                    church['extraction']['outcome'] = self.outcome(church, {})
+                logger.debug("Found coordinates in the %s article %s", coords['source']['language'],
+                             coords['source']['title'], extra={"church": church['name'], "method": "interlanguage"})
+
+    def parse_coordinates(self, text, method):
+        """Coordinates dict from a coordinate string in any format utils/coordinate_parser.py knows"""
+        coords = parse_coordinate(text.strip())
+        if not coords:
+            return None
+        coords["method"] = method
+        return coords
+
     def dms_to_decimal(self, dms_str):
-        """Convert coordinates from DMS (Degrees, Minutes, Seconds) to decimal degrees"""
-        # Parse DMS string like 60°09′33.2″N
-        direction = dms_str[-1]
-        dms_str = dms_str[:-1]  # Remove direction
-        
-        # Split the string into degrees, minutes, and seconds
-        parts = re.findall(r'(\d+)°(\d+)′(\d+(?:\.\d+)?)″', dms_str)
-        
-        if parts:
-            degrees, minutes, seconds = map(float, parts[0])
-            decimal = degrees + minutes/60 + seconds/3600
-            
-            # Adjust sign based on direction
-            if direction in ['S', 'W']:
-                decimal = -decimal
-            
-            return decimal
-        
-        return None
+        """Convert one coordinate such as 60°09′33.2″N (or 60°09′N, 60.1592°N) to decimal degrees"""
+        return to_decimal(dms_str)
     
+    @staticmethod
+    def outcome(church, result):
+        """What an extraction attempt left the church with, for scheduling later runs"""
+        if result is None:
+            return "error"
+        if church.get('coordinates'):
+            return "coordinates"
+        if church.get('detailed_address'):
+            return "detailed_address"
+        return "address" if church.get('address') else "none"
+
+    def apply_result(self, church, result):
+        """Record the fields extracted from a church's page on the church"""
+        if result is None:
+            logger.warning("Failed to fetch page for %s", church['name'], extra={"church": church['name']})
+            return
+
+        coords = result["coordinates"]
+        if coords:
+            method = coords["method"]
+            logger.debug("Found coordinates using method %s: %s, %s", method[-1], coords['lat'], coords['lon'],
+                         extra={"church": church['name'], "method": method})
+            church['coordinates'] = coords
+            self.method_stats[method] += 1
+            return
+
+        logger.debug("No coordinates found for %s", church['name'], extra={"church": church['name']})
+        self.method_stats["no_coords"] += 1
+
+        # If we couldn't find coordinates, use the address as a fallback
+        if church.get('address'):
+            return
+        address = result["address"]
+        if address and result.get("address_fields"):
+            # Parsed from the infobox wikitext
+            self.method_stats["address_found"] += 1
+            church['address'] = address
+            church['address_fields'] = result["address_fields"]
+            church['detailed_address'] = is_detailed(result["address_fields"])
+            if church['detailed_address']:
+                self.method_stats["detailed_address"] += 1
+            logger.debug("Found address from wikitext for %s: %s", church['name'], address,
+                         extra={"church": church['name'], "address": address})
+        elif address:
+            self.method_stats["address_found"] += 1
+            church['address'] = address
+
+            # Check if the address is detailed (has street number and comma)
+            if ',' in address and re.search(r'\d+', address):
+                self.method_stats["detailed_address"] += 1
+                church['detailed_address'] = True
+                logger.debug("Found detailed address as fallback: %s", address, extra={"church": church['name']})
+            else:
+                church['detailed_address'] = False
+                logger.debug("Found address as fallback (not detailed): %s", address, extra={"church": church['name']})
+        else:
+            logger.debug("No address found as fallback for %s", church['name'], extra={"church": church['name']})
+
+    def extract_page_in_worker(self, url, want_address):
+        """extract_page in a fetch worker thread, which has to enter the stage itself to be profiled"""
+        with stage("extract"):
+            return self.extract_page(url, want_address)
+
+    def extract_all(self, targets):
+        """
+        Yield (url, result) for the (url, want_address) targets, fetching up to
+        self.workers pages at a time. Results come back in completion order.
+        """
+        if self.workers == 1:
+            for url, want_address in targets:
+                yield url, self.extract_page(url, want_address)
+            return
+
+        targets = iter(targets)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            while True:
+                # Keep a bounded number of pages in flight
+                while len(pending) < self.workers * 2:
+                    target = next(targets, None)
+                    if target is None:
+                        break
+                    pending[executor.submit(self.extract_page_in_worker, *target)] = target[0]
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+
+    def work_batch(self, owner, claimed):
+        """Extract claimed queue pages, renewing their leases until all are committed"""
+        queue = self.queue
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(queue.lease_seconds / 3):
+                queue.heartbeat(owner)
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        try:
+            for url, result in self.extract_all(claimed):
+                if result is None:
+                    queue.fail(owner, url)
+                elif not queue.complete(owner, url, result):
+                    logger.debug("%s was already committed by another worker", url, extra={"url": url})
+        finally:
+            stop.set()
+            beat.join()
+
+    def work(self, idle_exit=30.0, poll=1.0):
+        """
+        Worker process loop: claim and extract batches of pages until the queue has had
+        nothing pending or leased for idle_exit seconds. Returns the number of pages extracted.
+        """
+        owner = worker_id()
+        batch_size = self.workers * 4
+        extracted = 0
+        idle_since = time.monotonic()
+        logger.info("Worker %s processing %s", owner, self.queue.path)
+        while True:
+            claimed = self.queue.claim(owner, batch_size)
+            if claimed:
+                self.work_batch(owner, claimed)
+                extracted += len(claimed)
+                idle_since = time.monotonic()
+                continue
+            if self.queue.active():
+                # Leases held by others may still expire and come back
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= idle_exit:
+                break
+            time.sleep(poll)
+        logger.info("Worker %s extracted %d pages", owner, extracted)
+        return extracted
+
+    def extract_queued(self, targets):
+        """
+        Like extract_all, through the work queue: enqueue the targets, work on batches alongside
+        the worker processes and yield (url, result) as each page is committed by anyone.
+        Pages that failed max_attempts times are yielded with None.
+        The budget is taken as results arrive; once it is used up the pages nobody has claimed
+        are taken off the queue for the next run, and results still being fetched stay in the queue.
+        """
+        queue = self.queue
+        owner = worker_id()
+        # Every queued page reads the address too (unless its wikitext gave it), so a result
+        # serves any list that links to it
+        wanted = {url: want_address or self.address_backend == 'html' for url, want_address in targets}
+        # Pages finished before this run (a resumed queue) do not count against the budget
+        resumed = queue.last_seq()
+        added = queue.enqueue(wanted.items())
+        logger.info("Queued %d pages (%d already in %s)", added, len(wanted) - added, queue.path)
+        seq = 0
+        while wanted:
+            if self.budget.used_up():
+                withdrawn = queue.withdraw(wanted)
+                logger.info("Budget used up, took %d pages off the queue", withdrawn)
+                return
+            limit = self.workers * 4
+            if self.budget.remaining is not None:
+                limit = min(limit, self.budget.remaining)
+            claimed = queue.claim(owner, limit)
+            if claimed:
+                self.work_batch(owner, claimed)
+            finished = queue.finished_since(seq)
+            for seq, url, result in finished:
+                if url not in wanted:
+                    continue
+                # Fetched already, by this process or a worker, so kept even past the budget
+                if seq > resumed:
+                    self.budget.take()
+                del wanted[url]
+                yield url, result
+            if not claimed and not finished:
+                time.sleep(0.5)
+
+    def extract_html(self, targets):
+        """(url, result) for the targets from the fetched pages, here or through the work queue"""
+        if self.queue:
+            return self.extract_queued(targets)
+        return self.extract_all(self.within_budget(targets))
+
+    def extract_wikitext(self, targets):
+        """
+        Like extract_html, reading the pages' wikitext through the API (50 per request) instead.
+        Only pages whose wikitext has no {{Coord}} are fetched as HTML as well, since infoboxes can
+        also show coordinates from Wikidata; their address still comes from the wikitext.
+        """
+        backend = WikitextAddressBackend(self.api_url)
+        pages = backend.fetch_pages(url for url, _ in targets)
+        logger.info("Read the wikitext of %d of %d pages (%d API requests, %.0f KiB)",
+                    len(pages), len(targets), backend.stats['requests'], backend.stats['bytes'] / 1024)
+
+        rest = []
+        for url, want_address in targets:
+            page = pages.get(url)
+            if page and page["coordinates"]:
+                yield url, page
+            else:
+                # Without wikitext (missing page, API unreachable) the HTML gives the address as well
+                rest.append((url, want_address and page is None))
+        for url, result in self.extract_html(rest):
+            page = pages.get(url)
+            if result is not None and page and not result["coordinates"]:
+                result = dict(result, address=page["address"], address_fields=page["address_fields"])
+            yield url, result
+
+    def within_budget(self, targets):
+        """Pass targets through until the run's time or request budget is used up"""
+        for target in targets:
+            if not self.budget.take():
+                return
+            yield target
+
+    def schedule(self, churches, groups):
+        """Reorder groups so the pages most likely to give new data come first; returns (groups, revisions)"""
+        if not self.prioritize:
+            return groups, {}
+        urls = [url for url in groups if url not in self.shared_results]
+        revisions = page_revisions(urls, self.api_url) if urls else {}
+        order, tiers = prioritize(groups, churches, revisions)
+        logger.info("Scheduling %d pages: %s", len(order), ', '.join(f"{n} {name}" for name, n in tiers.items()))
+        return {url: groups[url] for url in order}, revisions
+
+    def skip_known_empty(self, groups, revisions):
+        """Drop the pages the negative cache still holds; returns (groups, number of churches dropped)"""
+        cache = self.negative_cache
+        if not cache:
+            return groups, 0
+        # Current revisions tell whether a cached page has been edited since
+        urls = [url for url in groups
+                if url not in revisions and url not in self.shared_results and cache.needs_revision(url)]
+        if urls:
+            revisions.update(page_revisions(urls, self.api_url))
+        kept = {}
+        dropped = 0
+        for url, indexes in groups.items():
+            if url not in self.shared_results and cache.skip(url, revisions.get(url)):
+                dropped += len(indexes)
+            else:
+                kept[url] = indexes
+        return kept, dropped
+
+    def record_empty_pages(self, churches, groups, fetched, revisions):
+        """Add the fetched pages that gave no data to the negative cache, drop the ones that did"""
+        cache = self.negative_cache
+        if not cache:
+            return
+        # Checked after the interlanguage coordinates, which arrive after the page itself
+        empty = [url for url in fetched
+                 if not any(churches[i].get('coordinates') or churches[i].get('address') for i in groups[url])]
+        missing = [url for url in empty if url not in revisions]
+        if missing:
+            revisions.update(page_revisions(missing, self.api_url))
+        empty = set(empty)
+        for url in fetched:
+            if url in empty:
+                cache.record(url, revisions.get(url))
+            else:
+                cache.clear(url)
+        cache.save()
+
+    def fetch_targets(self, churches, todo):
+        """
+        {page url: [church indexes]} for the churches to process. With canonicalization
+        every variant of a link (percent-encoding, redirects) maps to one page url.
+        """
+        if not self.canonicalize:
+            return group_by_canonical(churches, todo, {})
+        with self.stage_memory.stage("canonicalize"):
+            mapping, stats = canonicalize_links([churches[i]['wikipedia_link'] for i in todo], self.api_url)
+        logger.info("Canonicalized %d links to %d pages (%d resolved through the API in %d requests)",
+                    stats["links"], stats["canonical"], stats["redirects"], stats["requests"])
+        return group_by_canonical(churches, todo, mapping)
+
     def process_churches(self):
         """Process all churches and extract coordinates"""
-        churches = self.load_churches()
+        with self.stage_memory.stage("load"):
+            churches = self.load_churches()
         if not churches:
             print("No churches loaded.")
             return
         
         print(f"Processing {len(churches)} churches...")
-        
+        if self.prioritize:
+            # Scheduled runs continue from where the previous run stopped
+            merged = self.merge_checkpoint(churches)
+            if merged:
+                print(f"Continuing from {self.output_file} ({merged} churches saved by an earlier run).")
+        
+        manual = merge_manual(churches, load_manual(self.manual_file))
+        if manual:
+            print(f"Added hand-checked data from {self.manual_file} to {manual} churches.")
+
         # Count how many churches already have coordinates and addresses
         already_with_coords = sum(1 for church in churches if church.get('coordinates'))
         already_with_address = sum(1 for church in churches if church.get('address'))
@@ -365,93 +690,83 @@ class CoordinateExtractor:
         print(f"Already have coordinates for {already_with_coords}/{len(churches)} churches.")
         print(f"Already have addresses for {already_with_address}/{len(churches)} churches.")
         
+        # Skip churches that already have coordinates
+        # (If we have coordinates, we don't need to extract the address)
+        todo = [i for i, church in enumerate(churches) if not church.get('coordinates')]
+        skipped_count = len(churches) - len(todo)
         processed_count = 0
-        skipped_count = 0
-        
-        for i, church in enumerate(churches):
-            # Skip churches that already have coordinates
-            # (If we have coordinates, we don't need to extract the address)
-            if church.get('coordinates'):
-                skipped_count += 1
-                continue
-                
-            print(f"\n[{i+1}/{len(churches)}] Processing: {church['name']}")
-            processed_count += 1
-            
-            url = church['wikipedia_link']
-            soup = self.fetch_page(url)
-            
-            if not soup:
-                print(f"  - Failed to fetch page for {church['name']}")
-                continue
-            
-            # Try all methods to extract coordinates
-            coords = None
-            
-            # Method 1
-            coords = self.extract_coordinates_method_1(soup)
-            if coords:
-                print(f"  - Found coordinates using method 1: {coords['lat']}, {coords['lon']}")
-                church['coordinates'] = coords
-                self.method_stats["method_1"] += 1
+        unsaved = 0
+
+        groups = self.fetch_targets(churches, todo)
+        groups, revisions = self.schedule(churches, groups)
+        groups, known_empty = self.skip_known_empty(groups, revisions)
+        targets = []
+        progress = Progress(len(churches), label=os.path.basename(self.output_file))
+        # Churches that already have coordinates or are known to have no data count as cache hits
+        progress.update(skipped_count + known_empty, cached=True)
+        # Pages whose result is known by the end of the run, fetched here or for another file
+        looked_up = []
+        for url, indexes in groups.items():
+            if url in self.shared_results:
+                looked_up.append(url)
+                # Already fetched for another file of this run
+                for i in indexes:
+                    self.apply_result(churches[i], self.shared_results[url])
+                    record_attempt(churches[i], self.outcome(churches[i], self.shared_results[url]), revisions.get(url))
+                processed_count += len(indexes)
+                progress.update(len(indexes), cached=True)
             else:
-                # Method 2
-                coords = self.extract_coordinates_method_2(soup)
-                if coords:
-                    print(f"  - Found coordinates using method 2: {coords['lat']}, {coords['lon']}")
-                    church['coordinates'] = coords
-                    self.method_stats["method_2"] += 1
-                else:
-                    # Method 3
-                    coords = self.extract_coordinates_method_3(soup)
-                    if coords:
-                        print(f"  - Found coordinates using method 3: {coords['lat']}, {coords['lon']}")
-                        church['coordinates'] = coords
-                        self.method_stats["method_3"] += 1
-                    else:
-                        # Method 4
-                        coords = self.extract_coordinates_method_4(soup)
-                        if coords:
-                            print(f"  - Found coordinates using method 4: {coords['lat']}, {coords['lon']}")
-                            church['coordinates'] = coords
-                            self.method_stats["method_4"] += 1
-                        else:
-                            # Method 5
-                            coords = self.extract_coordinates_method_5(soup)
-                            if coords:
-                                print(f"  - Found coordinates using method 5: {coords['lat']}, {coords['lon']}")
-                                church['coordinates'] = coords
-                                self.method_stats["method_5"] += 1
-                            else:
-                                print(f"  - No coordinates found for {church['name']}")
-                                self.method_stats["no_coords"] += 1
-                                
-                                # If we couldn't find coordinates, try to get the address as a fallback
-                                if not church.get('address'):
-                                    # Extract address using the enhanced method
-                                    address = self.enhanced_extract_address(soup)
-                                    if address:
-                                        self.method_stats["address_found"] += 1
-                                        church['address'] = address
-                                        
-                                        # Check if the address is detailed (has street number and comma)
-                                        if ',' in address and re.search(r'\d+', address):
-                                            self.method_stats["detailed_address"] += 1
-                                            church['detailed_address'] = True
-                                            print(f"  - Found detailed address as fallback: {address}")
-                                        else:
-                                            church['detailed_address'] = False
-                                            print(f"  - Found address as fallback (not detailed): {address}")
-                                    else:
-                                        print(f"  - No address found as fallback for {church['name']}")
-            
-            # Save after each successful update to avoid losing progress
-            if (i + 1) % 10 == 0:
-                print(f"  - Saving progress after {i + 1} churches...")
-                self.save_churches(churches)
-        
+                targets.append((url, any(not churches[i].get('address') for i in indexes)))
+
+        wanted_address = dict(targets)
+        attempted = 0
+        # Pages fetched successfully in this run, for the negative cache
+        fetched = []
+        with self.stage_memory.stage("extract"), progress:
+            extract = self.extract_wikitext if self.address_backend == 'wikitext' else self.extract_html
+            for url, result in extract(targets):
+                attempted += 1
+                if result is not None:
+                    fetched.append(url)
+                    looked_up.append(url)
+                # Reusable for other files unless the address was skipped on this page
+                if result is not None and (result["coordinates"] or wanted_address[url]):
+                    self.shared_results[url] = result
+                # Fan the page's result out to every church sharing it
+                indexes = groups[url]
+                for i in indexes:
+                    church = churches[i]
+                    processed_count += 1
+                    logger.debug("[%d/%d] Processing: %s", processed_count, len(todo), church['name'])
+                    self.apply_result(church, result)
+                    record_attempt(church, self.outcome(church, result), revisions.get(url))
+                progress.update(error=result is None)
+                if len(indexes) > 1:
+                    progress.update(len(indexes) - 1, cached=True)
+
+                # Save every 10 churches to avoid losing progress
+                unsaved += len(indexes)
+                if unsaved >= 10:
+                    logger.debug("Saving progress after %d churches...", processed_count)
+                    self.save_churches(churches)
+                    unsaved = 0
+        
+        if self.budget.exhausted:
+            # Everything fetched so far is saved below; the rest waits for the next run
+            print(f"\nBudget of {self.budget.exhausted} used up: {len(targets) - attempted} of {len(targets)} "
+                  f"pages left for the next run")
+
+        # Only pages that were read: a page left for a later run may still have coordinates of its own
+        with self.stage_memory.stage("interlanguage"):
+            missing = {url: [churches[i] for i in groups[url] if not churches[i].get('coordinates')]
+                       for url in looked_up}
+            self.fetch_interlanguage_coordinates({url: found for url, found in missing.items() if found})
+        self.record_empty_pages(churches, groups, fetched, revisions)
+
         # Final save of all churches
-        self.save_churches(churches)
+        with self.stage_memory.stage("save"):
+            self.save_churches(churches)
+            export_all(churches, self.output_file, self.export_formats)
         
         # Print summary
         with_coords = sum(1 for church in churches if church.get('coordinates'))
@@ -462,6 +777,8 @@ class CoordinateExtractor:
         print(f"- Total churches: {len(churches)}")
         print(f"- Processed churches: {processed_count}")
         print(f"- Skipped churches (already had coordinates): {skipped_count}")
+        if self.negative_cache:
+            print(f"- Skipped churches (page known to have no data): {known_empty}")
         print(f"- Churches with coordinates: {with_coords} ({with_coords/len(churches)*100:.1f}%)")
         print(f"- Churches with any address: {with_address} ({with_address/len(churches)*100:.1f}%)")
         print(f"- Churches with detailed address: {with_detailed_address} ({with_detailed_address/len(churches)*100:.1f}%)")
@@ -474,12 +791,26 @@ class CoordinateExtractor:
             print(f"- Method 3 (infobox table): {self.method_stats['method_3']} successes")
             print(f"- Method 4 (wgCoordinates in script): {self.method_stats['method_4']} successes")
             print(f"- Method 5 (geo metadata): {self.method_stats['method_5']} successes")
+            if self.address_backend == 'wikitext':
+                print(f"- {{{{Coord}}}} in wikitext: {self.method_stats['wikitext']} successes")
+            if self.interlanguage:
+                print(f"- Interlanguage fallback (sv/en article): {self.method_stats['interlanguage']} successes")
             print(f"- No coordinates found: {self.method_stats['no_coords']} churches")
             
             print("\nAddress Extraction Statistics (for processed churches):")
             print(f"- Churches with any address found: {self.method_stats['address_found']} churches")
             print(f"- Churches with detailed address found: {self.method_stats['detailed_address']} churches")
         
+        if self.stream and self.stream_stats["pages"]:
+            stats = self.stream_stats
+            print(f"\nStreamed fetch: {stats['stopped_early']}/{stats['pages']} pages stopped early, "
+                  f"{stats['bytes'] / 1024 / stats['pages']:.1f} KiB downloaded per page (as sent, before decompression)")
+
+        if self.memory_budget:
+            self.memory_budget.report()
+        self.stage_memory.report()
+        self.stage_memory.stop()
+
         print(f"\n- Results saved to {self.output_file}")
 
 def test_single_page(html_file, verbose=True):
@@ -544,20 +875,72 @@ def test_single_page(html_file, verbose=True):
         "address": address is not None
     }
 
-def main():
-    import sys
-    
-    if len(sys.argv) > 1 and sys.argv[1] == '--test':
-        if len(sys.argv) > 2:
-            # Test a specific HTML file
-            test_single_page(sys.argv[2])
-        else:
-            print("Please specify an HTML file to test")
-            print("Usage: python coordinate_extractor.py --test <html_file>")
-    else:
-        # Normal processing mode
-        extractor = CoordinateExtractor()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the coordinates and addresses of the churches from their Wikipedia pages")
+    parser.add_argument('--test', metavar='HTML_FILE',
+                        help="Only try the extraction methods on a saved HTML page and print what each finds")
+    parser.add_argument('--address-backend', choices=['html', 'wikitext'], default='html',
+                        help="Read the pages' HTML, or their wikitext 50 pages per API request (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=1, help="Pages fetched and parsed at a time")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help="Cap the parsed pages in flight to fit this RSS budget")
+    parser.add_argument('--trace-memory', action='store_true', help="Report peak memory per stage (tracemalloc)")
+    parser.add_argument('--no-canonicalize', dest='canonicalize', action='store_false',
+                        help="Do not resolve the links through the API before fetching")
+    parser.add_argument('--time-budget', type=float, default=None, metavar='SECONDS',
+                        help="Stop fetching after this long, most promising pages first")
+    parser.add_argument('--max-requests', type=int, default=None, help="Stop fetching after this many pages")
+    parser.add_argument('--prioritize', action='store_true',
+                        help="Fetch the pages most likely to give new data first even without a budget")
+    parser.add_argument('--negative-ttl', type=float, default=DEFAULT_TTL_DAYS, metavar='DAYS',
+                        help="Skip pages that gave no coordinates or address for this long, unless edited")
+    parser.add_argument('--no-negative-cache', dest='negative_cache', action='store_false',
+                        help="Fetch pages that gave no data on earlier runs as well")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stop reading each article once its coordinates or infobox have arrived")
+    parser.add_argument('--no-interlanguage', dest='interlanguage', action='store_false',
+                        help="Do not look for coordinates in the sv/en articles of churches without them")
+    queue_mode = parser.add_mutually_exclusive_group()
+    queue_mode.add_argument('--queue', metavar='PATH',
+                            help="Share the pages through this work queue with '--queue-worker' processes")
+    queue_mode.add_argument('--queue-worker', metavar='PATH',
+                            help="Only work on the pages of this work queue, on this or another machine")
+    parser.add_argument('--lease', type=float, default=60.0,
+                        help="Seconds a claimed page stays leased without a heartbeat")
+    parser.add_argument('--idle-exit', type=float, default=30.0,
+                        help="Seconds a queue worker waits for new work before exiting")
+    parser.add_argument('--http2', action='store_true', help="Use HTTP/2 connections (needs httpx and h2)")
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.test:
+        test_single_page(args.test)
+        return
+
+    setup_from_args(args)
+    if args.http2:
+        configure_transport(http2=True)
+    if args.queue_worker:
+        worker = CoordinateExtractor(address_backend=args.address_backend, workers=args.workers,
+                                     memory_budget_mb=args.memory_budget, stream=args.stream,
+                                     queue=WorkQueue(args.queue_worker, args.lease))
+        with profiling_from_args(args, 'extractor-worker'):
+            worker.work(args.idle_exit)
+        return
+
+    extractor = CoordinateExtractor(address_backend=args.address_backend, workers=args.workers,
+                                    queue=WorkQueue(args.queue, args.lease) if args.queue else None,
+                                    interlanguage=args.interlanguage,
+                                    budget=Budget(args.time_budget, args.max_requests),
+                                    prioritize=args.prioritize,
+                                    negative_cache=NegativeCache(ttl_days=args.negative_ttl) if args.negative_cache else None,
+                                    stream=args.stream,
+                                    memory_budget_mb=args.memory_budget,
+                                    canonicalize=args.canonicalize,
+                                    trace_memory=args.trace_memory)
+    with profiling_from_args(args, 'extractor'):
         extractor.process_churches()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
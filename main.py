@@ -1,40 +1,79 @@
 # main.py for initial scraping and saving to JSON files
+import argparse
 import json
 import os
 from scrapers.catholic_scraper import CatholicScraper
 from scrapers.orthodox_scraper import OrthodoxScraper
 from scrapers.lutheran_scraper import LutheranScraper
+from utils.helpers import WIKI_BASE_URL
+from utils.http_transport import configure_transport
+from utils.logging_setup import add_logging_arguments, setup_from_args
+from utils.profiling import add_profiling_arguments, profiling_from_args, stage
+
+def save_churches(churches, output_file):
+    """Save a list of churches to a JSON file"""
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(churches, f, ensure_ascii=False, indent=4)
+
+def scrape_to_file(scraper, output_file):
+    """Scrape one denomination's list page and save it to output_file"""
+    with stage("scrape"):
+        churches = scraper.get_churches()
+    with stage("save"):
+        save_churches(churches, output_file)
+    return churches
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape the Finnish church lists from Wikipedia")
+    parser.add_argument('--from-dump', metavar='DUMP',
+                        help="Read the lists and coordinates from a local fiwiki-pages-articles.xml.bz2 instead")
+    parser.add_argument('--base-url', default=WIKI_BASE_URL,
+                        help="Wikipedia to scrape, e.g. a local stand-in server (default: %(default)s)")
+    parser.add_argument('--http2', action='store_true', help="Use HTTP/2 connections (needs httpx and h2)")
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    setup_from_args(args)
+    if args.http2:
+        configure_transport(http2=True)
+    with profiling_from_args(args, 'scrapers'):
+        scrape_all(args)
+
+def scrape_all(args):
+    """Scrape the three lists, or read them from a dump, and save them"""
     # Create output directory if it doesn't exist
     os.makedirs('output', exist_ok=True)
+
+    if args.from_dump:
+        from utils.dump_ingest import ingest_dump
+        ingest_dump(args.from_dump)
+        return
     
     # Initialize scrapers
-    catholic_scraper = CatholicScraper()
-    orthodox_scraper = OrthodoxScraper()
-    lutheran_scraper = LutheranScraper()
+    catholic_scraper = CatholicScraper(args.base_url)
+    orthodox_scraper = OrthodoxScraper(args.base_url)
+    lutheran_scraper = LutheranScraper(args.base_url)
     
     # Get churches from each source
-    catholic_churches = catholic_scraper.get_churches()
-    orthodox_churches = orthodox_scraper.get_churches()
-    lutheran_churches = lutheran_scraper.get_churches()
-    
-    # Save to individual JSON files
-    with open('output/catholic_churches.json', 'w', encoding='utf-8') as f:
-        json.dump(catholic_churches, f, ensure_ascii=False, indent=4)
-    
-    with open('output/orthodox_churches.json', 'w', encoding='utf-8') as f:
-        json.dump(orthodox_churches, f, ensure_ascii=False, indent=4)
-    
-    with open('output/lutheran_churches.json', 'w', encoding='utf-8') as f:
-        json.dump(lutheran_churches, f, ensure_ascii=False, indent=4)
-    
-    # Combine all churches
-    all_churches = catholic_churches + orthodox_churches + lutheran_churches
+    with stage("catholic"):
+        catholic_churches = catholic_scraper.get_churches()
+    with stage("orthodox"):
+        orthodox_churches = orthodox_scraper.get_churches()
+    with stage("lutheran"):
+        lutheran_churches = lutheran_scraper.get_churches()
     
-    # Save to combined JSON file
-    with open('output/all_churches.json', 'w', encoding='utf-8') as f:
-        json.dump(all_churches, f, ensure_ascii=False, indent=4)
+    with stage("save"):
+        # Save to individual JSON files
+        save_churches(catholic_churches, 'output/catholic_churches.json')
+        save_churches(orthodox_churches, 'output/orthodox_churches.json')
+        save_churches(lutheran_churches, 'output/lutheran_churches.json')
+        
+        # Combine all churches
+        all_churches = catholic_churches + orthodox_churches + lutheran_churches
+        
+        # Save to combined JSON file
+        save_churches(all_churches, 'output/all_churches.json')
     
     print("\nSummary:")
     print(f"- Catholic churches: {len(catholic_churches)}")
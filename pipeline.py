@@ -0,0 +1,433 @@
+# pipeline.py - runs the whole scrape -> extract -> geocode -> visualize chain
+# and skips every stage whose inputs and code have not changed since the last run
+import argparse
+import ast
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils import profiling
+from utils.logging_setup import add_logging_arguments, setup_logging
+
+STATE_FILE = 'output/.pipeline_state.json'
+
+CHURCH_TYPES = ['catholic', 'orthodox', 'lutheran']
+
+COMBINED_FILE = 'output/all_churches_with_coordinates.json'
+GEOCODED_FILE = 'output/churches_with_coordinates_updated_from_addresses.json'
+ENRICHED_FILE = 'output/churches_with_municipalities.json'
+MUNICIPALITY_FILE = 'data/municipalities.geojson'
+VALIDATION_REPORT = 'output/validation_report.json'
+MAP_FILE = 'output/finnish_churches_map.html'
+STATISTICS_DIR = 'output/statistics'
+CHANGE_FEED = 'output/changes/feed.jsonl'
+
+
+class Stage:
+    """
+    A single pipeline step with the files it reads and writes. code lists the modules the
+    stage runs; every repository module they import, directly or not, counts as its code too.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), code=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+
+
+class FileHasher:
+    """
+    Content hashes of files, cached by (mtime, size) so that unchanged files
+    are not re-read on every run. The cache is persisted with the pipeline state.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+
+    def hash(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        cached = self.cache.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.cache[path] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+
+def module_files(name, level=0, importer=None):
+    """Repository files a module name may refer to (package __init__ files included)"""
+    parts = name.split('.') if name else []
+    if level:
+        base = os.path.dirname(importer)
+        for _ in range(level - 1):
+            base = os.path.dirname(base)
+        parts = ([base] if base else []) + parts
+    files = []
+    for i in range(1, len(parts) + 1):
+        path = os.path.join(*parts[:i])
+        files.extend(candidate for candidate in (path + '.py', os.path.join(path, '__init__.py'))
+                     if os.path.isfile(candidate))
+    return files
+
+
+def import_closure(entries):
+    """The entry files and every repository .py file they import, directly or indirectly, sorted"""
+    seen = set()
+    pending = [path for path in entries if os.path.isfile(path)]
+    while pending:
+        path = os.path.normpath(pending.pop())
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+        # Imports inside functions count too; the stages import lazily
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    pending.extend(module_files(alias.name))
+            elif isinstance(node, ast.ImportFrom):
+                module = module_files(node.module, node.level, path)
+                pending.extend(module)
+                for alias in node.names:
+                    # "from utils import profiling" imports a module, not a name
+                    name = f"{node.module}.{alias.name}" if node.module else alias.name
+                    pending.extend(module_files(name, node.level, path)[len(module):])
+    return sorted(seen)
+
+
+class Pipeline:
+    def __init__(self, stages, state_file=STATE_FILE, workers=4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.workers = workers
+        self.state = self.load_state()
+        self.hasher = FileHasher(self.state.get('file_cache'))
+        self.closures = {}
+
+        # Map each output file to the stage that produces it
+        self.producers = {}
+        for stage in stages:
+            for path in stage.outputs:
+                self.producers[path] = stage.name
+
+    def load_state(self):
+        """Load the recorded fingerprints of the previous run"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self):
+        self.state['file_cache'] = self.hasher.cache
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp_file, self.state_file)
+
+    def dependencies(self, stage):
+        """Names of the stages that produce this stage's inputs"""
+        return {self.producers[path] for path in stage.inputs if path in self.producers}
+
+    def code_files(self, stage):
+        """Every repository module the stage's code imports; computed once per run"""
+        if stage.name not in self.closures:
+            self.closures[stage.name] = import_closure(stage.code)
+        return self.closures[stage.name]
+
+    def fingerprint(self, stage):
+        """Hash of the stage name, its input contents and its code"""
+        h = hashlib.sha256(stage.name.encode('utf-8'))
+        for path in stage.inputs + self.code_files(stage):
+            h.update(path.encode('utf-8'))
+            h.update((self.hasher.hash(path) or 'missing').encode('utf-8'))
+        return h.hexdigest()
+
+    def is_up_to_date(self, stage):
+        recorded = self.state.get('stages', {}).get(stage.name)
+        if not recorded or recorded.get('fingerprint') != self.fingerprint(stage):
+            return False
+        # Outputs must still exist and be the ones we wrote
+        for path in stage.outputs:
+            if self.hasher.hash(path) != recorded.get('outputs', {}).get(path):
+                return False
+        return True
+
+    def record(self, stage):
+        self.state.setdefault('stages', {})[stage.name] = {
+            'fingerprint': self.fingerprint(stage),
+            'outputs': {path: self.hasher.hash(path) for path in stage.outputs},
+            'finished': time.time()
+        }
+
+    def selected_stages(self, targets):
+        """The target stages and everything they depend on"""
+        if not targets:
+            return list(self.stages)
+        selected = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.dependencies(self.stages[name]))
+        return [name for name in self.stages if name in selected]
+
+    def execute(self, stage):
+        # Each stage is its own profile stage, whichever worker thread runs it
+        with profiling.stage(stage.name):
+            stage.func()
+
+    def run(self, targets=None, force=(), dry_run=False):
+        """
+        Run the selected stages. Stages whose dependencies are finished run
+        in parallel, so the per-denomination branches proceed independently.
+        """
+        names = self.selected_stages(targets)
+        done = set()
+        rerun = set(force)
+        failed = set()
+        running = {}
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(done) + len(failed) < len(names):
+                for name in names:
+                    if name in done or name in failed or name in running.values():
+                        continue
+                    deps = self.dependencies(self.stages[name])
+                    if deps & failed:
+                        print(f"[skip] {name}: dependency failed")
+                        failed.add(name)
+                        continue
+                    if not deps <= done:
+                        continue
+
+                    stage = self.stages[name]
+                    # A stage must rerun if anything upstream reran or it is out of date
+                    if name not in rerun and not (deps & rerun) and self.is_up_to_date(stage):
+                        print(f"[up-to-date] {name}")
+                        done.add(name)
+                        continue
+
+                    rerun.add(name)
+                    if dry_run:
+                        print(f"[would run] {name}")
+                        done.add(name)
+                        continue
+
+                    print(f"[run] {name}")
+                    running[executor.submit(self.execute, stage)] = name
+
+                if not running:
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"[failed] {name}: {e}")
+                        failed.add(name)
+                        continue
+                    self.record(self.stages[name])
+                    done.add(name)
+                    print(f"[done] {name}")
+
+        if not dry_run:
+            self.save_state()
+
+        print(f"\nPipeline finished in {time.time() - start:.2f}s "
+              f"({len(rerun - failed) if not dry_run else 0} run, {len(failed)} failed)")
+        return not failed
+
+
+def church_file(church_type):
+    return f'output/{church_type}_churches.json'
+
+
+def coordinates_file(church_type):
+    return f'output/{church_type}_churches_with_coordinates.json'
+
+
+def scrape_stage(church_type):
+    def run():
+        from main import scrape_to_file
+        from scrapers.catholic_scraper import CatholicScraper
+        from scrapers.orthodox_scraper import OrthodoxScraper
+        from scrapers.lutheran_scraper import LutheranScraper
+
+        scrapers = {
+            'catholic': CatholicScraper,
+            'orthodox': OrthodoxScraper,
+            'lutheran': LutheranScraper
+        }
+        scrape_to_file(scrapers[church_type](), church_file(church_type))
+
+    return Stage(
+        f'scrape_{church_type}', run,
+        outputs=[church_file(church_type)],
+        code=['main.py']
+    )
+
+
+def extract_stage(church_type):
+    def run():
+        from coordinate_extractor import CoordinateExtractor
+
+        extractor = CoordinateExtractor(
+            input_file=church_file(church_type),
+            output_file=coordinates_file(church_type)
+        )
+        extractor.process_churches()
+
+    return Stage(
+        f'extract_{church_type}', run,
+        inputs=[church_file(church_type)],
+        outputs=[coordinates_file(church_type)],
+        code=['coordinate_extractor.py']
+    )
+
+
+def combine_stage():
+    def run():
+        from batch_process import combine_results
+        combine_results(COMBINED_FILE)
+
+    return Stage(
+        'combine', run,
+        inputs=[coordinates_file(church_type) for church_type in CHURCH_TYPES],
+        outputs=[COMBINED_FILE],
+        code=['batch_process.py']
+    )
+
+
+def geocode_stage():
+    def run():
+        from utils.find_coordinates_from_address import process_json_file
+        process_json_file(COMBINED_FILE, GEOCODED_FILE)
+
+    return Stage(
+        'geocode', run,
+        inputs=[COMBINED_FILE],
+        outputs=[GEOCODED_FILE],
+        code=['utils/find_coordinates_from_address.py']
+    )
+
+
+def validate_stage():
+    def run():
+        from utils.geo_validation import validate_file
+        validate_file(GEOCODED_FILE, VALIDATION_REPORT)
+
+    return Stage(
+        'validate', run,
+        inputs=[GEOCODED_FILE, 'data/finland_boundary.geojson'],
+        outputs=[VALIDATION_REPORT],
+        code=['utils/geo_validation.py']
+    )
+
+
+def reverse_geocode_stage():
+    def run():
+        from utils.reverse_geocoder import enrich_file
+        enrich_file(GEOCODED_FILE, ENRICHED_FILE, MUNICIPALITY_FILE)
+
+    return Stage(
+        'reverse_geocode', run,
+        inputs=[GEOCODED_FILE, MUNICIPALITY_FILE],
+        outputs=[ENRICHED_FILE],
+        code=['utils/reverse_geocoder.py']
+    )
+
+
+def changes_stage():
+    def run():
+        from utils.change_feed import record_run
+        record_run(GEOCODED_FILE)
+
+    return Stage(
+        'changes', run,
+        inputs=[GEOCODED_FILE],
+        outputs=[CHANGE_FEED],
+        code=['utils/change_feed.py']
+    )
+
+
+def visualize_stage():
+    def run():
+        from church_visualizer import ChurchVisualizer
+        visualizer = ChurchVisualizer(ENRICHED_FILE)
+        visualizer.create_map(MAP_FILE)
+        visualizer.create_statistics(STATISTICS_DIR)
+
+    return Stage(
+        'visualize', run,
+        inputs=[ENRICHED_FILE, 'data/finland_boundary.geojson'],
+        outputs=[MAP_FILE, f'{STATISTICS_DIR}/summary.txt', f'{STATISTICS_DIR}/density.png',
+                 f'{STATISTICS_DIR}/coverage_gaps.png'],
+        code=['church_visualizer.py']
+    )
+
+
+def build_stages():
+    """Declare every stage of the pipeline"""
+    stages = []
+    for church_type in CHURCH_TYPES:
+        stages.append(scrape_stage(church_type))
+        stages.append(extract_stage(church_type))
+    stages.append(combine_stage())
+    stages.append(geocode_stage())
+    stages.append(validate_stage())
+    stages.append(reverse_geocode_stage())
+    stages.append(changes_stage())
+    stages.append(visualize_stage())
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Finnish churches pipeline, skipping up-to-date stages")
+    parser.add_argument('targets', nargs='*', help="Stages to build (default: all)")
+    parser.add_argument('--force', action='append', default=[], help="Rerun this stage even if it is up to date")
+    parser.add_argument('--dry-run', action='store_true', help="Only show which stages would run")
+    parser.add_argument('--workers', type=int, default=4, help="Maximum number of stages run in parallel")
+    parser.add_argument('--list', action='store_true', help="List the stages and exit")
+    add_logging_arguments(parser)
+    profiling.add_profiling_arguments(parser)
+    args = parser.parse_args()
+    # Stages running in parallel would fight over a single progress line
+    setup_logging(args.log_level, args.log_json, progress=args.progress and args.workers == 1)
+
+    pipeline = Pipeline(build_stages(), workers=args.workers)
+
+    if args.list:
+        for stage in pipeline.stages.values():
+            print(f"{stage.name}: {', '.join(stage.inputs) or '-'} -> {', '.join(stage.outputs)}")
+        return
+
+    with profiling.profiling_from_args(args, 'pipeline'):
+        ok = pipeline.run(args.targets, force=args.force, dry_run=args.dry_run)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
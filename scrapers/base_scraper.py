@@ -1,16 +1,208 @@
-import requests
-from bs4 import BeautifulSoup
+import codecs
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from utils.request_controller import get_controller
+from utils.helpers import WIKI_BASE_URL
+from utils.logging_setup import get_logger
+
+logger = get_logger('scrapers')
+
+# A table cell: its whole text and its links, each a dict of the <a> attributes plus 'text'
+Cell = namedtuple('Cell', 'text links')
+
+
+class WikitableRows(HTMLParser):
+    """
+    Event-based scan of a page for the rows of its list tables; no tree is built. Each data
+    row is returned from feed() as a list of its <td> Cells as soon as the row has been read,
+    so memory stays at one chunk of the page whatever the page size.
+    """
+
+    def __init__(self, table_class, all_tables):
+        super().__init__()
+        self.table_classes = set(table_class.split())
+        self.all_tables = all_tables
+        self.tables_found = 0
+        self.table_depth = 0      # <table> nesting inside the current list table
+        self.rows_in_table = 0
+        self.row = None           # Cells of the current row
+        self.cell = None          # (text parts, links) of the current <td>
+        self.link = None          # the <a> being read in the current cell
+        self.ready = []
+        self.done = False
+
+    def feed(self, data):
+        super().feed(data)
+        ready, self.ready = self.ready, []
+        return ready
+
+    def close(self):
+        super().close()
+        self.end_row()
+        return self.ready
+
+    def end_cell(self):
+        if self.cell is not None:
+            parts, links = self.cell
+            self.row.append(Cell(''.join(parts), links))
+        self.cell = self.link = None
+
+    def end_row(self):
+        if self.row is None:
+            return
+        self.end_cell()
+        # The first row of each table is the header
+        if self.rows_in_table > 1 and self.row:
+            self.ready.append(self.row)
+        self.row = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if not self.table_depth:
+            classes = set((dict(attrs).get('class') or '').split())
+            if tag == 'table' and self.table_classes <= classes:
+                self.tables_found += 1
+                self.table_depth = 1
+                self.rows_in_table = 0
+            return
+        if tag == 'table':
+            self.table_depth += 1
+        elif self.table_depth > 1:
+            pass
+        elif tag == 'tr':
+            # A new row closes the previous one even without </tr>
+            self.end_row()
+            self.rows_in_table += 1
+            self.row = []
+        elif tag in ('td', 'th') and self.row is not None:
+            self.end_cell()
+            if tag == 'td':
+                self.cell = ([], [])
+        elif tag == 'a' and self.cell is not None and self.link is None:
+            self.link = dict(attrs, text='')
+            self.link['class'] = (self.link.get('class') or '').split()
+            self.cell[1].append(self.link)
+
+    def handle_endtag(self, tag):
+        if not self.table_depth:
+            return
+        if tag == 'table':
+            self.table_depth -= 1
+            if not self.table_depth:
+                self.end_row()
+                self.done = not self.all_tables
+        elif self.table_depth > 1:
+            pass
+        elif tag == 'a':
+            self.link = None
+        elif tag in ('td', 'th'):
+            self.end_cell()
+        elif tag == 'tr':
+            self.end_row()
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell[0].append(data)
+            if self.link is not None:
+                self.link['text'] += data
+
 
 class BaseScraper:
-    def __init__(self, url, church_type):
+    """
+    Reads the churches from the wikitable(s) of a Wikipedia list page. Subclasses only
+    configure the page: its url and church type, and the class attributes below.
+    """
+
+    # Class attribute of the list tables
+    table_class = 'wikitable sortable'
+    # Read every matching table, or only the first one
+    all_tables = False
+    # Take the church name from the link text instead of the whole first cell
+    name_from_link = False
+
+    def __init__(self, url, church_type, base_url=WIKI_BASE_URL):
         self.url = url
         self.church_type = church_type
+        # Prefix for the relative church links on the list page
+        self.base_url = base_url
     
-    def fetch_page(self):
-        response = requests.get(self.url)
+    def fetch_chunks(self, chunk_size=64 * 1024):
+        """The list page as it downloads, in chunks of bytes"""
+        response = get_controller().get(self.url, stream=True)
         response.raise_for_status()
-        return BeautifulSoup(response.content, 'html.parser')
-    
+        try:
+            yield from response.iter_content(chunk_size)
+        finally:
+            response.close()
+
+    def table_rows(self, chunks, encoding='utf-8'):
+        """
+        Yield the <td> Cells of each data row of the list tables, from the page as bytes or
+        as an iterable of byte chunks. Rows are yielded while the page is still being read.
+        """
+        if isinstance(chunks, (bytes, str)):
+            chunks = [chunks]
+        decoder = codecs.getincrementaldecoder(encoding)('replace')
+        parser = WikitableRows(self.table_class, self.all_tables)
+        for chunk in chunks:
+            text = chunk if isinstance(chunk, str) else decoder.decode(chunk)
+            yield from parser.feed(text)
+            if parser.done:
+                break
+        else:
+            yield from parser.feed(decoder.decode(b'', final=True))
+            yield from parser.close()
+        if not parser.tables_found:
+            logger.warning("Could not find the %s churches table!", self.church_type)
+        logger.debug("Read %d table(s) of %s churches", parser.tables_found, self.church_type)
+
+    def clean_church_name(self, name):
+        """
+        Clean the church name by removing any trailing numbers enclosed in brackets.
+        """
+        return re.sub(r'\s*\[\d+\]', '', name).strip()
+
+    def church_from_row(self, cells):
+        """The church of a table row, or None if the row has no article (no link or a redlink)"""
+        # The first cell contains the church name and link
+        name_cell = cells[0]
+        name = name_cell.text.strip()
+        if not name_cell.links:
+            logger.debug("Skipping church with no link: %s", name)
+            return None
+
+        # Check if the link is a "redlink" (points to a non-existent page)
+        link = name_cell.links[0]
+        href = link.get('href') or ''
+        if 'redlink=1' in href or 'new' in link['class']:
+            logger.debug("Skipping church with redlink: %s", name)
+            return None
+
+        if self.name_from_link:
+            name = link['text'].strip()
+        return {
+            "name": self.clean_church_name(name),
+            "type": self.church_type,
+            "wikipedia_link": self.base_url + href,
+            "coordinates": {}  # Empty placeholder for now
+        }
+
+    def parse_churches(self, chunks):
+        churches = []
+        skipped_count = 0
+        for cells in self.table_rows(chunks):
+            church = self.church_from_row(cells)
+            if church:
+                churches.append(church)
+            else:
+                skipped_count += 1
+
+        print(f"Total {self.church_type} churches processed: {len(churches)}")
+        print(f"Total {self.church_type} churches skipped: {skipped_count}")
+        return churches
+
     def get_churches(self):
-        """To be implemented by subclasses"""
-        raise NotImplementedError
\ No newline at end of file
+        return self.parse_churches(self.fetch_chunks())
@@ -0,0 +1,156 @@
+# Local stand-ins for the Nominatim (/search) and Photon (/api) geocoding APIs, for trying out
+# and benchmarking the hedged geocoder in utils/geocoding.py. Each server answers from a dict of
+# known addresses, falls back to the municipality for unknown street addresses, and can be made
+# slow (a share of requests taking slow_latency) or unreliable (a share answered with 503, or
+# with a malformed result such as a Photon feature whose geometry is null).
+# Usage: python -m standin.geocoders addresses.json [--port 8767] [--latency 0.02] [--slow-rate 0.1]
+#   where addresses.json maps addresses to [lat, lon]
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+def normalize(address):
+    return ' '.join(re.sub(r'[,.]', ' ', address.lower()).split())
+
+
+class GeocoderData:
+    """Known addresses and municipality centres, with a little noise per provider"""
+
+    def __init__(self, addresses, municipalities=None, jitter=0.0, seed=1):
+        rng = random.Random(seed)
+        self.addresses = {
+            normalize(address): (lat + rng.uniform(-jitter, jitter), lon + rng.uniform(-jitter, jitter))
+            for address, (lat, lon) in addresses.items()
+        }
+        self.municipalities = {name.lower(): coords for name, coords in (municipalities or {}).items()}
+
+    def lookup(self, query):
+        """(lat, lon, kind, name) or None"""
+        coords = self.addresses.get(normalize(query))
+        if coords:
+            return coords[0], coords[1], 'house', query
+        place = re.sub(r'\b\d{5}\b', '', query.split(',')[-1]).strip().lower()
+        if place in self.municipalities:
+            lat, lon = self.municipalities[place]
+            return lat, lon, 'city', place.title()
+        return None
+
+
+def nominatim_response(found):
+    if not found:
+        return []
+    lat, lon, kind, name = found
+    return [{"lat": str(lat), "lon": str(lon), "addresstype": kind, "type": kind,
+             "category": 'building' if kind == 'house' else 'place', "display_name": name, "importance": 0.5}]
+
+
+def malformed_response(path):
+    """A result with the coordinates missing, as both services occasionally return"""
+    if path == '/search':
+        return [{"lat": None, "lon": None, "addresstype": 'house', "display_name": None}]
+    return {"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": None, "properties": {}}]}
+
+
+def photon_response(found):
+    if not found:
+        return {"type": "FeatureCollection", "features": []}
+    lat, lon, kind, name = found
+    return {"type": "FeatureCollection", "features": [{
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {"name": name, "type": kind, "osm_key": 'building' if kind == 'house' else 'place'}
+    }]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    data = None
+    settings = None
+    stats = None
+
+    def do_GET(self):
+        settings = self.settings
+        with self.stats["lock"]:
+            self.stats["requests"] += 1
+        delay = settings["slow_latency"] if random.random() < settings["slow_rate"] else settings["latency"]
+        time.sleep(delay * random.uniform(0.5, 1.5))
+
+        if random.random() < settings["error_rate"]:
+            self.reply(503, {"error": "Service unavailable"})
+            return
+
+        url = urlparse(self.path)
+        if url.path in ('/search', '/api') and random.random() < settings["malformed_rate"]:
+            self.reply(200, malformed_response(url.path))
+            return
+        query = parse_qs(url.query).get('q', [''])[-1]
+        found = self.data.lookup(query)
+        if url.path == '/search':
+            self.reply(200, nominatim_response(found))
+        elif url.path == '/api':
+            self.reply(200, photon_response(found))
+        else:
+            self.reply(404, {"error": "Not found"})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def start_server(data, port=0, latency=0.02, slow_rate=0.0, slow_latency=3.0, error_rate=0.0, malformed_rate=0.0):
+    """
+    Serve a GeocoderData in a background thread on both /search (Nominatim) and /api (Photon).
+    Returns (server, base_url, stats); call server.shutdown() to stop it.
+    """
+    settings = {"latency": latency, "slow_rate": slow_rate, "slow_latency": slow_latency, "error_rate": error_rate,
+                "malformed_rate": malformed_rate}
+    stats = {"lock": threading.Lock(), "requests": 0}
+    handler = type('BoundHandler', (Handler,), {'data': data, 'settings': settings, 'stats': stats})
+    server = StandinServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a stand-in Nominatim/Photon geocoder")
+    parser.add_argument('addresses', help="JSON object mapping addresses to [lat, lon]")
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="Share of requests that take --slow-latency")
+    parser.add_argument('--slow-latency', type=float, default=3.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help="Share of requests answered with a result without coordinates")
+    args = parser.parse_args()
+
+    with open(args.addresses, 'r', encoding='utf-8') as f:
+        addresses = json.load(f)
+    server, base_url, _ = start_server(GeocoderData(addresses), args.port, args.latency,
+                                       args.slow_rate, args.slow_latency, args.error_rate, args.malformed_rate)
+    print(f"Serving {len(addresses)} addresses at {base_url}/search (Nominatim) and {base_url}/api (Photon)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
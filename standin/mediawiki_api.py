@@ -0,0 +1,182 @@
+# Local stand-in for the fi.wikipedia MediaWiki action API (api.php), for trying out and
+# benchmarking the API-based backends without hitting the real Wikipedia.
+# Usage: python -m standin.mediawiki_api pages.json [--port 8765]
+#   where pages.json maps titles to wikitext, or to {"redirect": "Target title"}
+#   (interlanguage links and primary coordinates can be given to MediaWikiAPI directly, and other
+#   language editions served next to it at /<language>/w/api.php, as for the real site's hosts)
+import argparse
+import json
+import threading
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+MAX_TITLES = 50
+# Interlanguage links per response for lllimit=max; more are continued with llcontinue
+MAX_LANGLINKS = 500
+
+
+class MediaWikiAPI:
+    """The subset of action=query the project uses, answered with formatversion=2 JSON"""
+
+    def __init__(self, pages, langlinks=None, coordinates=None, langlinks_limit=MAX_LANGLINKS):
+        # {title: {language: title}} and {title: (lat, lon)} for prop=langlinks and prop=coordinates
+        self.langlinks = langlinks or {}
+        self.coordinates = coordinates or {}
+        self.langlinks_limit = langlinks_limit
+        self.pages = {}
+        self.redirects = {}
+        for title, content in pages.items():
+            if isinstance(content, dict) and 'redirect' in content:
+                self.redirects[title] = content['redirect']
+            else:
+                self.pages[title] = content
+        self.stats = {"requests": 0, "titles": 0}
+
+    def normalize(self, title):
+        title = title.replace('_', ' ').strip()
+        return title[:1].upper() + title[1:]
+
+    def query(self, params):
+        titles = [t for t in params.get('titles', '').split('|') if t]
+        if len(titles) > MAX_TITLES:
+            return {"error": {"code": "toomanyvalues", "info": f"Too many values supplied for parameter \"titles\". The limit is {MAX_TITLES}."}}
+        self.stats["requests"] += 1
+        self.stats["titles"] += len(titles)
+
+        query = {}
+        normalized = []
+        redirects = []
+        resolved = []
+        for title in titles:
+            normal = self.normalize(title)
+            if normal != title:
+                normalized.append({"fromencoded": False, "from": title, "to": normal})
+            if 'redirects' in params and normal in self.redirects:
+                redirects.append({"from": normal, "to": self.redirects[normal]})
+                normal = self.redirects[normal]
+            resolved.append(normal)
+
+        pages = []
+        for title in dict.fromkeys(resolved):
+            page = self.page(title, params)
+            pages.append(page)
+
+        if normalized:
+            query['normalized'] = normalized
+        if redirects:
+            query['redirects'] = redirects
+        query['pages'] = pages
+        if 'langlinks' in params.get('prop', '').split('|'):
+            more = self.limit_langlinks(pages, params)
+            if more:
+                return {"continue": {"llcontinue": more, "continue": "||"}, "query": query}
+        return {"batchcomplete": True, "query": query}
+
+    def limit_langlinks(self, pages, params):
+        """
+        Keep only the lllimit interlanguage links from llcontinue on, in (pageid, language) order
+        like the real API. Returns the llcontinue value of the next response, or None.
+        """
+        limit = self.langlinks_limit
+        if params.get('lllimit', 'max') != 'max':
+            limit = min(limit, int(params['lllimit']))
+        start = None
+        if params.get('llcontinue'):
+            pageid, lang = params['llcontinue'].split('|')
+            start = (int(pageid), lang)
+        kept = 0
+        more = None
+        for page in sorted(pages, key=lambda p: p.get('pageid', 0)):
+            links = []
+            for link in page.pop('langlinks', []):
+                position = (page['pageid'], link['lang'])
+                if start and position < start:
+                    continue
+                if kept == limit:
+                    more = more or f"{position[0]}|{position[1]}"
+                    continue
+                links.append(link)
+                kept += 1
+            if links:
+                page['langlinks'] = links
+        return more
+
+    def page(self, title, params):
+        if title not in self.pages and title not in self.redirects:
+            return {"ns": 0, "title": title, "missing": True}
+        page = {"pageid": zlib.crc32(title.encode('utf-8')) % 10 ** 8, "ns": 0, "title": title}
+        if title in self.redirects:
+            page["redirect"] = True
+            return page
+        props = params.get('prop', '').split('|')
+        if 'revisions' in props:
+            revision = {"revid": zlib.crc32(self.pages[title].encode('utf-8')), "timestamp": "2024-01-01T00:00:00Z"}
+            if 'content' in params.get('rvprop', ''):
+                revision["slots"] = {"main": {"contentmodel": "wikitext", "content": self.pages[title]}}
+            page["revisions"] = [revision]
+        if 'langlinks' in props and title in self.langlinks:
+            page["langlinks"] = [{"lang": lang, "title": other} for lang, other in sorted(self.langlinks[title].items())]
+        if 'coordinates' in props and title in self.coordinates:
+            lat, lon = self.coordinates[title]
+            page["coordinates"] = [{"lat": lat, "lon": lon, "primary": True, "globe": "earth"}]
+        return page
+
+
+class Handler(BaseHTTPRequestHandler):
+    api = None
+    languages = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/w/api.php':
+            api = self.api
+        elif url.path.endswith('/w/api.php') and url.path.count('/') == 3:
+            api = self.languages.get(url.path.split('/')[1])
+        else:
+            api = None
+        if api is None:
+            self.send_error(404)
+            return
+        params = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        body = json.dumps(api.query(params), ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(pages, port=0, api=None, languages=None):
+    """
+    Start the stand-in API in a background thread, with the {language: MediaWikiAPI} editions
+    of languages at /<language>/w/api.php.
+    Returns (server, api_url); call server.shutdown() to stop it.
+    """
+    handler = type('BoundHandler', (Handler,), {'api': api or MediaWikiAPI(pages), 'languages': languages or {}})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/w/api.php"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a stand-in MediaWiki API from a JSON file of pages")
+    parser.add_argument('pages', help="JSON object mapping titles to wikitext")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with open(args.pages, 'r', encoding='utf-8') as f:
+        pages = json.load(f)
+    server, url = start_server(pages, args.port)
+    print(f"Serving {len(pages)} pages at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+# Local stand-in for fi.wikipedia with a generated set of churches, for end-to-end and
+# throughput testing of the scrapers and CoordinateExtractor without hitting real Wikipedia.
+# Serves the three list pages (with redlinks, rows without links and a multi-table Orthodox
+# page), one article per church using one of the coordinate layouts the extractor knows, and
+# the api.php subset of standin/mediawiki_api.py, plus sv and en APIs (/sv/w/api.php, /en/w/api.php)
+# with interlanguage articles for some of the churches that have no coordinates on their fi page.
+# Latency, 5xx errors and 429s can be injected,
+# and the bandwidth per response capped. Responses are gzipped for clients that accept it.
+# Usage: python -m standin.wikipedia_server [--churches 1000] [--port 8766] [--latency 0.05]
+#            [--error-rate 0.01] [--rate-429 0.01] [--bandwidth-kb 500]
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
+
+from standin.mediawiki_api import MediaWikiAPI
+
+LIST_PAGES = {
+    "Catholic": "Luettelo Suomen katolisista kirkoista",
+    "Orthodox": "Luettelo Suomen ortodoksisista kirkoista",
+    "Lutheran": "Luettelo Suomen luterilaisista kirkoista"
+}
+# Share of the churches per denomination; the rest are Lutheran
+TYPE_SHARES = {"Catholic": 0.02, "Orthodox": 0.10}
+ORTHODOX_DIOCESES = ["Helsingin hiippakunta", "Kuopion ja Karjalan hiippakunta", "Oulun hiippakunta"]
+
+# Coordinate layouts of the articles and how often they occur. 'address_only' pages have
+# just an infobox Sijainti, 'none' pages have neither coordinates nor an address.
+LAYOUTS = [
+    ("coordinatespan", 0.40),
+    ("indicator", 0.15),
+    ("infobox", 0.10),
+    ("wgcoordinates", 0.10),
+    ("geo_meta", 0.05),
+    ("geo_span", 0.05),
+    ("address_only", 0.10),
+    ("none", 0.05)
+]
+
+PLACES = ["Helsinki", "Espoo", "Tampere", "Turku", "Oulu", "Jyväskylä", "Kuopio", "Lahti", "Pori",
+          "Joensuu", "Lappeenranta", "Hämeenlinna", "Vaasa", "Rovaniemi", "Seinäjoki", "Kotka",
+          "Mikkeli", "Porvoo", "Salo", "Kajaani", "Pyhäjärvi", "Ylöjärvi", "Äänekoski", "Inari"]
+STREETS = ["Kirkkokatu", "Kirkkotie", "Puistokatu", "Rantatie", "Kappelintie", "Koulukatu"]
+FILLER = ("<p>Kirkko on rakennettu kivestä ja se vihittiin käyttöön seurakunnan juhlajumalanpalveluksessa. "
+          "Kirkon alttaritaulu ja urut ovat myöhemmältä ajalta, ja kirkkoa on korjattu useaan otteeseen.</p>\n")
+
+
+def dms(value, positive, negative):
+    hemisphere = positive if value >= 0 else negative
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = (value - degrees - minutes / 60) * 3600
+    return f"{degrees}°{minutes:02d}′{seconds:04.1f}″{hemisphere}"
+
+
+def coordinate_text(church):
+    """The coordinate span text; mostly DMS, some pages use decimal minutes or decimal commas"""
+    lat, lon = church["lat"], church["lon"]
+    variant = zlib.crc32(church["title"].encode('utf-8')) % 10
+    if variant == 0:
+        return " ".join(f"{int(abs(v))}°{(abs(v) % 1) * 60:06.3f}′{h}" for v, h in ((lat, 'N'), (lon, 'E')))
+    if variant == 1:
+        return f"{lat:.5f}°N, {lon:.5f}°E".replace('.', ',')
+    return f"{dms(lat, 'N', 'S')}, {dms(lon, 'E', 'W')}"
+
+
+class SyntheticWiki:
+    """Deterministically generated churches and the HTML/wikitext pages describing them"""
+
+    def __init__(self, churches=1000, seed=1, redlink_rate=0.05, page_kb=20, alias_rate=0.02):
+        rng = random.Random(seed)
+        self.filler = FILLER * max(1, page_kb * 1024 // len(FILLER.encode('utf-8')))
+
+        catholic = max(1, round(churches * TYPE_SHARES["Catholic"]))
+        orthodox = max(1, round(churches * TYPE_SHARES["Orthodox"]))
+        layouts, weights = zip(*LAYOUTS)
+
+        self.churches = []
+        self.by_title = {}
+        for i in range(churches):
+            church_type = "Catholic" if i < catholic else "Orthodox" if i < catholic + orthodox else "Lutheran"
+            place = rng.choice(PLACES)
+            kind = "tsasouna" if church_type == "Orthodox" and rng.random() < 0.4 else \
+                "kappeli" if rng.random() < 0.2 else "kirkko"
+            street = f"{rng.choice(STREETS)} {rng.randint(1, 60)}"
+            church = {
+                "title": f"{place} {kind} {i + 1}",
+                "type": church_type,
+                "place": place,
+                "layout": rng.choices(layouts, weights)[0],
+                "lat": round(rng.uniform(60.0, 69.5), 6),
+                "lon": round(rng.uniform(21.5, 30.5), 6),
+                # Half of the address-only pages have just the place name, which is not a detailed address
+                "address": f"{street}, {place}" if rng.random() < 0.5 else place,
+                "reference": rng.random() < 0.2
+            }
+            self.churches.append(church)
+            self.by_title[church["title"]] = church
+
+        # Some churches are linked through a redirect and listed a second time under their
+        # real title, as happens on the real lists
+        self.aliases = {}
+        for church in rng.sample(self.churches, int(churches * alias_rate)):
+            alias = f"{church['title']} (kirkkorakennus)"
+            church["alias"] = alias
+            self.aliases[alias] = church["title"]
+
+        # Rows on the list pages without an article
+        self.redlinks = {church_type: [] for church_type in LIST_PAGES}
+        for church_type in LIST_PAGES:
+            count = sum(1 for c in self.churches if c["type"] == church_type)
+            for j in range(int(count * redlink_rate)):
+                self.redlinks[church_type].append(f"{rng.choice(PLACES)} {church_type.lower()} rukoushuone {j + 1}")
+
+        # Churches without coordinates on their fi page often have them in another language
+        # edition: most get an sv and/or en article, a few of those articles without coordinates
+        for church in self.churches:
+            if church["layout"] not in ("address_only", "none") or rng.random() < 0.3:
+                continue
+            languages = rng.choice([("sv",), ("en",), ("sv", "en")])
+            church["langlinks"] = {lang: f"{church['title']} ({lang})" for lang in languages}
+            church["interlanguage_coordinates"] = rng.random() < 0.9
+
+        self.list_titles = {title: church_type for church_type, title in LIST_PAGES.items()}
+        self._api = None
+        self._language_apis = {}
+
+    def expected(self):
+        """{title: church} of the generated churches, for checking the pipeline's results"""
+        return self.by_title
+
+    def resolve(self, title):
+        """Title of the church an article title or redirect points to"""
+        return self.aliases.get(title, title)
+
+    @staticmethod
+    def link(title):
+        return "/wiki/" + quote(title.replace(' ', '_'))
+
+    def page(self, title, head='', body=''):
+        return (f'<!DOCTYPE html>\n<html lang="fi"><head><meta charset="UTF-8"><title>{title} – Wikipedia</title>\n'
+                f'{head}</head><body><div id="content"><h1 id="firstHeading">{title}</h1>\n'
+                f'<div id="bodyContent">{body}</div></div></body></html>\n')
+
+    def list_page(self, church_type):
+        churches = [c for c in self.churches if c["type"] == church_type]
+        # Spread the redlinks evenly between the churches
+        step = max(1, len(churches) // max(1, len(self.redlinks[church_type])))
+        redlinks = {k * step: title for k, title in enumerate(self.redlinks[church_type])}
+        rows = []
+        duplicates = []
+        for i, church in enumerate(churches):
+            reference = '<sup class="reference"><a href="#cite_note-1">[1]</a></sup>' if church["reference"] else ''
+            title = church.get("alias", church["title"])
+            rows.append(f'<tr><td><a href="{self.link(title)}" title="{title}">{church["title"]}'
+                        f'</a>{reference}</td><td>{church["place"]}</td><td>{1800 + i % 220}</td></tr>')
+            if "alias" in church:
+                duplicates.append(f'<tr><td><a href="{self.link(church["title"])}" title="{church["title"]}">'
+                                  f'{church["title"]}</a></td><td>{church["place"]}</td><td></td></tr>')
+            if i in redlinks:
+                title = redlinks[i]
+                rows.append(f'<tr><td><a href="/w/index.php?title={quote(title.replace(" ", "_"))}&amp;action=edit'
+                            f'&amp;redlink=1" class="new" title="{title} (sivua ei ole)">{title}</a></td>'
+                            f'<td>{church["place"]}</td><td></td></tr>')
+            # And a plain-text row without any link now and then
+            if i % 97 == 50:
+                rows.append(f'<tr><td>{church["place"]}n seurakuntakoti</td><td>{church["place"]}</td><td></td></tr>')
+
+        rows.extend(duplicates)
+
+        header = '<tr><th>Kirkko</th><th>Paikkakunta</th><th>Valmistunut</th></tr>'
+        if church_type == "Orthodox":
+            # The Orthodox list is split into one table per diocese
+            size = -(-len(rows) // len(ORTHODOX_DIOCESES))
+            body = ''.join(
+                f'<h2>{diocese}</h2>\n<table class="wikitable sortable"><tbody>{header}\n'
+                + '\n'.join(rows[j * size:(j + 1) * size]) + '</tbody></table>\n'
+                for j, diocese in enumerate(ORTHODOX_DIOCESES))
+        else:
+            body = f'<table class="wikitable sortable"><tbody>{header}\n' + '\n'.join(rows) + '</tbody></table>\n'
+        return self.page(LIST_PAGES[church_type], body=body)
+
+    def article(self, church):
+        layout = church["layout"]
+        lat, lon = church["lat"], church["lon"]
+        coord_text = coordinate_text(church)
+        coordinatespan = (f'<span id="coordinatespan" class="plainlinksneverexpand">'
+                          f'<a class="external text" href="https://geohack.toolforge.org/">{coord_text}</a></span>')
+
+        head, indicators, infobox_rows, content = '', '', [], ''
+        config = {"wgPageName": church["title"].replace(' ', '_'), "wgContentLanguage": "fi"}
+        if layout == "coordinatespan":
+            content = f'<p>{coordinatespan}</p>'
+        elif layout == "indicator":
+            indicators = (f'<div class="mw-indicators"><div id="mw-indicator-AA-coordinates" class="mw-indicator">'
+                          f'{coordinatespan}</div></div>')
+        elif layout == "infobox":
+            infobox_rows.append(f'<tr><th>Koordinaatit</th><td>{coordinatespan}</td></tr>')
+        elif layout == "wgcoordinates":
+            config["wgCoordinates"] = {"lat": lat, "lon": lon}
+        elif layout == "geo_meta":
+            head = f'<meta name="geo.position" content="{lat};{lon}">\n'
+        elif layout == "geo_span":
+            content = f'<span style="display:none"><span class="geo">{lat}; {lon}</span></span>'
+
+        if layout != "none":
+            infobox_rows.insert(0, f'<tr><th>Sijainti</th><td>{church["address"]}</td></tr>')
+        infobox = (f'<table class="infobox"><tbody><tr><th colspan="2">{church["title"]}</th></tr>'
+                   + ''.join(infobox_rows) + '</tbody></table>')
+        head += f'<script>RLCONF={json.dumps(config, ensure_ascii=False)};</script>\n'
+        return self.page(church["title"], head, indicators + infobox + content + self.filler)
+
+    def wikitext(self, church):
+        text = "{{Kirkko\n| nimi = " + church["title"]
+        if church["layout"] != "none":
+            text += "\n| sijainti = " + church["address"]
+        text += "\n}}\n"
+        if church["layout"] not in ("address_only", "none"):
+            text += f"{{{{Coord|{church['lat']}|{church['lon']}|display=title}}}}\n"
+        return text + "'''" + church["title"] + "''' on kirkko.\n"
+
+    @property
+    def api(self):
+        """MediaWiki API stand-in over the articles' wikitext, built on first use"""
+        if self._api is None:
+            pages = {title: self.wikitext(church) for title, church in self.by_title.items()}
+            pages.update({alias: {"redirect": title} for alias, title in self.aliases.items()})
+            langlinks = {c["title"]: c["langlinks"] for c in self.churches if "langlinks" in c}
+            self._api = MediaWikiAPI(pages, langlinks=langlinks)
+        return self._api
+
+    def language_api(self, language):
+        """MediaWiki API stand-in of another language edition, or None"""
+        if language not in self._language_apis:
+            articles = {c["langlinks"][language]: c for c in self.churches if language in c.get("langlinks", {})}
+            if not articles:
+                return None
+            # The other editions' articles repeat the coordinates, rounded a little differently
+            coordinates = {title: (round(c["lat"], 5), round(c["lon"], 5))
+                           for title, c in articles.items() if c["interlanguage_coordinates"]}
+            self._language_apis[language] = MediaWikiAPI(dict.fromkeys(articles, ''), coordinates=coordinates)
+        return self._language_apis[language]
+
+    def render(self, path):
+        """(status, content type, body) for a /wiki/ path"""
+        title = unquote(path[len('/wiki/'):]).replace('_', ' ')
+        if title in self.list_titles:
+            return 200, 'text/html; charset=UTF-8', self.list_page(self.list_titles[title])
+        # Redirects are served with the target's content, like the real site does
+        church = self.by_title.get(self.resolve(title))
+        if church:
+            return 200, 'text/html; charset=UTF-8', self.article(church)
+        return 404, 'text/html; charset=UTF-8', self.page(title, body='<p>Sivua ei ole.</p>')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without TCP_NODELAY a keep-alive client waits
+    # for the delayed ACK on every response
+    disable_nagle_algorithm = True
+    wiki = None
+    settings = None
+    stats = None
+
+    def handle(self):
+        # Called once per connection; keep-alive connections serve many requests
+        self.count("connections")
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (e.g. a streamed fetch that has what it needs)
+            pass
+
+    def do_GET(self):
+        settings = self.settings
+        if settings["latency"]:
+            time.sleep(random.uniform(0.5, 1.5) * settings["latency"])
+
+        roll = random.random()
+        if roll < settings["rate_429"]:
+            self.count("throttled")
+            self.reply(429, 'text/plain', 'Too many requests', {'Retry-After': str(settings["retry_after"])})
+            return
+        if roll < settings["rate_429"] + settings["error_rate"]:
+            self.count("errors")
+            self.reply(503, 'text/plain', 'Service unavailable')
+            return
+
+        url = urlparse(self.path)
+        language = url.path.split('/')[1] if url.path.count('/') == 3 and url.path.endswith('/w/api.php') else None
+        api = self.wiki.api if url.path == '/w/api.php' else self.wiki.language_api(language) if language else None
+        if api:
+            params = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+            self.count("api")
+            self.reply(200, 'application/json; charset=utf-8', json.dumps(api.query(params), ensure_ascii=False))
+        elif url.path.startswith('/wiki/'):
+            status, content_type, body = self.wiki.render(url.path)
+            self.count("pages" if status == 200 else "not_found")
+            self.reply(status, content_type, body)
+        else:
+            self.count("not_found")
+            self.reply(404, 'text/plain', 'Not found')
+
+    def count(self, key):
+        with self.stats["lock"]:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def reply(self, status, content_type, body, headers=None):
+        body = body.encode('utf-8')
+        headers = dict(headers or {})
+        if self.settings["compress"] and len(body) >= 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, 6)
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        bandwidth = self.settings["bandwidth"]
+        chunk = 16 * 1024 if bandwidth else len(body) or 1
+        sent = 0
+        try:
+            for start in range(0, len(body), chunk):
+                part = body[start:start + chunk]
+                self.wfile.write(part)
+                sent += len(part)
+                if bandwidth:
+                    time.sleep(len(part) / bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        with self.stats["lock"]:
+            self.stats["bytes"] = self.stats.get("bytes", 0) + sent
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def start_server(wiki, port=0, latency=0.0, error_rate=0.0, rate_429=0.0, retry_after=1, bandwidth=None,
+                 compress=True):
+    """
+    Serve a SyntheticWiki in a background thread, at most bandwidth bytes/sec per response,
+    gzip-compressing responses for clients that accept it unless compress is False.
+    Returns (server, base_url, stats); call server.shutdown() to stop it.
+    """
+    settings = {"latency": latency, "error_rate": error_rate, "rate_429": rate_429, "retry_after": retry_after,
+                "bandwidth": bandwidth, "compress": compress}
+    stats = {"lock": threading.Lock()}
+    handler = type('BoundHandler', (Handler,), {'wiki': wiki, 'settings': settings, 'stats': stats})
+    server = StandinServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic fi.wikipedia with generated churches")
+    parser.add_argument('--churches', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean response delay in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument('--page-kb', type=int, default=20, help="Approximate size of an article page")
+    parser.add_argument('--bandwidth-kb', type=float, default=None, help="KiB/sec per response (default unlimited)")
+    parser.add_argument('--no-compress', dest='compress', action='store_false', help="Never gzip the responses")
+    args = parser.parse_args()
+
+    wiki = SyntheticWiki(args.churches, args.seed, page_kb=args.page_kb)
+    bandwidth = args.bandwidth_kb * 1024 if args.bandwidth_kb else None
+    server, base_url, _ = start_server(wiki, args.port, args.latency, args.error_rate, args.rate_429,
+                                       bandwidth=bandwidth, compress=args.compress)
+    print(f"Serving {args.churches} churches at {base_url}/wiki/ (api at {base_url}/w/api.php)")
+    print(f"Scrape it with: python main.py --base-url {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
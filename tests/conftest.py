@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.request_controller import configure_controller
+
+
+@pytest.fixture
+def local_controller():
+    """A request controller without the pacing meant for the real Wikipedia, for stand-in servers"""
+    return configure_controller(initial_rate=1000, max_rate=1000, initial_concurrency=4, max_concurrency=4)
@@ -0,0 +1,38 @@
+import json
+import time
+
+from church_service import ChurchIndex, ChurchService
+
+CHURCHES = [
+    {"name": "Helsingin tuomiokirkko", "type": "Lutheran", "coordinates": {"lat": 60.1704, "lon": 24.9522}},
+    {"name": "Turun tuomiokirkko", "type": "Lutheran", "coordinates": {"lat": 60.4526, "lon": 22.2784}},
+    {"name": "Uspenskin katedraali", "type": "Orthodox", "coordinates": {"lat": 60.1685, "lon": 24.9600}},
+    {"name": "Paikaton kirkko", "type": "Lutheran"},
+]
+
+
+def service(tmp_path):
+    path = tmp_path / "churches.json"
+    path.write_text(json.dumps(CHURCHES), encoding="utf-8")
+    return ChurchService(str(path))
+
+
+def test_huge_bbox_is_answered_quickly():
+    index = ChurchIndex(CHURCHES)
+    start = time.perf_counter()
+    found = index.bbox(-1e9, -1e9, 1e9, 1e9)
+    assert time.perf_counter() - start < 1
+    assert sorted(found) == [0, 1, 2]
+    assert index.bbox(60.0, 24.9, 60.2, 25.0) == [0, 2]
+    assert index.bbox(10, 10, 11, 11) == []
+
+
+def test_non_finite_parameters_are_rejected(tmp_path):
+    svc = service(tmp_path)
+    for target in ("/churches/bbox?min_lat=-inf&min_lon=-inf&max_lat=inf&max_lon=inf",
+                   "/churches/bbox?min_lat=nan&min_lon=0&max_lat=1&max_lon=1",
+                   "/churches/bbox?min_lat=-1e308&min_lon=0&max_lat=1e308&max_lon=1",
+                   "/churches/nearest?lat=inf&lon=24"):
+        status, _, body = svc.respond(target)
+        assert status == 400, target
+        assert "error" in json.loads(body)
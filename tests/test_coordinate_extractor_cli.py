@@ -0,0 +1,27 @@
+import pytest
+
+from coordinate_extractor import main
+from standin.wikipedia_server import SyntheticWiki
+
+
+def test_test_mode_reads_a_saved_page(tmp_path, capsys):
+    wiki = SyntheticWiki(20, page_kb=1)
+    church = next(c for c in wiki.churches if c["layout"] == "coordinatespan")
+    page = tmp_path / "page.html"
+    page.write_text(wiki.article(church), encoding='utf-8')
+
+    main(['--test', str(page)])
+    out = capsys.readouterr().out
+    assert "Method 1 (span id='coordinatespan'): SUCCESS" in out
+    assert f"Lat: {church['lat']:.3f}" in out
+
+
+@pytest.mark.parametrize("argv", [
+    ['--queue', 'a.db', '--queue-worker', 'b.db'],
+    ['--address-backend', 'xml'],
+    ['--workers', 'many'],
+])
+def test_invalid_arguments_are_rejected(argv):
+    with pytest.raises(SystemExit) as error:
+        main(argv)
+    assert error.value.code == 2
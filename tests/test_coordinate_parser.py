@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+from utils.coordinate_parser import parse_coordinate, parse_many, to_decimal
+
+LAT = 60 + 9 / 60 + 33.2 / 3600
+LON = 24 + 57 / 60 + 15 / 3600
+
+FORMATS = [
+    # Degrees, minutes and seconds, with Unicode, ASCII and doubled-prime marks
+    ("60°09′33.2″N, 24°57′15″E", LAT, LON, "DMS"),
+    ("60°09'33.2\"N 24°57'15\"E", LAT, LON, "DMS"),
+    ("60°09′33,2″N 24°57′15″E", LAT, LON, "DMS"),
+    ("60°09′33.2′′N 24°57′15′′E", LAT, LON, "DMS"),
+    ("33°51′35.9″S 151°12′40″E", -(33 + 51 / 60 + 35.9 / 3600), 151 + 12 / 60 + 40 / 3600, "DMS"),
+    # Degrees and (decimal) minutes
+    ("60°09′N 24°57′E", 60.15, 24.95, "DM"),
+    ("60°09.553′N 24°57.250′E", 60 + 9.553 / 60, 24 + 57.25 / 60, "DM"),
+    # Decimal degrees with hemispheres, also with decimal commas
+    ("60.1592°N, 24.9542°E", 60.1592, 24.9542, "decimal"),
+    ("60,1592°N, 24,9542°E", 60.1592, 24.9542, "decimal"),
+    ("40.7128°N 74.0060°W", 40.7128, -74.006, "decimal"),
+    # Plain pairs: geo microformat, geo.position, wgCoordinates
+    ("60.1592; 24.9542", 60.1592, 24.9542, "decimal"),
+    ("60.1592;24.9542", 60.1592, 24.9542, "decimal"),
+    ("60,1592; 24,9542", 60.1592, 24.9542, "decimal"),
+    ("60,1592 24,9542", 60.1592, 24.9542, "decimal"),
+    ("60.1592 24.9542", 60.1592, 24.9542, "decimal"),
+    ("wgCoordinates: 61.29861, 25.68187", 61.29861, 25.68187, "decimal"),
+    ("-33.8688; 151.2093", -33.8688, 151.2093, "decimal"),
+    ("60; 25", 60.0, 25.0, "decimal"),
+]
+
+
+@pytest.mark.parametrize("text, lat, lon, fmt", FORMATS)
+def test_formats(text, lat, lon, fmt):
+    coords = parse_coordinate(text)
+    assert coords["lat"] == pytest.approx(lat)
+    assert coords["lon"] == pytest.approx(lon)
+    assert coords["format"] == fmt
+
+
+@pytest.mark.parametrize("text, lat", [
+    # Stray numbers before the coordinates are not a pair
+    ("1 2 60°09′33″N 24°57′15″E", 60 + 9 / 60 + 33 / 3600),
+    ("Rakennettu 1912 ja 1950 60°09′N 24°57′E", 60.15),
+    # The first match is out of range, the next one is used
+    ("95°00′N 10°00′E 60°09′N 24°57′E", 60.15),
+    ("99.5; 200.1 60.1592; 24.9542", 60.1592),
+])
+def test_first_valid_pair(text, lat):
+    assert parse_coordinate(text)["lat"] == pytest.approx(lat)
+
+
+@pytest.mark.parametrize("text", [
+    "", None, "1 2", "1912 1950", "60°70′N 24°57′E", "95.0; 10.0", "Ei koordinaatteja",
+])
+def test_no_coordinates(text):
+    assert parse_coordinate(text) is None
+
+
+def test_original_is_the_matched_text():
+    assert parse_coordinate("Koordinaatit: 60°09′N, 24°57′E ")["original"] == "60°09′N, 24°57′E"
+
+
+def test_to_decimal():
+    assert to_decimal("60°09′33.2″N") == pytest.approx(LAT)
+    assert to_decimal("74°0′21.6″W") == pytest.approx(-74.006)
+    assert to_decimal("ei") is None
+
+
+def test_parse_many_agrees_with_parse_coordinate():
+    texts = [text for text, *_ in FORMATS] + [
+        "1 2 60°09′33″N 24°57′15″E", "95°00′N 10°00′E 60°09′N 24°57′E", "1 2", "60°70′N 24°57′E", "", None]
+    frame = parse_many(texts)
+    assert len(frame) == len(texts)
+    for text, lat, lon, fmt in zip(texts, frame["lat"], frame["lon"], frame["format"]):
+        coords = parse_coordinate(text)
+        if coords is None:
+            assert math.isnan(lat) and math.isnan(lon)
+        else:
+            assert (lat, lon, fmt) == (pytest.approx(coords["lat"]), pytest.approx(coords["lon"]), coords["format"])
@@ -0,0 +1,61 @@
+import bz2
+from xml.sax.saxutils import escape
+
+import pytest
+
+from utils.dump_ingest import DumpIngester, is_church_article
+
+INFOBOX = "{{{{Kirkko\n| nimi = {0}\n| sijainti = Kirkkotie 1, Kaupunki\n}}}}\n{{{{Coord|{1}|{2}|display=title}}}}\n"
+
+
+def page(title, text, ns=0):
+    return (f"<page><title>{escape(title)}</title><ns>{ns}</ns>"
+            f"<revision><text>{escape(text)}</text></revision></page>\n")
+
+
+def list_page(titles):
+    rows = "".join(f"|-\n| [[{title}]] || Kaupunki\n" for title in titles)
+    return page("Luettelo Suomen katolisista kirkoista", '{| class="wikitable"\n! Nimi !! Kunta\n' + rows + "|}\n")
+
+
+def write_dump(path, pages):
+    xml = '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">\n' + "".join(pages) + "</mediawiki>\n"
+    with bz2.open(path, 'wt', encoding='utf-8') as f:
+        f.write(xml)
+    return str(path)
+
+
+@pytest.fixture
+def churches(tmp_path):
+    """Listed: an article, a redirect to an article, a plain article without infobox and a redlink"""
+    pages = [
+        # Passed before the list page: a redirect and an article that is not recognizably a church
+        page("Vanha nimi", "#OHJAUS [[Pyhän Henrikin kirkko]]"),
+        page("Kappeli", "Pieni kappeli ilman tietolaatikkoa."),
+        page("Jokin muu", "Artikkeli, jossa mainitaan kirkko mutta ei tietolaatikkoa."),
+        list_page(["Pyhän Marian kirkko", "Vanha nimi", "Kappeli", "Olematon kirkko"]),
+        page("Pyhän Marian kirkko", INFOBOX.format("Pyhän Marian kirkko", 60.1, 24.9)),
+        page("Pyhän Henrikin kirkko", INFOBOX.format("Pyhän Henrikin kirkko", 61.5, 23.8)),
+    ]
+    ingester = DumpIngester(write_dump(tmp_path / "dump.xml.bz2", pages))
+    return ingester, ingester.run()["Catholic"]
+
+
+def test_redlinks_are_dropped(churches):
+    ingester, result = churches
+    titles = [church["wikipedia_link"].rsplit('/', 1)[-1] for church in result]
+    assert titles == ["Pyh%C3%A4n_Marian_kirkko", "Vanha_nimi", "Kappeli"]
+    assert ingester.stats["redlinks"] == 1
+
+
+def test_redirect_before_list_page_is_resolved(churches):
+    ingester, result = churches
+    by_name = {church["name"]: church for church in result}
+    assert by_name["Vanha nimi"]["coordinates"]["lat"] == pytest.approx(61.5)
+    assert by_name["Pyhän Marian kirkko"]["coordinates"]["lat"] == pytest.approx(60.1)
+    assert ingester.stats["second_pass_pages"] > 0
+
+
+def test_prefilter():
+    assert is_church_article(INFOBOX.format("Kirkko", 60, 24))
+    assert not is_church_article("Artikkeli, jossa mainitaan kirkko. {{Lähteet}}")
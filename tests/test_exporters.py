@@ -0,0 +1,31 @@
+import json
+import logging
+
+import pytest
+
+from utils import exporters
+
+CHURCHES = [
+    {"name": "Testikirkko", "type": "Lutheran", "wikipedia_link": "https://fi.wikipedia.org/wiki/Testikirkko",
+     "coordinates": {"lat": 60.17, "lon": 24.94, "format": "decimal", "original": "60.17, 24.94", "method": "html"}},
+    {"name": "Paikaton kirkko", "type": "Lutheran", "wikipedia_link": "https://fi.wikipedia.org/wiki/Paikaton"},
+]
+
+
+def test_geoparquet_uses_the_default_crs(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "churches.parquet")
+    exporters.export_geoparquet(CHURCHES, path)
+    geo = json.loads(pq.read_schema(path).metadata[b'geo'])
+    # A missing "crs" means OGC:CRS84; null would mean an undefined CRS
+    assert "crs" not in geo["columns"]["geometry"]
+    assert exporters.load_geoparquet(path)[0]["coordinates"]["lat"] == 60.17
+
+
+def test_missing_library_is_logged(tmp_path, monkeypatch, capsys, caplog):
+    monkeypatch.setattr(exporters, "msgpack", None)
+    with caplog.at_level(logging.INFO):
+        written = exporters.export_all(CHURCHES, str(tmp_path / "churches.json"), formats=["geojson", "msgpack"])
+    assert written == [str(tmp_path / "churches.geojson")]
+    assert "Skipping msgpack export" in caplog.text
+    assert "Skipping" not in capsys.readouterr().out
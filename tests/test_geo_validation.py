@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from utils.geo_validation import DEFAULT_BOUNDARY_FILE, PolygonIndex
+
+# Towns on both banks of the Torne and Muonio rivers
+SWEDEN = {
+    "Haparanda": (65.8355, 24.1368),
+    "Övertorneå": (66.388, 23.654),
+    "Pajala": (67.21, 23.37),
+    "Karesuando": (68.44, 22.48),
+}
+FINLAND = {
+    "Tornio": (65.848, 24.146),
+    "Ylitornio": (66.318, 23.672),
+    "Pello": (66.775, 23.967),
+    "Kolari": (67.331, 23.783),
+    "Muonio": (67.958, 23.681),
+    "Karesuvanto": (68.4436, 22.4958),
+    "Kilpisjärvi": (69.047, 20.79),
+}
+
+
+@pytest.fixture(scope='module')
+def boundary():
+    return PolygonIndex.from_file(DEFAULT_BOUNDARY_FILE)
+
+
+@pytest.mark.parametrize("towns, inside", [(SWEDEN, False), (FINLAND, True)], ids=["sweden", "finland"])
+def test_western_border(boundary, towns, inside):
+    lat, lon = np.array(list(towns.values())).T
+    result = dict(zip(towns, boundary.contains(lat, lon)))
+    assert result == {name: inside for name in towns}
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+from standin.geocoders import GeocoderData, start_server
+from utils.geocoding import HedgedGeocoder, NominatimProvider, PhotonProvider
+from utils.request_controller import configure_controller
+
+ADDRESS = "Kirkkokatu 2, 00170 Helsinki"
+KNOWN = {ADDRESS: (60.1705, 24.9522)}
+PLACES = {"Helsinki": (60.1699, 24.9384), "Oulu": (65.0121, 25.4651)}
+
+
+@pytest.fixture(autouse=True)
+def controller():
+    # No retries, so a failing stand-in answers at once
+    return configure_controller(initial_rate=1000, max_rate=1000, initial_concurrency=8, max_concurrency=8,
+                                max_retries=0)
+
+
+@pytest.fixture
+def servers():
+    """start(**settings) -> base url of a stand-in geocoder; all are shut down afterwards"""
+    started = []
+
+    def start(data=None, **settings):
+        server, base_url, stats = start_server(data or GeocoderData(KNOWN, PLACES), **dict({"latency": 0.0}, **settings))
+        started.append(server)
+        return base_url, stats
+
+    yield start
+    for server in started:
+        server.shutdown()
+
+
+def test_fast_first_provider_is_not_hedged(servers):
+    first, _ = servers()
+    second, second_stats = servers()
+    hedged = HedgedGeocoder([NominatimProvider(first + '/search'), PhotonProvider(second + '/api')], hedge_after=0.5)
+    result = hedged.geocode(ADDRESS)
+    hedged.close()
+    assert result["provider"] == "nominatim"
+    assert result["quality"] == "building"
+    assert hedged.stats["hedged"] == 0
+    assert second_stats["requests"] == 0
+
+
+def test_hedge_fires_after_hedge_after(servers):
+    slow, _ = servers(latency=2.0)
+    fast, _ = servers()
+    hedged = HedgedGeocoder([NominatimProvider(slow + '/search'), PhotonProvider(fast + '/api')], hedge_after=0.2)
+    start = time.monotonic()
+    result = hedged.geocode(ADDRESS)
+    elapsed = time.monotonic() - start
+    hedged.close()
+    assert result["provider"] == "photon"
+    assert hedged.stats["hedged"] == 1
+    assert 0.2 <= elapsed < 0.9
+
+
+def test_falls_back_to_best_result_below_quality(servers):
+    # The first knows only the municipality, the second nothing at all
+    first, _ = servers(GeocoderData({}, PLACES))
+    second, second_stats = servers(GeocoderData({}, {}))
+    hedged = HedgedGeocoder([NominatimProvider(first + '/search'), PhotonProvider(second + '/api')],
+                            hedge_after=5.0, min_quality="street")
+    result = hedged.geocode(ADDRESS)
+    hedged.close()
+    # Both were asked before settling for the municipality
+    assert second_stats["requests"] == 1
+    assert result["provider"] == "nominatim"
+    assert result["quality"] == "municipality"
+    assert hedged.stats["below_quality"] == 1
+    assert hedged.stats["found"] == 1
+
+
+def test_total_timeout(servers):
+    first, _ = servers(latency=3.0)
+    second, _ = servers(latency=3.0)
+    hedged = HedgedGeocoder([NominatimProvider(first + '/search'), PhotonProvider(second + '/api')],
+                            hedge_after=0.1, total_timeout=0.5)
+    start = time.monotonic()
+    result = hedged.geocode(ADDRESS)
+    elapsed = time.monotonic() - start
+    hedged.close()
+    assert result is None
+    assert elapsed < 1.0
+    assert hedged.stats["hedged"] == 1
+    assert hedged.stats["not_found"] == 1
+
+
+def test_failing_provider_moves_on_at_once(servers):
+    failing, _ = servers(error_rate=1.0)
+    working, _ = servers()
+    nominatim = NominatimProvider(failing + '/search')
+    hedged = HedgedGeocoder([nominatim, PhotonProvider(working + '/api')], hedge_after=5.0)
+    start = time.monotonic()
+    result = hedged.geocode(ADDRESS)
+    hedged.close()
+    assert time.monotonic() - start < 1.0
+    assert result["provider"] == "photon"
+    assert nominatim.stats["errors"] == 1
+    assert hedged.stats["hedged"] == 0
+
+
+@pytest.mark.parametrize("provider, path", [(PhotonProvider, '/api'), (NominatimProvider, '/search')])
+def test_malformed_answer_is_a_provider_error(servers, provider, path):
+    broken, _ = servers(malformed_rate=1.0)
+    working, _ = servers()
+    first = provider(broken + path)
+    assert first.geocode(ADDRESS) is None
+    assert first.stats["errors"] == 1
+
+    hedged = HedgedGeocoder([first, NominatimProvider(working + '/search')], hedge_after=5.0)
+    result = hedged.geocode(ADDRESS)
+    hedged.close()
+    assert result["lat"] == pytest.approx(60.1705)
+    assert first.stats["errors"] == 2
@@ -0,0 +1,66 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from utils.http_transport import Transport
+
+
+class RedirectingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/wiki/Vanha_nimi':
+            self.send_response(301)
+            self.send_header('Location', '/wiki/Uusi_nimi')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.path.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RedirectingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(params=[False, True], ids=['http1', 'http2'])
+def transport(request):
+    if request.param:
+        pytest.importorskip("httpx")
+        pytest.importorskip("h2")
+    transport = Transport(http2=request.param)
+    assert transport.http2 == request.param
+    yield transport
+    transport.close()
+
+
+@pytest.mark.parametrize("timeout", [5.0, 5, (2.0, 5.0), None])
+def test_timeouts(transport, base_url, timeout):
+    response = transport.request('GET', base_url + '/wiki/Kirkko', timeout=timeout)
+    assert response.status_code == 200
+    assert response.content == b'/wiki/Kirkko'
+
+
+def test_redirects_are_followed(transport, base_url):
+    response = transport.request('GET', base_url + '/wiki/Vanha_nimi')
+    assert response.status_code == 200
+    assert response.url == base_url + '/wiki/Uusi_nimi'
+    assert response.content == b'/wiki/Uusi_nimi'
+
+
+def test_redirects_can_be_left_to_the_caller(transport, base_url):
+    response = transport.request('GET', base_url + '/wiki/Vanha_nimi', allow_redirects=False)
+    assert response.status_code == 301
+    assert response.headers['Location'] == '/wiki/Uusi_nimi'
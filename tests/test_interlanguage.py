@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from coordinate_extractor import CoordinateExtractor
+from standin.mediawiki_api import MediaWikiAPI, start_server as start_api
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.interlanguage import interlanguage_coordinates
+
+
+@pytest.fixture
+def editions():
+    """start(fi_pages, langlinks, {language: coordinates}, **fi options) -> (base url, {edition: MediaWikiAPI})"""
+    servers = []
+
+    def start(titles, langlinks, coordinates, **options):
+        apis = {language: MediaWikiAPI(dict.fromkeys(coords, ''), coordinates=coords)
+                for language, coords in coordinates.items()}
+        apis['fi'] = MediaWikiAPI(dict.fromkeys(titles, ''), langlinks=langlinks, **options)
+        server, api_url = start_api({}, api=apis['fi'], languages=apis)
+        servers.append(server)
+        return api_url[:-len('/w/api.php')], apis
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def link(base, title):
+    return f"{base}/wiki/{title.replace(' ', '_')}"
+
+
+def test_langlinks_are_batched(editions, local_controller):
+    titles = [f"Kirkko {i}" for i in range(120)]
+    base, apis = editions(titles, {t: {"sv": f"{t} (sv)"} for t in titles},
+                          {"sv": {f"{t} (sv)": (60.0 + i / 1000, 25.0) for i, t in enumerate(titles)}})
+    found, stats = interlanguage_coordinates([link(base, t) for t in titles])
+    assert len(found) == 120
+    # 50 titles per request, for the langlinks and again for the coordinates
+    assert apis['fi'].stats["requests"] == 3
+    assert apis['sv'].stats["requests"] == 3
+    assert stats["requests"] == 6
+
+
+def test_langlinks_continuation(editions, local_controller):
+    titles = [f"Kirkko {i}" for i in range(12)]
+    langlinks = {t: {"sv": f"{t} (sv)", "en": f"{t} (en)", "de": f"{t} (de)"} for t in titles}
+    base, apis = editions(titles, langlinks, {"en": {f"{t} (en)": (61.0, 24.0) for t in titles}},
+                          langlinks_limit=5)
+    found, stats = interlanguage_coordinates([link(base, t) for t in titles])
+    # 36 links, 5 per response
+    assert apis['fi'].stats["requests"] == 8
+    assert stats["linked"] == 12
+    assert len(found) == 12
+
+
+def test_swedish_before_english(editions, local_controller):
+    langlinks = {
+        "Molemmat": {"sv": "Båda", "en": "Both"},
+        "Ruotsi ilman": {"sv": "Utan koordinater", "en": "English only"},
+        "Englanti": {"en": "English"},
+        "Ei mitään": {"fi": "ignored"},
+    }
+    coordinates = {
+        "sv": {"Båda": (60.1, 24.1)},
+        "en": {"Both": (60.2, 24.2), "English only": (60.3, 24.3), "English": (60.4, 24.4)},
+    }
+    base, apis = editions(list(langlinks), langlinks, coordinates)
+    found, stats = interlanguage_coordinates([link(base, t) for t in langlinks])
+
+    assert found[link(base, "Molemmat")]["source"] == {"language": "sv", "title": "Båda"}
+    assert found[link(base, "Molemmat")]["lat"] == 60.1
+    assert found[link(base, "Ruotsi ilman")]["source"] == {"language": "en", "title": "English only"}
+    assert found[link(base, "Englanti")]["source"] == {"language": "en", "title": "English"}
+    assert link(base, "Ei mitään") not in found
+    # English is only asked about the pages Swedish did not answer
+    assert apis['en'].stats["titles"] == 2
+    assert stats == {"links": 4, "linked": 3, "found": 3, "requests": 3}
+
+
+def test_provenance(editions, local_controller):
+    base, _ = editions(["Kallion kirkko"], {"Kallion kirkko": {"sv": "Berghälls kyrka"}},
+                       {"sv": {"Berghälls kyrka": (60.18375, 24.949167)}})
+    found, _ = interlanguage_coordinates([link(base, "Kallion kirkko")])
+    assert found[link(base, "Kallion kirkko")] == {
+        "lat": 60.18375,
+        "lon": 24.949167,
+        "format": "decimal",
+        "original": "60.18375, 24.949167",
+        "method": "interlanguage",
+        "source": {"language": "sv", "title": "Berghälls kyrka"}
+    }
+
+
+def test_lookups_are_shared_between_extractors(tmp_path, local_controller):
+    wiki = SyntheticWiki(80, page_kb=1, alias_rate=0)
+    linked = [c for c in wiki.churches if c.get("interlanguage_coordinates")]
+    assert linked
+    server, base_url, stats = start_server(wiki)
+    churches = json.dumps([{"name": c["title"], "wikipedia_link": base_url + wiki.link(c["title"])}
+                           for c in wiki.churches])
+    shared_results, shared_interlanguage = {}, {}
+    try:
+        requests = []
+        for name in ("first", "second"):
+            (tmp_path / f"{name}.json").write_text(churches, encoding='utf-8')
+            extractor = CoordinateExtractor(str(tmp_path / f"{name}.json"), str(tmp_path / f"{name}_out.json"),
+                                            export_formats=[], canonicalize=False, shared_results=shared_results,
+                                            shared_interlanguage=shared_interlanguage)
+            before = stats.get("api", 0)
+            extractor.process_churches()
+            requests.append(stats.get("api", 0) - before)
+            assert extractor.method_stats["interlanguage"] == len(linked)
+    finally:
+        server.shutdown()
+
+    assert requests[0] > 0
+    assert requests[1] == 0
+    result = {c["name"]: c for c in json.loads((tmp_path / "second_out.json").read_text(encoding='utf-8'))}
+    for church in linked:
+        assert result[church["title"]]["coordinates"]["method"] == "interlanguage"
@@ -0,0 +1,32 @@
+import json
+
+from utils.negative_cache import NegativeCache, load_manual, merge_manual
+
+MANUAL = [
+    {"name": "Suljettu kappeli", "wikipedia_link": "https://fi.wikipedia.org/wiki/Suljettu_kappeli",
+     "manual_verification": "permanently closed"},
+    {"name": "Testikirkko", "wikipedia_link": "https://fi.wikipedia.org/wiki/Testikirkko",
+     "manual_verification": "address", "address": "Kirkkotie 1, 00100 Helsinki", "detailed_address": True},
+]
+
+
+def write_manual(tmp_path):
+    path = tmp_path / "manual.json"
+    path.write_text(json.dumps(MANUAL), encoding="utf-8")
+    return str(path)
+
+
+def test_only_terminal_entries_are_skipped(tmp_path):
+    cache = NegativeCache(str(tmp_path / "cache.json"), manual_file=write_manual(tmp_path))
+    assert cache.skip(MANUAL[0]["wikipedia_link"])
+    assert not cache.skip(MANUAL[1]["wikipedia_link"])
+
+
+def test_manual_address_is_merged(tmp_path):
+    manual = load_manual(write_manual(tmp_path))
+    churches = [{"name": "Testikirkko", "wikipedia_link": MANUAL[1]["wikipedia_link"]},
+                {"name": "Testikirkko", "wikipedia_link": MANUAL[1]["wikipedia_link"], "address": "Oma osoite 2"}]
+    assert merge_manual(churches, manual) == 1
+    assert churches[0]["address"] == "Kirkkotie 1, 00100 Helsinki"
+    assert churches[0]["detailed_address"] is True
+    assert churches[1]["address"] == "Oma osoite 2"
@@ -0,0 +1,18 @@
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.page_stream import fetch_until_located
+from utils.request_controller import get_controller
+
+
+def test_received_counts_bytes_as_sent(local_controller):
+    wiki = SyntheticWiki(5, page_kb=40)
+    server, base_url, _ = start_server(wiki)
+    try:
+        for church in wiki.churches:
+            url = base_url + SyntheticWiki.link(church["title"])
+            page = get_controller().get(url).content
+            content, stopped, received = fetch_until_located(url)
+            # The stand-in gzips the pages: what came over the wire is the small compressed body,
+            # not the (at least one chunk of) decoded page
+            assert 0 < received < len(page) // 4
+    finally:
+        server.shutdown()
@@ -0,0 +1,34 @@
+import pstats
+
+import pytest
+
+from church_visualizer import main as visualizer_main
+from coordinate_extractor import CoordinateExtractor
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.profiling import profiling, stage
+
+
+def test_cprofile_covers_the_fetch_workers(local_controller, tmp_path):
+    wiki = SyntheticWiki(8)
+    server, base_url, _ = start_server(wiki)
+    extractor = CoordinateExtractor(workers=4, export_formats=[], canonicalize=False, interlanguage=False)
+    targets = [(base_url + SyntheticWiki.link(church["title"]), True) for church in wiki.churches]
+    try:
+        with profiling('cprofile', 'test', str(tmp_path)):
+            with stage("extract"):
+                results = list(extractor.extract_all(targets))
+    finally:
+        server.shutdown()
+    assert len(results) == len(targets)
+
+    prof, = tmp_path.glob("test-*/extract.prof")
+    functions = {(path.rsplit('/', 1)[-1], name) for path, _, name in pstats.Stats(str(prof)).stats}
+    # Parsing happens only in the worker threads
+    assert ('parser.py', 'goahead') in functions
+
+
+@pytest.mark.parametrize("argv", [["--profile-dir"], ["--profile", "bogus"]])
+def test_visualizer_rejects_bad_profiling_arguments(argv):
+    with pytest.raises(SystemExit) as error:
+        visualizer_main(argv)
+    assert error.value.code == 2
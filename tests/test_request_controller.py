@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from utils.request_controller import RequestController
+
+URL = "https://nominatim.example/search"
+
+
+class Response:
+    status_code = 200
+    headers = {}
+
+
+def controller(send, **kwargs):
+    controller = RequestController(initial_rate=1000, max_rate=1000, send=send, backoff_base=0.01, **kwargs)
+    controller.set_host_limit('nominatim.example', max_concurrency=1)
+    return controller
+
+
+def get_within(controller, seconds=2.0):
+    """controller.get(URL) in a thread; fails the test if it is still waiting after seconds"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["response"] = controller.get(URL)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "request still waiting for a host slot"
+    return outcome
+
+
+@pytest.mark.parametrize("error", [requests.TooManyRedirects, requests.exceptions.ChunkedEncodingError,
+                                   requests.exceptions.InvalidURL, RuntimeError])
+def test_other_errors_free_the_slot(error):
+    calls = []
+
+    def send(method, url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            raise error("broken")
+        return Response()
+
+    c = controller(send)
+    with pytest.raises(error):
+        c.get(URL)
+    # Not retried, counted as a failure, and the single slot is free for the next request
+    assert len(calls) == 1
+    state = c.hosts['nominatim.example']
+    assert state.in_flight == 0
+    assert state.stats["errors"] == 1
+    assert get_within(c)["response"].status_code == 200
+
+
+def test_failed_probe_does_not_block_the_host():
+    calls = []
+
+    def send(method, url, **kwargs):
+        calls.append(url)
+        if len(calls) <= 2:
+            raise requests.ConnectionError("down")
+        if len(calls) == 3:
+            raise requests.TooManyRedirects("loop")
+        return Response()
+
+    c = controller(send, max_retries=1, failure_threshold=2, circuit_cooldown=0.1)
+    with pytest.raises(requests.ConnectionError):
+        c.get(URL)
+    state = c.hosts['nominatim.example']
+    assert state.circuit_open_until
+    time.sleep(0.15)
+    # The half-open probe fails with an error that is not retried: the circuit opens again
+    assert isinstance(get_within(c)["error"], requests.TooManyRedirects)
+    assert not state.half_open_probe
+    assert state.in_flight == 0
+    time.sleep(0.15)
+    assert get_within(c)["response"].status_code == 200
@@ -0,0 +1,52 @@
+import gzip
+import json
+
+from utils.wikidata_import import iter_range, merge_wikidata, scan_dump
+
+
+def entity(qid, title, lat=None, lon=None, street=None):
+    claims = {}
+    if lat is not None:
+        claims["P625"] = [{"rank": "normal", "mainsnak": {"snaktype": "value", "datavalue": {"value": {
+            "latitude": lat, "longitude": lon, "globe": "http://www.wikidata.org/entity/Q2"}}}}]
+    if street:
+        claims["P6375"] = [{"rank": "normal", "mainsnak": {"snaktype": "value",
+                                                           "datavalue": {"value": {"text": street, "language": "fi"}}}}]
+    return {"id": qid, "claims": claims, "sitelinks": {"fiwiki": {"site": "fiwiki", "title": title}}}
+
+
+def test_scan_dump_decodes_only_our_churches(tmp_path):
+    entities = [entity("Q1", "Pyhän Marian kirkko", 60.1, 24.9),
+                entity("Q2", "Helsinki", 60.17, 24.94),
+                entity("Q3", "Pyhän Henrikin kirkko", street="Kirkkotie 1")]
+    entities += [entity(f"Q{i}", f"Muu {i}") for i in range(10, 200)]
+    text = "[\n" + ",\n".join(json.dumps(e, ensure_ascii=False) for e in entities) + "\n]\n"
+    compressed = tmp_path / "dump.json.gz"
+    with gzip.open(compressed, 'wt', encoding='utf-8') as f:
+        f.write(text)
+    plain = tmp_path / "dump.json"
+    plain.write_text(text, encoding='utf-8')
+
+    titles = {"Pyhän Marian kirkko", "Pyhän Henrikin kirkko"}
+    expected = {
+        "Pyhän Marian kirkko": {"qid": "Q1", "coordinates": (60.1, 24.9)},
+        "Pyhän Henrikin kirkko": {"qid": "Q3", "street_address": "Kirkkotie 1"},
+    }
+    results = scan_dump(str(compressed), titles)
+    assert results == expected
+    # Many small byte ranges, so entity lines straddle the range boundaries
+    assert scan_dump(str(plain), titles, workers=2, ranges_per_worker=50) == expected
+
+    churches = [{"wikipedia_link": "https://fi.wikipedia.org/wiki/Pyh%C3%A4n_Marian_kirkko", "coordinates": {}}]
+    assert merge_wikidata(churches, results) == {"coordinates": 1, "addresses": 0}
+    assert churches[0]["coordinates"]["source"] == {"provider": "wikidata", "qid": "Q1", "property": "P625"}
+
+
+def test_byte_ranges_cover_every_line_once(tmp_path):
+    path = tmp_path / "lines.json"
+    path.write_bytes(b"".join(b"line %d\n" % i for i in range(100)))
+    size = path.stat().st_size
+    for step in (1, 7, 64, size):
+        offsets = list(range(0, size, step)) + [size]
+        lines = [line for a, b in zip(offsets, offsets[1:]) for line in iter_range(str(path), a, b)]
+        assert lines == [b"line %d\n" % i for i in range(100)]
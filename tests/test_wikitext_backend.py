@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from coordinate_extractor import CoordinateExtractor
+from standin.mediawiki_api import MediaWikiAPI, start_server as start_api
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.wikitext_address import WikitextAddressBackend, extract_page
+
+ARTICLE = ("{{Kirkko\n| nimi = Kallion kirkko\n| osoite = Itäinen Papinkatu 2\n| postinumero = 00530\n"
+           "| kunta = [[Helsinki]]\n}}\n{{Coord|60|11|1.5|N|24|56|57|E|display=title}}\n")
+
+
+def test_extract_page():
+    page = extract_page(ARTICLE)
+    assert page["coordinates"]["lat"] == pytest.approx(60.183750)
+    assert page["coordinates"]["lon"] == pytest.approx(24.949167)
+    assert page["coordinates"]["method"] == "wikitext"
+    assert page["address"] == "Itäinen Papinkatu 2, 00530 Helsinki"
+    assert page["address_fields"] == {"street": "Itäinen Papinkatu", "number": "2", "postcode": "00530",
+                                      "municipality": "Helsinki"}
+
+
+def test_extract_page_without_templates():
+    assert extract_page("'''Kirkko''' on kirkko.") == {"coordinates": None, "address": None, "address_fields": None}
+
+
+def test_fetch_pages_uses_each_links_wiki(local_controller):
+    pages = {f"Kirkko {i}": ARTICLE for i in range(120)}
+    api = MediaWikiAPI(pages)
+    server, api_url = start_api(pages, api=api)
+    try:
+        base = api_url[:-len('/w/api.php')]
+        links = [f"{base}/wiki/Kirkko_{i}" for i in range(120)] + [f"{base}/wiki/Puuttuva_sivu"]
+        backend = WikitextAddressBackend()
+        found = backend.fetch_pages(links)
+    finally:
+        server.shutdown()
+    # 121 titles in batches of 50, the missing page left out
+    assert api.stats["requests"] == 3
+    assert backend.stats["requests"] == 3
+    assert len(found) == 120
+    assert f"{base}/wiki/Puuttuva_sivu" not in found
+
+
+def test_unreachable_api_leaves_pages_out(local_controller):
+    backend = WikitextAddressBackend()
+    assert backend.fetch_pages(["http://127.0.0.1:9/wiki/Kirkko"]) == {}
+
+
+def test_extractor_fetches_html_only_without_coord(tmp_path, local_controller):
+    wiki = SyntheticWiki(60, page_kb=1, alias_rate=0)
+    server, base_url, stats = start_server(wiki)
+    input_file = tmp_path / "churches.json"
+    output_file = tmp_path / "out.json"
+    input_file.write_text(json.dumps([{"name": c["title"], "wikipedia_link": base_url + wiki.link(c["title"])}
+                                      for c in wiki.churches]), encoding='utf-8')
+    try:
+        extractor = CoordinateExtractor(str(input_file), str(output_file), export_formats=[],
+                                        address_backend='wikitext', canonicalize=False, interlanguage=False)
+        extractor.process_churches()
+    finally:
+        server.shutdown()
+
+    without_coord = [c for c in wiki.churches if c["layout"] in ("address_only", "none")]
+    assert without_coord
+    assert stats["api"] == 2
+    assert stats["pages"] == len(without_coord)
+
+    result = {church["name"]: church for church in json.loads(output_file.read_text(encoding='utf-8'))}
+    for church in wiki.churches:
+        found = result[church["title"]]
+        if church["layout"] in ("address_only", "none"):
+            assert not found.get("coordinates")
+        else:
+            assert found["coordinates"]["lat"] == pytest.approx(church["lat"])
+            assert found["coordinates"]["method"] == "wikitext"
+    for church in without_coord:
+        found = result[church["title"]]
+        if church["layout"] == "address_only":
+            assert found["address"] == church["address"]
+            assert found["detailed_address"] == (',' in church["address"])
+        else:
+            assert not found.get("address")
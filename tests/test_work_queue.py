@@ -0,0 +1,127 @@
+import json
+import multiprocessing
+import time
+
+import pytest
+
+from coordinate_extractor import CoordinateExtractor
+from standin.wikipedia_server import SyntheticWiki, start_server
+from utils.scheduler import Budget
+from utils.work_queue import WorkQueue
+
+URLS = [f"https://fi.wikipedia.org/wiki/Kirkko_{i}" for i in range(6)]
+
+# Worker processes are started fresh, as coordinate_extractor.py --queue-worker processes are
+context = multiprocessing.get_context('spawn')
+
+
+def claim_and_crash(path, lease):
+    """Claim every pending page and exit without committing or renewing the leases"""
+    queue = WorkQueue(path, lease)
+    return len(queue.claim(f"crashed-{multiprocessing.current_process().pid}", 100))
+
+
+def claim(path, lease):
+    """Claim every pending page; returns (owner, urls)"""
+    queue = WorkQueue(path, lease)
+    owner = f"worker-{multiprocessing.current_process().pid}"
+    return owner, [url for url, _ in queue.claim(owner, 100)]
+
+
+def complete(path, owner, urls):
+    queue = WorkQueue(path)
+    return [queue.complete(owner, url, {"coordinates": None, "address": owner}) for url in urls]
+
+
+def run(function, *args):
+    with context.Pool(1) as pool:
+        return pool.apply(function, args)
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = WorkQueue(path)
+    queue.enqueue((url, True) for url in URLS)
+    queue.close()
+    return path
+
+
+def test_expired_lease_is_claimed_again(queue_path):
+    assert run(claim_and_crash, queue_path, 0.5) == len(URLS)
+    queue = WorkQueue(queue_path, 0.5)
+    # Still leased by the crashed worker
+    assert queue.claim("survivor", 100) == []
+    time.sleep(0.6)
+    assert sorted(url for url, _ in queue.claim("survivor", 100)) == sorted(URLS)
+    attempts = dict(queue.db.execute("SELECT url, attempts FROM tasks").fetchall())
+    assert set(attempts.values()) == {2}
+
+
+def test_commit_is_idempotent(queue_path):
+    # Two workers end up holding the same pages: the first lease expires before the first worker commits
+    first_owner, first_urls = run(claim, queue_path, 0.3)
+    time.sleep(0.4)
+    second_owner, second_urls = run(claim, queue_path, 0.3)
+    assert sorted(first_urls) == sorted(second_urls) == sorted(URLS)
+    assert first_owner != second_owner
+
+    # Both commit at the same time
+    with context.Pool(2) as pool:
+        committed = pool.starmap(complete, [(queue_path, first_owner, URLS), (queue_path, second_owner, URLS)])
+    winners = [owner for owner, flags in zip((first_owner, second_owner), committed) for flag in flags if flag]
+    assert len(winners) == len(URLS)
+    assert sum(flag for flags in committed for flag in flags) == len(URLS)
+
+    queue = WorkQueue(queue_path)
+    finished = queue.finished_since(0)
+    assert len(finished) == len(URLS)
+    # Each page keeps the result of whoever committed it first
+    assert sorted(result["address"] for _, _, result in finished) == sorted(winners)
+    assert queue.counts() == {"done": len(URLS)}
+
+
+def test_pages_fail_after_max_attempts(queue_path):
+    for _ in range(2):
+        assert run(claim_and_crash, queue_path, 0.2) == len(URLS)
+        time.sleep(0.3)
+    queue = WorkQueue(queue_path, 0.2, max_attempts=2)
+    # Expired for the second time: failed instead of pending
+    assert queue.claim("survivor", 100) == []
+    assert queue.counts() == {"failed": len(URLS)}
+    assert [result for _, _, result in queue.finished_since(0)] == [None] * len(URLS)
+    assert queue.active() == 0
+
+
+def run_budgeted(tmp_path, budget, latency=0.0):
+    """Extract 20 churches of the stand-in through a queue of their own; returns (pages fetched, queue)"""
+    wiki = SyntheticWiki(20, page_kb=1, alias_rate=0)
+    server, base_url, stats = start_server(wiki, latency=latency)
+    input_file = tmp_path / "churches.json"
+    input_file.write_text(json.dumps([{"name": c["title"], "wikipedia_link": base_url + wiki.link(c["title"])}
+                                      for c in wiki.churches]), encoding='utf-8')
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    try:
+        extractor = CoordinateExtractor(str(input_file), str(tmp_path / "out.json"), export_formats=[],
+                                        canonicalize=False, interlanguage=False, queue=queue, budget=budget)
+        extractor.process_churches()
+    finally:
+        server.shutdown()
+    return stats.get("pages", 0), queue
+
+
+def test_time_budget_stops_queue_mode(tmp_path, local_controller):
+    budget = Budget(time_budget=0.5)
+    pages, queue = run_budgeted(tmp_path, budget, latency=0.1)
+    assert budget.exhausted
+    assert 0 < pages < 20
+    # The rest is off the queue, for the next run
+    assert queue.counts() == {"done": pages}
+
+
+def test_request_budget_is_kept_in_queue_mode(tmp_path, local_controller):
+    budget = Budget(max_requests=5)
+    pages, queue = run_budgeted(tmp_path, budget)
+    assert pages == 5
+    assert queue.counts() == {"done": 5}
+    assert budget.exhausted == "5 requests"
@@ -0,0 +1,76 @@
+# Canonical page links for the churches' wikipedia_link values.
+# The scrapers build the links from raw hrefs, so one article can show up percent-encoded or not,
+# under a redirect title, or on more than one list page. Titles are normalized locally and then
+# resolved through the MediaWiki API (normalization and redirects, 50 titles per request), so
+# every variant maps to one canonical link and each article is fetched only once.
+import os
+import sys
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.helpers import title_from_link, link_from_title
+from utils.logging_setup import get_logger
+from utils.mediawiki import MediaWikiClient
+
+logger = get_logger('canonicalize')
+
+
+def wiki_base(link):
+    """https://fi.wikipedia.org part of a link, so stand-in servers keep their own host"""
+    url = urlparse(link)
+    return f"{url.scheme}://{url.netloc}"
+
+
+def normalize_link(link):
+    """The link with only the local title normalization applied (no API lookup)"""
+    return link_from_title(title_from_link(link), wiki_base(link))
+
+
+def canonicalize_links(links, api_url=None, resolve=True):
+    """
+    {link: canonical link} for the given wikipedia_links.
+
+    Without resolve (or if the API cannot be reached) only the local normalization is
+    applied: percent-encoding, underscores, fragments and the first letter's case.
+    Returns (mapping, stats).
+    """
+    stats = {"links": 0, "titles": 0, "redirects": 0, "requests": 0}
+    titles_by_base = defaultdict(dict)
+    for link in dict.fromkeys(links):
+        stats["links"] += 1
+        titles_by_base[wiki_base(link)][link] = title_from_link(link)
+
+    mapping = {}
+    for base, titles in titles_by_base.items():
+        stats["titles"] += len(set(titles.values()))
+        resolved = {}
+        if resolve:
+            client = MediaWikiClient(api_url or f"{base}/w/api.php")
+            try:
+                pages = client.query_titles(titles.values(), {})
+                resolved = {title: page['title'] for title, page in pages.items() if page}
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("Could not resolve redirects through %s, using local normalization: %s",
+                               client.api_url, e)
+            stats["requests"] += client.stats["requests"]
+
+        for link, title in titles.items():
+            canonical = resolved.get(title, title)
+            if canonical != title:
+                stats["redirects"] += 1
+            mapping[link] = link_from_title(canonical, base)
+
+    stats["canonical"] = len(set(mapping.values()))
+    return mapping, stats
+
+
+def group_by_canonical(churches, indexes, mapping):
+    """{canonical link: [church indexes]} in first-seen order"""
+    groups = {}
+    for i in indexes:
+        link = churches[i]['wikipedia_link']
+        groups.setdefault(mapping.get(link, link), []).append(i)
+    return groups
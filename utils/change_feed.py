@@ -0,0 +1,226 @@
+# Versioned snapshots of the final dataset and the change feed between consecutive runs.
+# Each record is stored once under the SHA-256 of its canonical JSON (objects/ab/abcd....json) and
+# a snapshot is a manifest {page key: record hash}, so keeping history costs only the records
+# that changed. The delta against the previous snapshot is a hash join on the page key: records
+# are added, removed, moved more than a threshold, newly geocoded, address changed or otherwise
+# updated. Each delta is written as a church list (JSON plus the usual exports) with a 'change'
+# field per record, and summarized in a feed of one JSON line per version.
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.canonicalize import normalize_link
+from utils.exporters import export_all
+from utils.geo_validation import haversine_km
+
+DEFAULT_INPUT = 'output/churches_with_coordinates_updated_from_addresses.json'
+SNAPSHOT_DIR = 'output/snapshots'
+CHANGES_DIR = 'output/changes'
+MOVE_THRESHOLD_M = 100.0
+# Run bookkeeping that changes on every extraction and is not part of the data
+VOLATILE_FIELDS = {'extraction'}
+KINDS = ["added", "removed", "moved", "geocoded", "address_changed", "updated"]
+
+
+def canonical_record(church):
+    """The record as stored in snapshots, and its canonical JSON bytes"""
+    record = {key: value for key, value in church.items() if key not in VOLATILE_FIELDS}
+    data = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return record, data
+
+
+def keyed_records(churches):
+    """{page key: church}; a page listed more than once gets #2, #3... in list order"""
+    keyed = {}
+    for church in churches:
+        key = normalize_link(church['wikipedia_link']) if church.get('wikipedia_link') else church.get('name', '')
+        unique, n = key, 1
+        while unique in keyed:
+            n += 1
+            unique = f"{key}#{n}"
+        keyed[unique] = church
+    return keyed
+
+
+def has_coordinates(record):
+    coords = (record or {}).get('coordinates') or {}
+    return coords.get('lat') is not None and coords.get('lon') is not None
+
+
+class SnapshotStore:
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self.objects = os.path.join(root, 'objects')
+        self.manifests = os.path.join(root, 'manifests')
+
+    def versions(self):
+        if not os.path.isdir(self.manifests):
+            return []
+        return sorted(int(name[1:-5]) for name in os.listdir(self.manifests)
+                      if name.startswith('v') and name.endswith('.json'))
+
+    def manifest_path(self, version):
+        return os.path.join(self.manifests, f"v{version:06d}.json")
+
+    def object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest + '.json')
+
+    def load_manifest(self, version):
+        with open(self.manifest_path(version), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_record(self, digest):
+        with open(self.object_path(digest), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_object(self, digest, data):
+        """Store a record unless an identical one is already there; True if it was new"""
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return True
+
+    def save(self, churches, source=None):
+        """
+        Snapshot the churches. Returns (version, manifest, new objects); when nothing changed
+        since the latest snapshot, that snapshot is returned and no version is added.
+        """
+        records = {}
+        new_objects = 0
+        for key, church in keyed_records(churches).items():
+            _, data = canonical_record(church)
+            digest = hashlib.sha256(data).hexdigest()
+            new_objects += self.write_object(digest, data)
+            records[key] = digest
+
+        snapshot_id = hashlib.sha256(json.dumps(records, sort_keys=True).encode('utf-8')).hexdigest()
+        versions = self.versions()
+        if versions:
+            latest = self.load_manifest(versions[-1])
+            if latest["id"] == snapshot_id:
+                return versions[-1], latest, 0
+
+        version = (versions[-1] if versions else 0) + 1
+        manifest = {"version": version, "id": snapshot_id, "parent": versions[-1] if versions else None,
+                    "created": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), "source": source,
+                    "records": records}
+        os.makedirs(self.manifests, exist_ok=True)
+        with open(self.manifest_path(version), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        return version, manifest, new_objects
+
+
+def classify(previous, current, threshold_m):
+    """Change kinds between two versions of a record, and the distance moved in metres"""
+    kinds = []
+    distance_m = None
+    if has_coordinates(previous) and has_coordinates(current):
+        old, new = previous['coordinates'], current['coordinates']
+        distance_m = haversine_km(old['lat'], old['lon'], new['lat'], new['lon']) * 1000
+        if distance_m > threshold_m:
+            kinds.append("moved")
+    elif has_coordinates(current):
+        kinds.append("geocoded")
+    if (previous.get('address') or None) != (current.get('address') or None):
+        kinds.append("address_changed")
+    return kinds or ["updated"], distance_m
+
+
+def compute_delta(store, previous, current, threshold_m=MOVE_THRESHOLD_M):
+    """
+    Changed records between two manifests, as churches with a 'change' field. Only records whose
+    hash differs are read back from the store, so the join is one pass over each manifest.
+    """
+    before, after = previous["records"] if previous else {}, current["records"]
+    changes = []
+    for key, digest in after.items():
+        old_digest = before.get(key)
+        if old_digest == digest:
+            continue
+        record = store.load_record(digest)
+        if old_digest is None:
+            kinds, distance_m, old = ["added"], None, None
+        else:
+            old = store.load_record(old_digest)
+            kinds, distance_m = classify(old, record, threshold_m)
+        change = {"kinds": kinds, "key": key}
+        if distance_m is not None:
+            change["distance_m"] = round(distance_m, 1)
+        if old is not None and "address_changed" in kinds:
+            change["previous_address"] = old.get('address')
+        if old is not None and "moved" in kinds:
+            change["previous_coordinates"] = old['coordinates']
+        changes.append(dict(record, change=change))
+    for key, old_digest in before.items():
+        if key not in after:
+            changes.append(dict(store.load_record(old_digest), change={"kinds": ["removed"], "key": key}))
+    return changes
+
+
+def count_kinds(changes):
+    counts = dict.fromkeys(KINDS, 0)
+    for church in changes:
+        for kind in church["change"]["kinds"]:
+            counts[kind] += 1
+    return counts
+
+
+def record_run(input_file=DEFAULT_INPUT, snapshot_dir=SNAPSHOT_DIR, changes_dir=CHANGES_DIR,
+               threshold_m=MOVE_THRESHOLD_M):
+    """Snapshot input_file and write the delta against the previous snapshot; returns the feed entry"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        churches = json.load(f)
+    store = SnapshotStore(snapshot_dir)
+    versions = store.versions()
+    version, manifest, new_objects = store.save(churches, input_file)
+    if versions and version == versions[-1]:
+        print(f"No changes since snapshot v{version} ({len(manifest['records'])} records)")
+        return None
+
+    previous = store.load_manifest(manifest["parent"]) if manifest["parent"] else None
+    changes = compute_delta(store, previous, manifest, threshold_m)
+    counts = count_kinds(changes)
+
+    os.makedirs(changes_dir, exist_ok=True)
+    delta_file = os.path.join(changes_dir, f"v{version:06d}.json")
+    with open(delta_file, 'w', encoding='utf-8') as f:
+        json.dump(changes, f, ensure_ascii=False, indent=4)
+    export_all(changes, delta_file)
+
+    entry = {"version": version, "parent": manifest["parent"], "created": manifest["created"],
+             "records": len(manifest["records"]), "changed": len(changes), "new_objects": new_objects,
+             "threshold_m": threshold_m, "counts": counts, "delta": delta_file}
+    with open(os.path.join(changes_dir, 'feed.jsonl'), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    print(f"Snapshot v{version}: {len(manifest['records'])} records, {new_objects} new objects stored")
+    if manifest["parent"]:
+        print(f"Changes since v{manifest['parent']}: " + ', '.join(f"{n} {kind}" for kind, n in counts.items()))
+    else:
+        print("First snapshot: every record counts as added")
+    print(f"Delta written to {delta_file}")
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot the dataset and write the changes since the last run")
+    parser.add_argument('input', nargs='?', default=DEFAULT_INPUT)
+    parser.add_argument('--threshold', type=float, default=MOVE_THRESHOLD_M, metavar='METRES',
+                        help="Distance past which changed coordinates count as a move")
+    parser.add_argument('--snapshots', default=SNAPSHOT_DIR)
+    parser.add_argument('--changes', default=CHANGES_DIR, help="Directory of the deltas and feed.jsonl")
+    args = parser.parse_args()
+    record_run(args.input, args.snapshots, args.changes, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Parses the coordinate strings found on Wikipedia pages and stored in the 'original' field:
+# degrees-minutes-seconds (60°09′33.2″N, 24°57′15″E), degrees and minutes with or without decimal
+# minutes (60°09′N / 60°09.55′N), decimal degrees with hemispheres (60.1592°N, 24.9542°E) and plain
+# decimal pairs as in the geo microformat, geo.position or wgCoordinates (60.1592; 24.9542). A plain
+# pair needs a ';' or ', ' between the numbers, or decimals in both, so that stray numbers before the
+# coordinates (1 2 60°09′33″N ...) are not taken for a pair.
+# Decimal commas (60,1592°N) and ASCII ' and " marks are accepted. One precompiled pattern covers
+# every format; parse_many() runs it over a whole column of strings and converts the captured
+# numbers with one NumPy parse and vectorized arithmetic, so the coordinates of the whole dataset can be
+# re-derived from the stored strings without fetching the pages again.
+# Usage: python utils/coordinate_parser.py [input.json] [--write OUTPUT]
+import argparse
+import json
+import os
+import re
+import sys
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import load_churches
+
+NUMBER = r'\d+(?:[.,]\d+)?'
+MINUTE_MARKS = "′'’"
+SECOND_MARKS = '″"”'
+
+
+def _component(name, hemispheres):
+    """Degrees, optional minutes and seconds and an optional hemisphere letter"""
+    return (rf"(?P<{name}_deg>{NUMBER})\s*°\s*"
+            rf"(?:(?P<{name}_min>{NUMBER})\s*[{MINUTE_MARKS}]\s*"
+            rf"(?:(?P<{name}_sec>{NUMBER})\s*(?:[{SECOND_MARKS}]|[{MINUTE_MARKS}]{{2}})\s*)?)?"
+            rf"(?P<{name}_hem>[{hemispheres}])?")
+
+
+PATTERN = re.compile(
+    rf"{_component('lat', 'NS')}[\s,;]*{_component('lon', 'EW')}"
+    # Plain decimal pairs separated by ';' or ', ', or by whitespace alone when both numbers have
+    # decimals (with decimal commas: 60,1592 24,9542)
+    rf"|(?P<dec_lat>-?\d+(?P<dec_frac>[.,]\d+)?)"
+    rf"(?:\s*;\s*|,\s+|(?(dec_frac)\s+(?=-?\d+[.,]\d)|(?!)))(?P<dec_lon>-?{NUMBER})"
+)
+# Positions of the groups in match.groups()
+GROUP = {name: index - 1 for name, index in PATTERN.groupindex.items()}
+NUMBER_GROUPS = tuple(GROUP[name] for name in ('lat_deg', 'lat_min', 'lat_sec', 'lon_deg', 'lon_min', 'lon_sec',
+                                               'dec_lat', 'dec_lon'))
+NO_MATCH = (None,) * PATTERN.groups
+COMPONENT = re.compile(_component('c', 'NSEW'))
+
+
+def _float(value):
+    return float(value.replace(',', '.')) if value else 0.0
+
+
+def _degrees(deg, minutes, seconds, hemisphere):
+    value = _float(deg) + _float(minutes) / 60 + _float(seconds) / 3600
+    return -value if hemisphere in ('S', 'W') else value
+
+
+def _valid(lat, lon, minutes=(), seconds=()):
+    return (-90 <= lat <= 90 and -180 <= lon <= 180 and
+            all(_float(m) < 60 for m in minutes) and all(_float(s) < 60 for s in seconds))
+
+
+def coordinate_format(groups):
+    """'DMS', 'DM' or 'decimal' for the groups of a match"""
+    if groups.get('lat_sec') or groups.get('lon_sec'):
+        return "DMS"
+    if groups.get('lat_min') or groups.get('lon_min'):
+        return "DM"
+    return "decimal"
+
+
+def parse_coordinate(text):
+    """{'lat', 'lon', 'format', 'original'} of the first valid coordinate pair in text, or None"""
+    for match in PATTERN.finditer(text or ''):
+        g = match.groupdict()
+        if g['dec_lat'] is not None:
+            lat, lon = _float(g['dec_lat']), _float(g['dec_lon'])
+        else:
+            lat = _degrees(g['lat_deg'], g['lat_min'], g['lat_sec'], g['lat_hem'])
+            lon = _degrees(g['lon_deg'], g['lon_min'], g['lon_sec'], g['lon_hem'])
+        if _valid(lat, lon, (g['lat_min'], g['lon_min']), (g['lat_sec'], g['lon_sec'])):
+            return {"lat": lat, "lon": lon, "format": coordinate_format(g), "original": match.group(0).strip(' ,;')}
+    return None
+
+
+def to_decimal(text):
+    """Decimal degrees of one component such as 60°09′33.2″N, or None"""
+    match = COMPONENT.search(text or '')
+    if not match:
+        return None
+    g = match.groupdict()
+    return _degrees(g['c_deg'], g['c_min'], g['c_sec'], g['c_hem'])
+
+
+def parse_many(texts):
+    """
+    Parse a column of strings at once. Returns a DataFrame with lat, lon and format per string,
+    in the same order; all three are missing (NaN) where nothing parsed. Only the first match of
+    each string is converted in bulk; strings whose first match is out of range are handed to
+    parse_coordinate, which goes on to the next one.
+    """
+    texts = [text or '' for text in texts]
+    search = PATTERN.search
+    rows = [match.groups() if match else NO_MATCH for match in map(search, texts)]
+    if not rows:
+        return pd.DataFrame({"lat": [], "lon": [], "format": []})
+
+    # Every captured number goes through NumPy's text parser in one call; missing groups are 0
+    numbers = itemgetter(*NUMBER_GROUPS)
+    flat = ' '.join(value or '0' for row in rows for value in numbers(row))
+    lat_deg, lat_min, lat_sec, lon_deg, lon_min, lon_sec, dec_lat, dec_lon = \
+        np.fromstring(flat.replace(',', '.'), sep=' ').reshape(len(rows), len(NUMBER_GROUPS)).T
+    decimal, dms, south, west, has_seconds, has_minutes = np.array(
+        [(row[GROUP['dec_lat']] is not None, row[GROUP['lat_deg']] is not None,
+          row[GROUP['lat_hem']] == 'S', row[GROUP['lon_hem']] == 'W',
+          row[GROUP['lat_sec']] is not None or row[GROUP['lon_sec']] is not None,
+          row[GROUP['lat_min']] is not None or row[GROUP['lon_min']] is not None) for row in rows],
+        dtype=bool).T
+
+    lat = np.where(decimal, dec_lat, lat_deg + lat_min / 60 + lat_sec / 3600)
+    lon = np.where(decimal, dec_lon, lon_deg + lon_min / 60 + lon_sec / 3600)
+    lat = np.where(south, -lat, lat)
+    lon = np.where(west, -lon, lon)
+
+    valid = ((decimal | dms) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180) &
+             (lat_min < 60) & (lon_min < 60) & (lat_sec < 60) & (lon_sec < 60))
+    formats = np.select([~valid, has_seconds, has_minutes], [None, "DMS", "DM"], default="decimal")
+    lat = np.where(valid, lat, np.nan)
+    lon = np.where(valid, lon, np.nan)
+
+    for i in np.flatnonzero((decimal | dms) & ~valid):
+        coords = parse_coordinate(texts[i])
+        if coords:
+            lat[i], lon[i], formats[i] = coords["lat"], coords["lon"], coords["format"]
+
+    return pd.DataFrame({"lat": lat, "lon": lon, "format": formats})
+
+
+def rederive(churches, tolerance=1e-6):
+    """
+    Parse the stored 'original' strings of all churches and put the results in their coordinates.
+    Returns counts of strings parsed, unparsed, and changed by more than tolerance degrees.
+    """
+    stored = [i for i, church in enumerate(churches) if (church.get('coordinates') or {}).get('original')]
+    parsed = parse_many([churches[i]['coordinates']['original'] for i in stored])
+    counts = {"strings": len(stored), "parsed": 0, "unparsed": 0, "changed": 0}
+    for i, lat, lon, fmt in zip(stored, parsed['lat'], parsed['lon'], parsed['format']):
+        coords = churches[i]['coordinates']
+        if np.isnan(lat):
+            counts["unparsed"] += 1
+            continue
+        counts["parsed"] += 1
+        if coords.get('lat') is None or abs(coords['lat'] - lat) > tolerance or abs(coords['lon'] - lon) > tolerance:
+            counts["changed"] += 1
+        coords['lat'], coords['lon'], coords['format'] = float(lat), float(lon), fmt
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-derive the coordinates of the dataset from the stored strings")
+    parser.add_argument('input', nargs='?', default='output/churches_with_coordinates_updated_from_addresses.json')
+    parser.add_argument('--write', metavar='OUTPUT', help="Save the churches with the re-derived coordinates")
+    args = parser.parse_args()
+
+    churches = load_churches(args.input)
+    counts = rederive(churches)
+    print(f"{counts['strings']} stored coordinate strings: {counts['parsed']} parsed "
+          f"({counts['changed']} differ from the stored lat/lon), {counts['unparsed']} not understood")
+    if args.write:
+        with open(args.write, 'w', encoding='utf-8') as f:
+            json.dump(churches, f, ensure_ascii=False, indent=4)
+        print(f"Saved to {args.write}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# Density and coverage-gap rasters of the church coordinates, for overview maps and statistics.
+# All valid coordinates, and separately the ones that only came from geocoding an address, are
+# binned into a lat/lon grid over Finland with one vectorized histogram2d each. The density raster
+# colours cells by church count (log scale); the coverage-gap raster colours occupied cells by the
+# share of churches placed only by geocoding and marks land cells without any church. Both are
+# written as PNG and can be added to a folium map as image overlays, which draw in constant time
+# at overview zoom levels instead of one marker per church.
+import argparse
+import os
+import sys
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.image
+from matplotlib import colormaps
+from branca.element import MacroElement
+from folium.raster_layers import ImageOverlay
+from jinja2 import Template
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import load_churches
+from utils.geo_validation import DEFAULT_BOUNDARY_FILE, PolygonIndex, coordinate_arrays
+
+# (south, north, west, east) of the grid, covering the boundary polygon with a margin
+BOUNDS = (59.5, 70.2, 19.0, 31.7)
+# Cell height and width in degrees; 0.2 x 0.4 is about 22 x 21 km at 62°N
+CELL_DEGREES = (0.2, 0.4)
+GEOCODED_METHOD = 'address_geocoding'
+# Colour of land cells without any church in the coverage-gap raster
+EMPTY_COLOUR = (0.55, 0.55, 0.55, 0.45)
+
+
+class DensityGrid:
+    def __init__(self, bounds=BOUNDS, cell=CELL_DEGREES, boundary_file=DEFAULT_BOUNDARY_FILE):
+        self.bounds = bounds
+        south, north, west, east = bounds
+        self.shape = (int(round((north - south) / cell[0])), int(round((east - west) / cell[1])))
+        self.boundary_file = boundary_file
+        self._boundary = None
+        self._land = None
+
+    @property
+    def boundary(self):
+        if self._boundary is None:
+            self._boundary = PolygonIndex.from_file(self.boundary_file)
+        return self._boundary
+
+    def histogram(self, lat, lon):
+        """Points per cell, row 0 the southernmost; NaN and out-of-bounds points are left out"""
+        south, north, west, east = self.bounds
+        counts, _, _ = np.histogram2d(lat, lon, bins=self.shape, range=[[south, north], [west, east]])
+        return counts
+
+    @property
+    def land(self):
+        """Cells whose centre is inside the boundary polygon"""
+        if self._land is None:
+            south, north, west, east = self.bounds
+            rows, cols = self.shape
+            lat = south + (np.arange(rows) + 0.5) * (north - south) / rows
+            lon = west + (np.arange(cols) + 0.5) * (east - west) / cols
+            lat, lon = np.meshgrid(lat, lon, indexing='ij')
+            self._land = self.boundary.contains(lat.ravel(), lon.ravel()).reshape(self.shape)
+        return self._land
+
+    def map_bounds(self):
+        """[[south, west], [north, east]] as folium wants them"""
+        south, north, west, east = self.bounds
+        return [[south, west], [north, east]]
+
+
+def church_points(churches):
+    """(lat, lon, geocoded) arrays of the churches; geocoded marks positions from an address only"""
+    lat, lon = coordinate_arrays(churches)
+    geocoded = np.array([(church.get('coordinates') or {}).get('method') == GEOCODED_METHOD
+                         for church in churches], dtype=bool)
+    return lat, lon, geocoded
+
+
+def density_rgba(counts, cmap='magma_r'):
+    """RGBA image (north up) of the counts on a log scale, transparent where there are none"""
+    scaled = np.log1p(counts)
+    top = scaled.max()
+    rgba = colormaps[cmap](scaled / top if top else scaled)
+    rgba[..., 3] = np.where(counts > 0, 0.8, 0.0)
+    return np.flipud(rgba)
+
+
+def gap_rgba(counts, geocoded, land, cmap='RdYlGn_r'):
+    """
+    RGBA image (north up) of the share of each cell's churches placed only by geocoding,
+    with land cells that have no church at all in grey
+    """
+    share = np.divide(geocoded, counts, out=np.zeros_like(counts), where=counts > 0)
+    rgba = colormaps[cmap](share)
+    rgba[..., 3] = np.where(counts > 0, 0.8, 0.0)
+    rgba[(counts == 0) & land] = EMPTY_COLOUR
+    return np.flipud(rgba)
+
+
+def rasters(grid, lat, lon, geocoded):
+    """{'density': rgba, 'coverage_gaps': rgba} and the all/geocoded count grids"""
+    counts = grid.histogram(lat, lon)
+    geocoded_counts = grid.histogram(lat[geocoded], lon[geocoded])
+    images = {
+        "density": density_rgba(counts),
+        "coverage_gaps": gap_rgba(counts, geocoded_counts, grid.land)
+    }
+    return images, counts, geocoded_counts
+
+
+def save_png(rgba, path):
+    """Write an RGBA float image as PNG, one pixel per cell"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    matplotlib.image.imsave(path, rgba)
+
+
+def add_overlays(folium_map, images, grid):
+    """Add the rasters to a folium map as image overlays; returns {name: overlay}"""
+    overlays = {}
+    for name, rgba in images.items():
+        # The grid is regular in latitude, the web map in Mercator; reproject the rows
+        overlays[name] = ImageOverlay((rgba * 255).astype(np.uint8), bounds=grid.map_bounds(),
+                                      mercator_project=True, name=name.replace('_', ' ').capitalize(),
+                                      show=name == "density").add_to(folium_map)
+    return overlays
+
+
+class ZoomSwitch(MacroElement):
+    """
+    Shows the overview layers at zoom levels up to max_zoom and the detail layers (e.g. marker
+    clusters) above it. Layers are swapped only when the zoom crosses the threshold, so layers
+    toggled by hand stay as they are within a zoom band.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var overview = [{% for layer in this.overview %}{{ layer.get_name() }},{% endfor %}];
+            var detail = [{% for layer in this.detail %}{{ layer.get_name() }},{% endfor %}];
+            var showing = null;
+            function update() {
+                var wanted = map.getZoom() <= {{ this.max_zoom }} ? 'overview' : 'detail';
+                if (wanted === showing) { return; }
+                showing = wanted;
+                overview.forEach(function(layer) { wanted === 'overview' ? map.addLayer(layer) : map.removeLayer(layer); });
+                detail.forEach(function(layer) { wanted === 'detail' ? map.addLayer(layer) : map.removeLayer(layer); });
+            }
+            map.on('zoomend', update);
+            update();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, overview, detail, max_zoom):
+        super().__init__()
+        self._name = 'ZoomSwitch'
+        self.overview = list(overview)
+        self.detail = list(detail)
+        self.max_zoom = max_zoom
+
+
+def write_rasters(churches, output_dir, grid=None):
+    """Bin the churches' coordinates inside the boundary and write density.png and coverage_gaps.png"""
+    grid = grid or DensityGrid()
+    lat, lon, geocoded = church_points(churches)
+    valid = grid.boundary.contains(lat, lon)
+    images, counts, geocoded_counts = rasters(grid, lat[valid], lon[valid], geocoded[valid])
+    for name, rgba in images.items():
+        save_png(rgba, os.path.join(output_dir, f"{name}.png"))
+    empty = int(((counts == 0) & grid.land).sum())
+    print(f"Rasters of {int(counts.sum())} churches ({int(geocoded_counts.sum())} geocoded) on a "
+          f"{grid.shape[0]}x{grid.shape[1]} grid written to {output_dir}: {int((counts > 0).sum())} occupied "
+          f"cells, {empty} of {int(grid.land.sum())} land cells without a church")
+    return images, grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write density and coverage-gap rasters of the church coordinates")
+    parser.add_argument('input', nargs='?', default='output/churches_with_coordinates_updated_from_addresses.json')
+    parser.add_argument('--output-dir', default='output/statistics')
+    parser.add_argument('--cell', type=float, nargs=2, default=CELL_DEGREES, metavar=('LAT', 'LON'),
+                        help="Cell size in degrees (default: %(default)s)")
+    parser.add_argument('--boundary', default=DEFAULT_BOUNDARY_FILE)
+    args = parser.parse_args()
+
+    write_rasters(load_churches(args.input), args.output_dir, DensityGrid(cell=args.cell, boundary_file=args.boundary))
+
+
+if __name__ == "__main__":
+    main()
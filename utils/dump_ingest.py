@@ -0,0 +1,287 @@
+# Full refresh from a local fiwiki-pages-articles.xml.bz2 dump instead of downloading rendered pages.
+# Streams the dump with incremental bz2 decompression and iterparse, reads the church lists from the
+# three Luettelo_Suomen_*_kirkoista pages and, in the same pass, the {{Coord}} templates and infobox
+# Sijainti fields of the church articles. Memory use stays constant because every <page> element is
+# cleared as soon as it has been read. Listed titles that turn out to be redlinks (no article or
+# redirect anywhere in the dump) are dropped, as the HTML scrapers do; when the list pages come late
+# in the dump, a second pass over the pages before them finds redirects and articles that were passed
+# before the titles were known.
+import argparse
+import bz2
+import json
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.helpers import normalize_title, link_from_title, title_from_link
+from utils.wikitext import COORD_TEMPLATES, find_templates, coord_from_template, strip_markup, wikilink, wikitable_rows
+
+LIST_PAGES = {
+    "Luettelo Suomen katolisista kirkoista": "Catholic",
+    "Luettelo Suomen ortodoksisista kirkoista": "Orthodox",
+    "Luettelo Suomen luterilaisista kirkoista": "Lutheran"
+}
+
+REDIRECT_RE = re.compile(r'#(?:REDIRECT|OHJAUS)\s*\[\[([^\]|#]+)', re.IGNORECASE)
+# A template whose name mentions a church or building; only such pages are parsed with find_templates
+INFOBOX_HINT = re.compile(r'\{\{[^{}|]*(?:kirkko|rakennus)', re.IGNORECASE)
+
+
+def open_dump(dump_path):
+    """Open a dump for streaming, decompressing .bz2 incrementally"""
+    if dump_path.endswith('.bz2'):
+        return bz2.open(dump_path, 'rb')
+    return open(dump_path, 'rb')
+
+
+def iter_pages(dump_path):
+    """Yield (title, namespace, wikitext) for every page of the dump"""
+    with open_dump(dump_path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        namespace = root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
+        page_tag = namespace + 'page'
+
+        for event, elem in context:
+            if event != 'end' or elem.tag != page_tag:
+                continue
+            title = elem.findtext(namespace + 'title') or ''
+            ns = elem.findtext(namespace + 'ns') or '0'
+            text = elem.findtext(f'{namespace}revision/{namespace}text') or ''
+            yield title, ns, text
+            # Drop the parsed page so the tree never grows
+            elem.clear()
+            root.clear()
+
+
+def is_church_article(text):
+    """Articles with a church or building infobox"""
+    head = text[:20000]
+    # The regex scan is cheap; most articles never reach the template parser
+    if not INFOBOX_HINT.search(head):
+        return False
+    for name, _, _ in find_templates(head):
+        lowered = name.lower()
+        if 'kirkko' in lowered or 'rakennus' in lowered:
+            return True
+    return False
+
+
+def extract_article(text):
+    """Coordinates and infobox Sijainti of an article's wikitext"""
+    templates = find_templates(text)
+    result = {}
+
+    for name, positional, named in templates:
+        if name.lower() in COORD_TEMPLATES:
+            coords = coord_from_template(positional)
+            if coords:
+                result['coordinates'] = {
+                    "lat": coords[0],
+                    "lon": coords[1],
+                    "format": "decimal",
+                    "original": '{{' + '|'.join([name] + positional) + '}}',
+                    "method": "dump_coord"
+                }
+                break
+
+    for name, positional, named in templates:
+        if 'sijainti' in named and strip_markup(named['sijainti']):
+            result['address'] = strip_markup(named['sijainti'])
+            break
+
+    return result
+
+
+def churches_from_list_page(text, church_type):
+    """Church entries of a list page's wikitables, like the scrapers produce"""
+    churches = []
+    for cells in wikitable_rows(text):
+        link = wikilink(cells[0])
+        if not link:
+            continue
+        target, label = link
+        churches.append({
+            "name": re.sub(r'\s*\[\d+\]', '', label).strip(),
+            "type": church_type,
+            "wikipedia_link": link_from_title(target),
+            "coordinates": {}
+        })
+    return churches
+
+
+class DumpIngester:
+    def __init__(self, dump_path, known_titles=None, report_every=10000):
+        self.dump_path = dump_path
+        # Titles of churches already scraped; with it only those articles are kept
+        self.known_titles = set(known_titles or [])
+        # Titles linked from the list pages read so far
+        self.listed_titles = set()
+        # Targets of the redirects of known or listed titles
+        self.redirect_targets = set()
+        # Known, listed or redirect target titles that exist as an article or redirect
+        self.seen = set()
+        # Pages read until the last list page; titles listed later may be among them
+        self.prefix_pages = None
+        self.report_every = report_every
+        self.churches_by_type = {}
+        self.articles = {}
+        self.redirects = {}
+        self.stats = {"pages": 0, "articles_kept": 0, "redlinks": 0, "second_pass_pages": 0, "seconds": 0.0}
+
+    def relevant(self, title):
+        return title in self.known_titles or title in self.listed_titles or title in self.redirect_targets
+
+    def wanted(self, title, text):
+        if self.relevant(title):
+            return True
+        # Without a known set the list pages may come later in the dump, so keep every church article
+        return not self.known_titles and is_church_article(text)
+
+    def read_page(self, title, text, titles=None):
+        """
+        Record a redirect or the data of an article. titles limits the pages looked at
+        (second pass); by default any known, listed or church page is.
+        """
+        redirect = REDIRECT_RE.match(text)
+        relevant = title in titles if titles is not None else self.relevant(title)
+        if relevant:
+            self.seen.add(title)
+        if redirect:
+            # Only redirects of listed churches are needed to resolve their links
+            if relevant:
+                target = normalize_title(redirect.group(1))
+                self.redirects[title] = target
+                self.redirect_targets.add(target)
+            return
+        if title in self.articles:
+            return
+        if relevant or (titles is None and self.wanted(title, text)):
+            data = extract_article(text)
+            if data:
+                self.articles[title] = data
+                self.stats["articles_kept"] += 1
+
+    def run(self):
+        start = time.time()
+        pending_lists = set(LIST_PAGES)
+        for title, ns, text in iter_pages(self.dump_path):
+            self.stats["pages"] += 1
+            if self.stats["pages"] % self.report_every == 0:
+                elapsed = time.time() - start
+                print(f"  {self.stats['pages']} pages, {self.stats['pages'] / elapsed:.0f} pages/sec, "
+                      f"{len(self.articles)} church articles")
+
+            if ns != '0':
+                continue
+            title = normalize_title(title)
+
+            if title in LIST_PAGES:
+                church_type = LIST_PAGES[title]
+                self.churches_by_type[church_type] = churches_from_list_page(text, church_type)
+                self.listed_titles.update(title_from_link(c['wikipedia_link'])
+                                          for c in self.churches_by_type[church_type])
+                pending_lists.discard(title)
+                if not pending_lists:
+                    self.prefix_pages = self.stats["pages"]
+                continue
+
+            self.read_page(title, text)
+
+        if self.prefix_pages is None:
+            self.prefix_pages = self.stats["pages"]
+        unresolved = {title for title in self.listed_titles if title not in self.seen and title not in self.articles}
+        if unresolved and self.prefix_pages > 1:
+            self.second_pass(unresolved)
+        self.stats["seconds"] = time.time() - start
+        return self.merge()
+
+    def second_pass(self, titles):
+        """Read the pages before the last list page again for the listed titles not found yet"""
+        print(f"  {len(titles)} listed titles not found after the list pages; "
+              f"rereading the first {self.prefix_pages} pages")
+        pages = 0
+        for title, ns, text in iter_pages(self.dump_path):
+            pages += 1
+            if pages >= self.prefix_pages:
+                break
+            if ns != '0':
+                continue
+            title = normalize_title(title)
+            self.read_page(title, text, titles)
+            # Redirects found now may point to articles that were passed over as well
+            titles |= self.redirect_targets
+        self.stats["second_pass_pages"] = pages
+
+    def exists(self, title):
+        return title in self.seen or title in self.articles
+
+    def merge(self):
+        """Attach the article data to the churches from the list pages, dropping redlinks"""
+        for church_type, churches in self.churches_by_type.items():
+            kept = [church for church in churches if self.exists(title_from_link(church['wikipedia_link']))]
+            self.stats["redlinks"] += len(churches) - len(kept)
+            self.churches_by_type[church_type] = kept
+            for church in kept:
+                title = title_from_link(church['wikipedia_link'])
+                data = self.articles.get(title) or self.articles.get(self.redirects.get(title))
+                if not data:
+                    continue
+                if 'coordinates' in data:
+                    church['coordinates'] = data['coordinates']
+                elif 'address' in data:
+                    church['address'] = data['address']
+                    church['detailed_address'] = bool(',' in data['address'] and re.search(r'\d+', data['address']))
+        return self.churches_by_type
+
+
+def save(churches, output_file):
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(churches, f, ensure_ascii=False, indent=4)
+
+
+def ingest_dump(dump_path, output_dir='output', known_titles=None):
+    """
+    Write the same per-denomination files as main.py and batch_process.py
+    (<type>_churches.json and <type>_churches_with_coordinates.json) from a dump.
+    """
+    print(f"Reading {dump_path}...")
+    ingester = DumpIngester(dump_path, known_titles)
+    churches_by_type = ingester.run()
+
+    for church_type, churches in churches_by_type.items():
+        name = church_type.lower()
+        save([dict(c, coordinates={}) for c in churches], f"{output_dir}/{name}_churches.json")
+        save(churches, f"{output_dir}/{name}_churches_with_coordinates.json")
+        with_coords = sum(1 for c in churches if c.get('coordinates'))
+        print(f"- {church_type}: {len(churches)} churches, {with_coords} with coordinates")
+
+    stats = ingester.stats
+    print(f"\nRead {stats['pages']} pages in {stats['seconds']:.1f}s "
+          f"({stats['pages'] / max(stats['seconds'], 1e-9):.0f} pages/sec), "
+          f"kept {stats['articles_kept']} church articles, dropped {stats['redlinks']} redlinks"
+          + (f", reread {stats['second_pass_pages']} pages" if stats['second_pass_pages'] else ''))
+    return churches_by_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest church lists and coordinates from a fiwiki XML dump")
+    parser.add_argument('dump', help="Path to fiwiki-pages-articles.xml.bz2")
+    parser.add_argument('--output-dir', default='output')
+    parser.add_argument('--known', help="JSON file of already scraped churches; only their articles are read")
+    args = parser.parse_args()
+
+    known_titles = None
+    if args.known:
+        with open(args.known, 'r', encoding='utf-8') as f:
+            known_titles = [title_from_link(c['wikipedia_link']) for c in json.load(f)]
+
+    ingest_dump(args.dump, args.output_dir, known_titles)
+
+
+if __name__ == "__main__":
+    main()
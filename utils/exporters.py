@@ -0,0 +1,251 @@
+# Exports the church lists to GeoParquet, GeoJSON and msgpack next to the JSON files,
+# and loads whichever format is fastest to read.
+# pyarrow and msgpack are optional - formats whose library is missing are skipped.
+import json
+import os
+import struct
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.logging_setup import get_logger
+
+logger = get_logger('export')
+
+# Coordinate fields that get their own column
+COORDINATE_COLUMNS = ['lat', 'lon', 'format', 'original', 'method']
+# Top level fields that get their own column, everything else goes to the "extra" JSON column
+RECORD_COLUMNS = ['name', 'type', 'wikipedia_link', 'address', 'detailed_address']
+
+EXTENSIONS = {
+    'parquet': '.parquet',
+    'msgpack': '.msgpack',
+    'geojson': '.geojson',
+    'json': '.json'
+}
+
+# Formats tried by load_churches, fastest first (see benchmarks/bench_export_formats.py)
+LOAD_ORDER = ['msgpack', 'parquet', 'json']
+
+
+def available_formats():
+    """Export formats whose libraries are installed"""
+    formats = ['geojson']
+    if pa is not None:
+        formats.append('parquet')
+    if msgpack is not None:
+        formats.append('msgpack')
+    return formats
+
+
+def sibling_path(json_path, fmt):
+    """Path of the same dataset in another format, e.g. output/x.json -> output/x.parquet"""
+    return os.path.splitext(json_path)[0] + EXTENSIONS[fmt]
+
+
+def flatten_church(church):
+    """Turn a church record into a flat row for columnar formats"""
+    row = {column: church.get(column) for column in RECORD_COLUMNS}
+    coords = church.get('coordinates') or {}
+    for column in COORDINATE_COLUMNS:
+        row[column] = coords.get(column)
+
+    extra = {k: v for k, v in church.items() if k not in RECORD_COLUMNS and k != 'coordinates'}
+    other_coords = {k: v for k, v in coords.items() if k not in COORDINATE_COLUMNS}
+    if other_coords:
+        extra['coordinates'] = other_coords
+    # Remember keys that were present with a null value, e.g. failed geocoding {"lat": null}
+    null_keys = [k for k in COORDINATE_COLUMNS if k in coords and coords[k] is None]
+    if null_keys:
+        extra['null_coordinate_keys'] = null_keys
+    if 'coordinates' not in church:
+        extra['no_coordinates_field'] = True
+    row['extra'] = json.dumps(extra, ensure_ascii=False) if extra else None
+    return row
+
+
+def unflatten_church(row):
+    """Inverse of flatten_church"""
+    extra = json.loads(row['extra']) if row.get('extra') else {}
+    church = {}
+    for column in RECORD_COLUMNS:
+        if row.get(column) is not None:
+            church[column] = row[column]
+
+    null_keys = extra.pop('null_coordinate_keys', [])
+    coords = {k: row[k] for k in COORDINATE_COLUMNS if row.get(k) is not None or k in null_keys}
+    coords.update(extra.pop('coordinates', {}))
+    if not extra.pop('no_coordinates_field', False):
+        church['coordinates'] = coords
+    church.update(extra)
+    return church
+
+
+def export_geoparquet(churches, path):
+    """Write a GeoParquet file with a WKB point geometry column"""
+    if pa is None:
+        raise ImportError("pyarrow is required for GeoParquet export")
+
+    rows = [flatten_church(church) for church in churches]
+    columns = {column: [row[column] for row in rows] for column in rows[0]} if rows else {}
+
+    arrays = {}
+    for column in RECORD_COLUMNS + COORDINATE_COLUMNS + ['extra']:
+        values = columns.get(column, [])
+        if column in ('type', 'method', 'format'):
+            # Few distinct values, store them dictionary-encoded
+            arrays[column] = pa.array(values, type=pa.string()).dictionary_encode()
+        elif column in ('lat', 'lon'):
+            arrays[column] = pa.array(values, type=pa.float64())
+        elif column == 'detailed_address':
+            arrays[column] = pa.array(values, type=pa.bool_())
+        else:
+            arrays[column] = pa.array(values, type=pa.string())
+
+    geometry = [
+        struct.pack('<BIdd', 1, 1, row['lon'], row['lat'])
+        if isinstance(row['lat'], (int, float)) and isinstance(row['lon'], (int, float)) else None
+        for row in rows
+    ]
+    arrays['geometry'] = pa.array(geometry, type=pa.binary())
+
+    geo_metadata = {
+        "version": "1.0.0",
+        "primary_column": "geometry",
+        "columns": {
+            # No "crs" key: the default is OGC:CRS84 (WGS 84, lon/lat), which is what the points are.
+            # An explicit null would declare the CRS undefined.
+            "geometry": {"encoding": "WKB", "geometry_types": ["Point"]}
+        }
+    }
+    table = pa.table(arrays).replace_schema_metadata({b'geo': json.dumps(geo_metadata).encode('utf-8')})
+    pq.write_table(table, path, compression='zstd')
+
+
+def load_geoparquet(path):
+    if pa is None:
+        raise ImportError("pyarrow is required for GeoParquet import")
+    table = pq.read_table(path, columns=RECORD_COLUMNS + COORDINATE_COLUMNS + ['extra'])
+    return [unflatten_church(row) for row in table.to_pylist()]
+
+
+def export_geojson(churches, path):
+    """Write a GeoJSON FeatureCollection one feature at a time"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for i, church in enumerate(churches):
+            coords = church.get('coordinates') or {}
+            lat, lon = coords.get('lat'), coords.get('lon')
+            geometry = None
+            if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+                geometry = {"type": "Point", "coordinates": [lon, lat]}
+
+            properties = {k: v for k, v in church.items() if k != 'coordinates'}
+            if 'coordinates' in church:
+                properties['coordinates'] = {k: v for k, v in coords.items() if k not in ('lat', 'lon')}
+                properties['coordinate_keys'] = [k for k in coords if k in ('lat', 'lon')]
+
+            feature = {"type": "Feature", "geometry": geometry, "properties": properties}
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(feature, ensure_ascii=False, separators=(',', ':')))
+        f.write('\n]}\n')
+
+
+def load_geojson(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        collection = json.load(f)
+
+    churches = []
+    for feature in collection['features']:
+        church = dict(feature['properties'])
+        if 'coordinates' in church:
+            coords = {}
+            point = (feature.get('geometry') or {}).get('coordinates') or [None, None]
+            for key in church.pop('coordinate_keys', []):
+                coords[key] = point[1] if key == 'lat' else point[0]
+            coords.update(church['coordinates'])
+            church['coordinates'] = coords
+        churches.append(church)
+    return churches
+
+
+def export_msgpack(churches, path):
+    if msgpack is None:
+        raise ImportError("msgpack is required for msgpack export")
+    with open(path, 'wb') as f:
+        f.write(msgpack.packb(churches, use_bin_type=True))
+
+
+def load_msgpack(path):
+    if msgpack is None:
+        raise ImportError("msgpack is required for msgpack import")
+    with open(path, 'rb') as f:
+        return msgpack.unpackb(f.read(), raw=False)
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+EXPORTERS = {
+    'parquet': export_geoparquet,
+    'geojson': export_geojson,
+    'msgpack': export_msgpack
+}
+
+LOADERS = {
+    'parquet': load_geoparquet,
+    'geojson': load_geojson,
+    'msgpack': load_msgpack,
+    'json': load_json
+}
+
+
+def export_all(churches, json_path, formats=None):
+    """Write the churches in every available format next to json_path"""
+    formats = available_formats() if formats is None else formats
+    written = []
+    for fmt in formats:
+        if fmt not in available_formats():
+            logger.info("Skipping %s export: required library is not installed", fmt)
+            continue
+        path = sibling_path(json_path, fmt)
+        EXPORTERS[fmt](churches, path)
+        written.append(path)
+    return written
+
+
+def load_churches(json_path):
+    """
+    Load a church list from the fastest available format.
+
+    Binary siblings are only used when they are at least as new as the JSON file,
+    so a JSON file edited by hand always wins over a stale export.
+    """
+    json_mtime = os.path.getmtime(json_path) if os.path.exists(json_path) else None
+
+    for fmt in LOAD_ORDER:
+        path = sibling_path(json_path, fmt)
+        if not os.path.exists(path):
+            continue
+        if fmt != 'json' and json_mtime is not None and os.path.getmtime(path) < json_mtime:
+            continue
+        try:
+            return LOADERS[fmt](path)
+        except ImportError:
+            continue
+
+    raise FileNotFoundError(json_path)
@@ -1,86 +1,134 @@
-import requests
+import argparse
 import json
 import os
+import sys
 
-def get_coordinates_from_address(address):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import export_all
+from utils.geocoding import HedgedGeocoder, build_providers, NOMINATIM_URL, PHOTON_URL
+from utils.logging_setup import get_logger, add_logging_arguments, setup_from_args
+from utils.profiling import add_profiling_arguments, profiling_from_args, stage
+
+logger = get_logger('geocoding')
+
+_default_geocoder = None
+
+
+def get_geocoder():
+    """Nominatim with a timeout, hedged to Photon when it is slow"""
+    global _default_geocoder
+    if _default_geocoder is None:
+        _default_geocoder = HedgedGeocoder(build_providers(['nominatim', 'photon']))
+    return _default_geocoder
+
+
+def get_coordinates_from_address(address, geocoder=None):
     """
-    Main function that retrieves latitude and longitude from an address using OSM Nominatim API.
+    Retrieve latitude and longitude for an address from the geocoding providers.
 
     Parameters:
     address (str): The street address to geocode
+    geocoder (HedgedGeocoder): Providers to ask; defaults to Nominatim with Photon as backup
 
     Returns:
     tuple: (latitude, longitude) if found, otherwise None
     """
-    # Format the address for a URL
-    headers = {
-        'User-Agent': 'CoordinatesApp/1.0',  # Replace with your app name - required by Nominatim usage policy
-        'Accept-Language': 'en'  # Optional - language preference for results
-    }
+    result = geocode_address(address, geocoder)
+    return (result['lat'], result['lon']) if result else None
 
-    # Create the API URL
-    base_url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        'q': address,
-        'format': 'json',
-        'limit': 1
-    }
 
-    try:
-        # Helper function that makes the actual HTTP request
-        response = requests.get(base_url, params=params, headers=headers)
-        response.raise_for_status()  # Raise exception for HTTP errors
+def geocode_address(address, geocoder=None):
+    """Result dict with lat, lon, provider and quality, or None"""
+    result = (geocoder or get_geocoder()).geocode(address)
+    if not result:
+        logger.info("No results found for address %r", address)
+    return result
 
-        data = response.json()
 
-        if data:
-            lat = float(data[0]['lat'])
-            lon = float(data[0]['lon'])
-            return (lat, lon)
-        else:
-            print("No results found for this address")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching coordinates: {e}")
-        return None
-
-def process_json_file(file_path, output_file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
+def coordinates_from_result(result):
+    return {
+        'lat': result['lat'],
+        'lon': result['lon'],
+        'method': 'address_geocoding',
+        'source': {'provider': result['provider'], 'quality': result['quality']}
+    }
+
+def process_json_file(file_path, output_file_path, cross_check=False, geocoder=None):
+    """
+    Geocode the detailed addresses of churches that have no coordinates.
+    geocoder defaults to get_geocoder(); see utils/geocoding.py for the providers.
+
+    With cross_check=True, churches that have both wiki coordinates and a detailed
+    address get the geocoded position stored in 'address_coordinates', so that
+    utils/geo_validation.py can flag the ones where the two disagree.
+    """
+    with stage("load"), open(file_path, 'r', encoding='utf-8') as file:
         data = json.load(file)
 
+    with stage("geocode"):
+        geocode_churches(data, cross_check, geocoder)
+
+    with stage("save"):
+        # Ensure the output directory exists
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            json.dump(data, output_file, ensure_ascii=False, indent=4)
+        export_all(data, output_file_path)
+
+
+def geocode_churches(data, cross_check=False, geocoder=None):
+    """Geocode the churches in place; see process_json_file"""
     for church in data:
         if 'address' not in church or not church.get('detailed_address', False):
             continue
 
         if 'coordinates' in church and 'lat' in church['coordinates'] and 'lon' in church['coordinates']:
             if church['coordinates']['lat'] is not None and church['coordinates']['lon'] is not None:
+                if cross_check and 'address_coordinates' not in church:
+                    result = geocode_address(church['address'], geocoder)
+                    if result:
+                        church['address_coordinates'] = coordinates_from_result(result)
                 continue
 
-        address = church['address']
-        coordinates = get_coordinates_from_address(address)
-        if coordinates:
-            lat, lon = coordinates
-            church['coordinates'] = {'lat': lat, 'lon': lon}
+        result = geocode_address(church['address'], geocoder)
+        if result:
+            church['coordinates'] = coordinates_from_result(result)
         else:
             church['coordinates'] = {'lat': None, 'lon': None}
 
-    # Ensure the output directory exists
-    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+def main():
+    parser = argparse.ArgumentParser(description="Geocode the detailed addresses of churches without coordinates")
+    parser.add_argument('input', nargs='?', default="output/churches_with_coordinates.json")
+    parser.add_argument('output', nargs='?', default="output/churches_with_coordinates_updated_from_addresses.json")
+    parser.add_argument('--cross-check', action='store_true',
+                        help="Also geocode addresses of churches that already have coordinates")
+    parser.add_argument('--providers', default='nominatim,photon,offline',
+                        help="Providers in the order they are asked (default: %(default)s)")
+    parser.add_argument('--hedge-after', type=float, default=1.0,
+                        help="Ask the next provider when no acceptable answer has come in this many seconds")
+    parser.add_argument('--timeout', type=float, default=None, help="Per-request timeout for every provider")
+    parser.add_argument('--min-quality', default='street', choices=['municipality', 'street', 'building'])
+    parser.add_argument('--nominatim-url', default=NOMINATIM_URL)
+    parser.add_argument('--photon-url', default=PHOTON_URL)
+    parser.add_argument('--municipalities', default='data/municipalities.geojson',
+                        help="Boundary file for the offline provider's municipality fallback")
+    add_logging_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    setup_from_args(args)
+
+    with profiling_from_args(args, 'geocoder'):
+        with stage("providers"):
+            with open(args.input, 'r', encoding='utf-8') as f:
+                churches = json.load(f)
+            providers = build_providers(args.providers.split(','), args.nominatim_url, args.photon_url,
+                                        churches, args.municipalities, args.timeout)
+        geocoder = HedgedGeocoder(providers, args.hedge_after, args.min_quality)
+        process_json_file(args.input, args.output, cross_check=args.cross_check, geocoder=geocoder)
+    geocoder.report()
+    geocoder.close()
 
-    with open(output_file_path, 'w', encoding='utf-8') as output_file:
-        json.dump(data, output_file, ensure_ascii=False, indent=4)
 
-# Example usage
 if __name__ == "__main__":
-    input_file = "output\churches_with_coordinates.json"
-    output_file = "output\churches_with_coordinates_updated_from_addresses.json"
-
-    process_json_file(input_file, output_file)
-
-
-
-
-
-
-
-
+    main()
@@ -0,0 +1,230 @@
+# Validates church coordinates against a boundary polygon instead of a lat/lon box.
+# All points are tested at once with NumPy ray casting over a latitude-band edge grid,
+# and churches whose wiki coordinates are far from their geocoded address are flagged.
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import load_churches
+
+DEFAULT_BOUNDARY_FILE = 'data/finland_boundary.geojson'
+EARTH_RADIUS_KM = 6371.0088
+
+
+def polygon_rings(geometry):
+    """All rings (outer and holes) of a GeoJSON Polygon or MultiPolygon as (lon, lat) arrays"""
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return []
+    return [np.asarray(ring, dtype=float)[:, :2] for polygon in polygons for ring in polygon]
+
+
+def load_boundary_rings(boundary_file):
+    with open(boundary_file, 'r', encoding='utf-8') as f:
+        collection = json.load(f)
+    features = collection['features'] if collection.get('type') == 'FeatureCollection' else [collection]
+    rings = []
+    for feature in features:
+        rings.extend(polygon_rings(feature['geometry']))
+    return rings
+
+
+class PolygonIndex:
+    """
+    Even-odd point-in-polygon test for many points at once.
+
+    The edges are bucketed into horizontal latitude bands, so each point is
+    only tested against the few edges that cross its band. Holes and several
+    non-overlapping polygons (e.g. municipalities) work with the same rule.
+    """
+
+    def __init__(self, rings, bands=512):
+        edges = []
+        for ring in rings:
+            if len(ring) < 3:
+                continue
+            start = ring
+            end = np.roll(ring, -1, axis=0)
+            edges.append(np.hstack([start, end]))
+        edges = np.vstack(edges) if edges else np.empty((0, 4))
+        # Horizontal edges never cross a horizontal ray
+        edges = edges[edges[:, 1] != edges[:, 3]]
+
+        self.x1, self.y1, self.x2, self.y2 = edges.T
+        self.lon_min = float(min(self.x1.min(), self.x2.min())) if len(edges) else 0.0
+        self.lon_max = float(max(self.x1.max(), self.x2.max())) if len(edges) else 0.0
+        self.lat_min = float(min(self.y1.min(), self.y2.min())) if len(edges) else 0.0
+        self.lat_max = float(max(self.y1.max(), self.y2.max())) if len(edges) else 0.0
+        self.bands = bands
+        self.band_height = (self.lat_max - self.lat_min) / bands or 1.0
+
+        # Compressed band -> edge index lists
+        low = np.minimum(self.y1, self.y2)
+        high = np.maximum(self.y1, self.y2)
+        first = np.clip(((low - self.lat_min) / self.band_height).astype(int), 0, bands - 1)
+        last = np.clip(((high - self.lat_min) / self.band_height).astype(int), 0, bands - 1)
+        counts = last - first + 1
+        edge_ids = np.repeat(np.arange(len(edges)), counts)
+        band_ids = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        order = np.argsort(band_ids, kind='stable')
+        self.band_edges = edge_ids[order]
+        self.band_offsets = np.concatenate([[0], np.cumsum(np.bincount(band_ids, minlength=bands))])
+
+    @classmethod
+    def from_file(cls, boundary_file, bands=512):
+        return cls(load_boundary_rings(boundary_file), bands=bands)
+
+    def contains(self, lat, lon, chunk_size=65536):
+        """Boolean mask of the points that are inside the polygons. NaN points are outside."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        inside = np.zeros(lat.shape, dtype=bool)
+
+        in_box = ((lat >= self.lat_min) & (lat <= self.lat_max) &
+                  (lon >= self.lon_min) & (lon <= self.lon_max))
+        candidates = np.nonzero(in_box)[0]
+        if not len(candidates):
+            return inside
+
+        band = np.clip(((lat[candidates] - self.lat_min) / self.band_height).astype(int), 0, self.bands - 1)
+        order = np.argsort(band, kind='stable')
+        candidates = candidates[order]
+        band = band[order]
+        occupied, starts = np.unique(band, return_index=True)
+        ends = np.append(starts[1:], len(band))
+
+        for b, start, end in zip(occupied, starts, ends):
+            points = candidates[start:end]
+            edges = self.band_edges[self.band_offsets[b]:self.band_offsets[b + 1]]
+            if not len(edges):
+                continue
+            x1, y1, x2, y2 = self.x1[edges], self.y1[edges], self.x2[edges], self.y2[edges]
+            slope = (x2 - x1) / (y2 - y1)
+
+            # Limit the points x edges matrix size for very dense bands
+            for offset in range(0, len(points), chunk_size):
+                chunk = points[offset:offset + chunk_size]
+                py = lat[chunk][:, None]
+                px = lon[chunk][:, None]
+                crosses = ((y1 > py) != (y2 > py)) & (px < x1 + (py - y1) * slope)
+                inside[chunk] = (np.count_nonzero(crosses, axis=1) % 2) == 1
+
+        return inside
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres, vectorized over NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def coordinate_arrays(churches, field='coordinates'):
+    """Latitude and longitude arrays of the churches, NaN where missing or not a number"""
+    lats = [(church.get(field) or {}).get('lat') for church in churches]
+    lons = [(church.get(field) or {}).get('lon') for church in churches]
+    lat = pd.to_numeric(pd.Series(lats, dtype=object), errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(pd.Series(lons, dtype=object), errors='coerce').to_numpy(dtype=float)
+    return lat, lon
+
+
+class GeoValidator:
+    def __init__(self, boundary_file=DEFAULT_BOUNDARY_FILE, mismatch_threshold_km=2.0):
+        self.boundary = PolygonIndex.from_file(boundary_file)
+        self.mismatch_threshold_km = mismatch_threshold_km
+
+    def validate(self, churches):
+        """
+        Check all churches at once.
+
+        Returns a dict of arrays: lat/lon as floats, "inside" for coordinates within
+        the boundary, and "mismatch_km" with the distance between the wiki
+        coordinates and the geocoded address (NaN when either is missing).
+        """
+        lat, lon = coordinate_arrays(churches)
+        inside = self.boundary.contains(lat, lon)
+
+        address_lat, address_lon = coordinate_arrays(churches, field='address_coordinates')
+        mismatch_km = haversine_km(lat, lon, address_lat, address_lon)
+
+        return {
+            "lat": lat,
+            "lon": lon,
+            "inside": inside,
+            "mismatch_km": mismatch_km,
+            "mismatch": mismatch_km > self.mismatch_threshold_km
+        }
+
+    def valid_churches(self, churches):
+        """The churches inside the boundary, with lat/lon converted to floats"""
+        result = self.validate(churches)
+        valid = []
+        for i in np.nonzero(result["inside"])[0]:
+            church = churches[i]
+            church['coordinates']['lat'] = float(result["lat"][i])
+            church['coordinates']['lon'] = float(result["lon"][i])
+            valid.append(church)
+        return valid
+
+    def report(self, churches):
+        """Churches outside the boundary and churches whose coordinates disagree with their address"""
+        result = self.validate(churches)
+        has_coords = ~np.isnan(result["lat"]) & ~np.isnan(result["lon"])
+
+        outside = [
+            {"name": churches[i]['name'], "wikipedia_link": churches[i].get('wikipedia_link'),
+             "lat": float(result["lat"][i]), "lon": float(result["lon"][i])}
+            for i in np.nonzero(has_coords & ~result["inside"])[0]
+        ]
+        mismatched = [
+            {"name": churches[i]['name'], "wikipedia_link": churches[i].get('wikipedia_link'),
+             "address": churches[i].get('address'), "distance_km": round(float(result["mismatch_km"][i]), 2)}
+            for i in np.nonzero(result["mismatch"])[0]
+        ]
+        return {
+            "total": len(churches),
+            "with_coordinates": int(has_coords.sum()),
+            "inside_boundary": int(result["inside"].sum()),
+            "outside_boundary": outside,
+            "address_mismatch": mismatched
+        }
+
+
+def validate_file(input_file, report_file, boundary_file=DEFAULT_BOUNDARY_FILE, mismatch_threshold_km=2.0):
+    churches = load_churches(input_file)
+    validator = GeoValidator(boundary_file, mismatch_threshold_km)
+    report = validator.report(churches)
+
+    os.makedirs(os.path.dirname(report_file), exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+
+    print(f"Validated {report['with_coordinates']} churches with coordinates: "
+          f"{report['inside_boundary']} inside, {len(report['outside_boundary'])} outside the boundary, "
+          f"{len(report['address_mismatch'])} far from their geocoded address")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate church coordinates against a boundary polygon")
+    parser.add_argument('input', nargs='?', default='output/churches_with_coordinates_updated_from_addresses.json')
+    parser.add_argument('--report', default='output/validation_report.json')
+    parser.add_argument('--boundary', default=DEFAULT_BOUNDARY_FILE)
+    parser.add_argument('--threshold-km', type=float, default=2.0,
+                        help="Flag churches whose coordinates are further than this from their geocoded address")
+    args = parser.parse_args()
+
+    validate_file(args.input, args.report, args.boundary, args.threshold_km)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# Geocoding providers and a hedged geocoder over them.
+# Providers: a Nominatim-compatible /search endpoint, a Photon-compatible /api endpoint and an
+# offline index built from our own data. HedgedGeocoder asks the first provider and, if no
+# acceptable answer has arrived after hedge_after seconds (or the provider failed), also asks the
+# next one; the first acceptable result wins. Per-provider latency and result quality are tracked.
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.request_controller import get_controller
+from utils.logging_setup import get_logger
+
+logger = get_logger('geocoding')
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+PHOTON_URL = "https://photon.komoot.io/api"
+# The transport adds the project's User-Agent, which Nominatim's usage policy requires
+HEADERS = {
+    'Accept-Language': 'en'
+}
+
+# How precise a result is; results below the geocoder's min_quality are not accepted
+QUALITY = {"unknown": 0, "municipality": 1, "street": 2, "building": 3}
+BUILDING_TYPES = {'house', 'building', 'place_of_worship', 'church', 'chapel', 'cathedral', 'amenity'}
+STREET_TYPES = {'road', 'street', 'residential', 'pedestrian', 'footway', 'tertiary', 'secondary', 'primary'}
+# What reading an answer of an unexpected shape raises
+PARSE_ERRORS = (ValueError, KeyError, IndexError, TypeError, AttributeError)
+
+
+def quality_of(kind):
+    kind = (kind or '').lower()
+    if kind in BUILDING_TYPES:
+        return "building"
+    if kind in STREET_TYPES:
+        return "street"
+    if kind in ('city', 'town', 'village', 'municipality', 'district', 'county', 'locality', 'suburb'):
+        return "municipality"
+    return "unknown"
+
+
+def normalize_address(address):
+    return ' '.join(re.sub(r'[,.]', ' ', address.lower()).split())
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Provider:
+    """A geocoding backend; geocode() returns a result dict or None and records stats"""
+
+    name = 'provider'
+
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.stats = {"requests": 0, "results": 0, "acceptable": 0, "empty": 0, "errors": 0, "wins": 0}
+        self.quality_counts = {level: 0 for level in QUALITY}
+
+    def search(self, address):
+        """(lat, lon, kind, label) of the best match, or None"""
+        raise NotImplementedError
+
+    def geocode(self, address):
+        start = time.monotonic()
+        try:
+            found = self.search(address)
+            if found:
+                lat, lon, kind, label = found
+                quality = quality_of(kind)
+        except requests.RequestException as e:
+            self.record(start, "errors")
+            logger.debug("%s failed for %r: %s", self.name, address, e)
+            return None
+        except PARSE_ERRORS as e:
+            # A malformed answer (e.g. a feature with "geometry": null) only loses this provider's result
+            self.record(start, "errors")
+            logger.debug("%s returned an unusable answer for %r: %r", self.name, address, e)
+            return None
+        if not found:
+            self.record(start, "empty")
+            return None
+        self.record(start, "results", quality)
+        return {"lat": lat, "lon": lon, "provider": self.name, "quality": quality, "label": label,
+                "latency": time.monotonic() - start}
+
+    def record(self, start, outcome, quality=None):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats[outcome] += 1
+            self.latencies.append(time.monotonic() - start)
+            if quality:
+                self.quality_counts[quality] += 1
+
+    def summary(self):
+        with self.lock:
+            return dict(self.stats, p50=percentile(self.latencies, 0.5), p95=percentile(self.latencies, 0.95),
+                        quality=dict(self.quality_counts))
+
+
+class NominatimProvider(Provider):
+    name = 'nominatim'
+
+    def __init__(self, url=NOMINATIM_URL, timeout=10.0):
+        super().__init__(timeout)
+        self.url = url
+
+    def search(self, address):
+        params = {'q': address, 'format': 'jsonv2', 'limit': 1}
+        response = get_controller().get(self.url, params=params, headers=HEADERS, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            return None
+        best = data[0]
+        kind = best.get('addresstype') or best.get('type') or best.get('category') or best.get('class')
+        return float(best['lat']), float(best['lon']), kind, best.get('display_name')
+
+
+class PhotonProvider(Provider):
+    name = 'photon'
+
+    def __init__(self, url=PHOTON_URL, timeout=5.0):
+        super().__init__(timeout)
+        self.url = url
+
+    def search(self, address):
+        params = {'q': address, 'limit': 1}
+        response = get_controller().get(self.url, params=params, headers=HEADERS, timeout=self.timeout)
+        response.raise_for_status()
+        features = response.json().get('features') or []
+        if not features:
+            return None
+        feature = features[0]
+        lon, lat = feature['geometry']['coordinates'][:2]
+        properties = feature.get('properties', {})
+        kind = properties.get('type') or properties.get('osm_value')
+        label = ', '.join(str(properties[key]) for key in ('name', 'street', 'housenumber', 'city')
+                          if properties.get(key))
+        return float(lat), float(lon), kind, label
+
+
+class OfflineProvider(Provider):
+    """
+    Looks addresses up in a local index: exact addresses of churches whose position came from
+    their Wikipedia page, then the municipality of the address (quality 'municipality').
+    """
+
+    name = 'offline'
+
+    def __init__(self, addresses=None, municipalities=None):
+        super().__init__(timeout=None)
+        self.addresses = {normalize_address(a): coords for a, coords in (addresses or {}).items()}
+        self.municipalities = {name.lower(): coords for name, coords in (municipalities or {}).items()}
+
+    @classmethod
+    def from_churches(cls, churches, municipality_file=None):
+        addresses = {}
+        for church in churches:
+            coords = church.get('coordinates') or {}
+            # Only positions from the pages themselves, never earlier geocoding results
+            if church.get('address') and coords.get('lat') is not None and coords.get('method') != 'address_geocoding':
+                addresses[church['address']] = (coords['lat'], coords['lon'])
+        municipalities = {}
+        if municipality_file and os.path.exists(municipality_file):
+            municipalities = municipality_centroids(municipality_file)
+        return cls(addresses, municipalities)
+
+    def search(self, address):
+        coords = self.addresses.get(normalize_address(address))
+        if coords:
+            return coords[0], coords[1], 'building', address
+        # The municipality is the last comma-separated part, after any postcode
+        place = re.sub(r'\b\d{5}\b', '', address.split(',')[-1]).strip().lower()
+        coords = self.municipalities.get(place)
+        if coords:
+            return coords[0], coords[1], 'municipality', place
+        return None
+
+
+def municipality_centroids(municipality_file):
+    """{municipality name: (lat, lon)} from the vertex means of a municipality boundary file"""
+    from utils.geo_validation import polygon_rings
+
+    with open(municipality_file, 'r', encoding='utf-8') as f:
+        features = json.load(f).get('features', [])
+    centroids = {}
+    for feature in features:
+        properties = feature.get('properties') or {}
+        name = properties.get('municipality') or properties.get('nimi') or properties.get('name')
+        rings = polygon_rings(feature['geometry']) if feature.get('geometry') else []
+        if not name or not rings:
+            continue
+        lon, lat = rings[0].mean(axis=0)
+        centroids[name] = (float(lat), float(lon))
+    return centroids
+
+
+class HedgedGeocoder:
+    """
+    Asks the providers in order. The next provider is asked when the previous ones have not
+    produced an acceptable result within hedge_after seconds, or as soon as they have all
+    answered without one. Gives up after total_timeout and returns the best result seen.
+    """
+
+    def __init__(self, providers, hedge_after=1.0, min_quality="street", total_timeout=30.0):
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self.min_quality = QUALITY[min_quality]
+        self.total_timeout = total_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max(4, len(providers) * 4))
+        self.stats = {"addresses": 0, "hedged": 0, "found": 0, "below_quality": 0, "not_found": 0}
+
+    def acceptable(self, result):
+        return result is not None and QUALITY[result["quality"]] >= self.min_quality
+
+    def geocode(self, address):
+        self.stats["addresses"] += 1
+        deadline = time.monotonic() + self.total_timeout
+        pending = set()
+        results = []
+        next_provider = 0
+
+        def launch():
+            nonlocal next_provider
+            pending.add(self.executor.submit(self.providers[next_provider].geocode, address))
+            next_provider += 1
+
+        launch()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = next_provider < len(self.providers)
+            done, _ = wait(pending, timeout=min(self.hedge_after, remaining) if more else remaining,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if more:
+                    # Hedge: the outstanding requests are slow, ask the next provider as well
+                    self.stats["hedged"] += 1
+                    launch()
+                continue
+            for future in done:
+                pending.discard(future)
+                result = future.result()
+                if self.acceptable(result):
+                    return self.win(result)
+                if result:
+                    results.append(result)
+            if not pending:
+                if not more:
+                    break
+                launch()
+
+        # Nothing acceptable: fall back to the most precise answer, if any
+        if results:
+            self.stats["below_quality"] += 1
+            return self.win(max(results, key=lambda r: QUALITY[r["quality"]]))
+        self.stats["not_found"] += 1
+        return None
+
+    def win(self, result):
+        self.stats["found"] += 1
+        provider = next(p for p in self.providers if p.name == result["provider"])
+        with provider.lock:
+            provider.stats["wins"] += 1
+            if QUALITY[result["quality"]] >= self.min_quality:
+                provider.stats["acceptable"] += 1
+        return result
+
+    def report(self):
+        print(f"\nGeocoding: {self.stats['addresses']} addresses, {self.stats['found']} found "
+              f"({self.stats['below_quality']} below {self.min_quality_name}), {self.stats['hedged']} hedged requests")
+        for provider in self.providers:
+            s = provider.summary()
+            p50 = f"{s['p50'] * 1000:.0f}" if s['p50'] is not None else '-'
+            p95 = f"{s['p95'] * 1000:.0f}" if s['p95'] is not None else '-'
+            quality = ', '.join(f"{level} {count}" for level, count in s['quality'].items() if count)
+            print(f"- {provider.name}: {s['requests']} requests, {s['wins']} used, {s['empty']} empty, "
+                  f"{s['errors']} errors, p50 {p50} ms, p95 {p95} ms ({quality or 'no results'})")
+
+    @property
+    def min_quality_name(self):
+        return next(name for name, level in QUALITY.items() if level == self.min_quality)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+def build_providers(names, nominatim_url=NOMINATIM_URL, photon_url=PHOTON_URL, churches=None,
+                    municipality_file=None, timeout=None):
+    """Providers in the given order, e.g. ['nominatim', 'photon', 'offline']"""
+    providers = []
+    for name in names:
+        if name == 'nominatim':
+            providers.append(NominatimProvider(nominatim_url, timeout or 10.0))
+        elif name == 'photon':
+            providers.append(PhotonProvider(photon_url, timeout or 5.0))
+        elif name == 'offline':
+            providers.append(OfflineProvider.from_churches(churches or [], municipality_file))
+        else:
+            raise ValueError(f"Unknown geocoding provider: {name}")
+    return providers
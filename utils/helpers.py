@@ -0,0 +1,25 @@
+# Helpers for converting between fi.wikipedia links and page titles
+from urllib.parse import quote, unquote, urlparse
+
+WIKI_BASE_URL = "https://fi.wikipedia.org"
+
+
+def normalize_title(title):
+    """MediaWiki-style title: underscores as spaces, no fragment, first letter upper case"""
+    title = unquote(title).split('#', 1)[0].replace('_', ' ').strip()
+    title = ' '.join(title.split())
+    return title[:1].upper() + title[1:]
+
+
+def title_from_link(link):
+    """Page title of a wikipedia_link such as https://fi.wikipedia.org/wiki/Pyh%C3%A4n_Henrikin_katedraali"""
+    path = urlparse(link).path
+    if '/wiki/' in path:
+        path = path.split('/wiki/', 1)[1]
+    return normalize_title(path)
+
+
+def link_from_title(title, base_url=WIKI_BASE_URL):
+    """wikipedia_link for a page title, percent-encoded the same way as the list page hrefs"""
+    path = quote(normalize_title(title).replace(' ', '_'), safe="()_,-.:!'")
+    return f"{base_url}/wiki/{path}"
@@ -0,0 +1,205 @@
+# HTTP transport under the shared request controller: one pooled keep-alive session per host,
+# so consecutive requests to fi.wikipedia.org (or Nominatim, or a stand-in) reuse their
+# connections instead of opening one per page. Every request carries the project's User-Agent,
+# asks for compressed responses (gzip, and brotli when the brotli package is installed), and has
+# connect and read timeouts. With httpx and h2 installed, http2=True multiplexes the requests
+# to a host over one HTTP/2 connection instead. Hooks receive the timing of every request.
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.logging_setup import get_logger
+
+logger = get_logger('http')
+
+try:
+    import brotlicffi as brotli
+except ImportError:
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+except ImportError:
+    httpx = None
+
+USER_AGENT = 'FinlandChurchesScraper/1.0 (https://github.com/jannetolppanen/finland-churches-wikipedia-scraper)'
+# urllib3 and httpx decode brotli only when one of the brotli packages is importable
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+# Seconds to establish a connection and to wait between bytes of the response
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 30.0
+POOL_SIZE = 16
+
+
+class Http2Response:
+    """The parts of requests.Response the fetchers use, for an httpx response"""
+
+    def __init__(self, response, elapsed):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.elapsed = elapsed
+
+    @property
+    def content(self):
+        return self.response.read()
+
+    @property
+    def text(self):
+        self.response.read()
+        return self.response.text
+
+    @property
+    def encoding(self):
+        return self.response.charset_encoding
+
+    def json(self):
+        self.response.read()
+        return self.response.json()
+
+    def iter_content(self, chunk_size=None):
+        return self.response.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} {self.response.reason_phrase} for url: {self.url}",
+                                     response=self)
+
+    def close(self):
+        self.response.close()
+
+
+class Http2Session:
+    """An httpx HTTP/2 client behind the requests-style request() the controller calls"""
+
+    def __init__(self, headers, pool_size):
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        # Redirects are followed like requests does (httpx leaves them to the caller by default)
+        self.client = httpx.Client(http2=True, headers=headers, limits=limits, follow_redirects=True)
+
+    def request(self, method, url, params=None, headers=None, timeout=None, stream=False,
+                allow_redirects=True, **kwargs):
+        # requests-style timeout: a (connect, read) pair or one number for both
+        connect, read = timeout if isinstance(timeout, (tuple, list)) else (timeout, timeout)
+        request = self.client.build_request(method, url, params=params, headers=headers,
+                                            timeout=httpx.Timeout(read, connect=connect), **kwargs)
+        start = time.perf_counter()
+        try:
+            response = self.client.send(request, stream=True, follow_redirects=allow_redirects)
+            if not stream:
+                response.read()
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+        return Http2Response(response, time.perf_counter() - start)
+
+    def close(self):
+        self.client.close()
+
+
+class Transport:
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, pool_size=POOL_SIZE,
+                 http2=False, user_agent=USER_AGENT):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.headers = {'User-Agent': user_agent, 'Accept-Encoding': ACCEPT_ENCODING}
+        if http2 and httpx is None:
+            logger.warning("HTTP/2 needs the httpx and h2 packages; using HTTP/1.1 keep-alive connections")
+        self.http2 = http2 and httpx is not None
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.hooks = []
+        self.counts = {}
+
+    def add_hook(self, hook):
+        """
+        Call hook(timing) after every request, with a dict of method, url, host, status (None when
+        the request failed) and elapsed seconds until the headers (streamed) or the whole body arrived.
+        """
+        self.hooks.append(hook)
+
+    def session(self, host):
+        """The pooled session of a scheme://host"""
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                if self.http2:
+                    session = Http2Session(self.headers, self.pool_size)
+                else:
+                    session = requests.Session()
+                    session.headers.update(self.headers)
+                    # Retries are the request controller's job
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                self.sessions[host] = session
+            return session
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send one request on the host's pooled session; same arguments and result as requests.request"""
+        parts = urlparse(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self.session(host)
+        status = None
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.counts[host] = self.counts.get(host, 0) + 1
+            for hook in self.hooks:
+                hook({"method": method, "url": url, "host": host, "status": status, "elapsed": elapsed})
+
+    def connections(self, host):
+        """Connections opened to a host so far (HTTP/1.1 sessions only)"""
+        session = self.sessions.get(host)
+        if session is None or self.http2:
+            return None
+        pools = session.get_adapter(host).poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self):
+        """Requests and connections opened per host"""
+        return {host: {"requests": self.counts.get(host, 0), "connections": self.connections(host)}
+                for host in list(self.sessions)}
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def configure_transport(**kwargs):
+    """Replace the shared transport, e.g. with HTTP/2 or other timeouts"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = Transport(**kwargs)
+        return _transport
+
+
+def get_transport():
+    """The process-wide transport the request controller sends through"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = Transport()
+        return _transport
@@ -0,0 +1,109 @@
+# Coordinates from other language editions for churches whose fi.wikipedia page has none.
+# The fi titles' interlanguage links are resolved in batches of 50 titles per request
+# (prop=langlinks), then the coordinates of the linked sv/en articles are read, again 50 titles
+# per request (prop=coordinates, GeoData's primary coordinates). The first language in order that
+# has coordinates wins, and the language and title are kept as provenance.
+import os
+import sys
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.canonicalize import wiki_base
+from utils.helpers import title_from_link
+from utils.logging_setup import get_logger
+from utils.mediawiki import MediaWikiClient
+
+logger = get_logger('interlanguage')
+
+LANGUAGES = ('sv', 'en')
+
+
+def language_api(base, language):
+    """api.php of another language edition; stand-in servers serve every language from one host"""
+    if urlparse(base).netloc.endswith('.wikipedia.org'):
+        return f"https://{language}.wikipedia.org/w/api.php"
+    return f"{base}/{language}/w/api.php"
+
+
+def langlinks(client, titles, languages):
+    """{fi title: {language: title}} for the wanted languages"""
+    pages = client.query_titles(titles, {'prop': 'langlinks', 'lllimit': 'max'})
+    links = {}
+    for title, page in pages.items():
+        found = {link['lang']: link['title'] for link in (page or {}).get('langlinks', [])
+                 if link.get('lang') in languages}
+        if found:
+            links[title] = found
+    return links
+
+
+def primary_coordinates(client, titles):
+    """{title: (lat, lon)} of the titles that have primary coordinates"""
+    pages = client.query_titles(titles, {'prop': 'coordinates', 'colimit': 'max'})
+    coordinates = {}
+    for title, page in pages.items():
+        for coord in (page or {}).get('coordinates', []):
+            if coord.get('primary', True) and coord.get('globe', 'earth') == 'earth':
+                coordinates[title] = (coord['lat'], coord['lon'])
+                break
+    return coordinates
+
+
+def interlanguage_coordinates(links, languages=LANGUAGES, api_url=None):
+    """
+    {wikipedia_link: coordinates dict} for the links whose sv/en article has coordinates.
+    api_url overrides the fi API. Returns (coordinates, stats).
+    """
+    stats = {"links": 0, "linked": 0, "found": 0, "requests": 0}
+    titles_by_base = defaultdict(dict)
+    for link in dict.fromkeys(links):
+        stats["links"] += 1
+        titles_by_base[wiki_base(link)][link] = title_from_link(link)
+
+    found = {}
+    for base, titles in titles_by_base.items():
+        client = MediaWikiClient(api_url or f"{base}/w/api.php")
+        try:
+            linked = langlinks(client, titles.values(), languages)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Could not fetch interlanguage links through %s: %s", client.api_url, e)
+            continue
+        finally:
+            stats["requests"] += client.stats["requests"]
+        stats["linked"] += len(linked)
+
+        by_title = {}
+        for language in languages:
+            wanted = {title: other[language] for title, other in linked.items()
+                      if language in other and title not in by_title}
+            if not wanted:
+                continue
+            other_client = MediaWikiClient(language_api(base, language))
+            try:
+                coordinates = primary_coordinates(other_client, wanted.values())
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("Could not fetch coordinates through %s: %s", other_client.api_url, e)
+                continue
+            finally:
+                stats["requests"] += other_client.stats["requests"]
+            for title, other_title in wanted.items():
+                if other_title in coordinates:
+                    by_title[title] = (language, other_title, coordinates[other_title])
+
+        for link, title in titles.items():
+            if title not in by_title:
+                continue
+            language, other_title, (lat, lon) = by_title[title]
+            found[link] = {
+                "lat": lat,
+                "lon": lon,
+                "format": "decimal",
+                "original": f"{lat}, {lon}",
+                "method": "interlanguage",
+                "source": {"language": language, "title": other_title}
+            }
+    stats["found"] = len(found)
+    return found, stats
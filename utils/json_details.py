@@ -1,6 +1,11 @@
 import json
+import os
+import sys
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import load_churches
+
 def merge_json_keys(json_obj):
     def recursive_keys(obj, keys_dict):
         if isinstance(obj, dict):
@@ -36,9 +41,8 @@ def count_details(json_obj):
     return counts
 
 # Example usage:
-json_file_path = 'output\churches_with_coordinates_updated_from_addresses.json'
-with open(json_file_path, 'r', encoding='utf-8') as file:
-    json_obj = json.load(file)
+json_file_path = 'output/churches_with_coordinates_updated_from_addresses.json'
+json_obj = load_churches(json_file_path)
 
 if __name__ == '__main__':
     # result = merge_json_keys(json_obj)
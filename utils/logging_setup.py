@@ -0,0 +1,220 @@
+# Structured logging for the scrapers and the extractor.
+# Log records go through a queue to a listener thread, so logging never blocks the fetch loop on a
+# slow terminal or pipe. The console shows INFO and up by default (per-church details are DEBUG),
+# together with a single-line progress display; --log-json FILE also writes every record as one
+# JSON object per line for machine consumption.
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+LOGGER_NAME = 'churches'
+# Attributes every LogRecord has; anything else came in through extra={...}
+STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_console_lock = threading.RLock()
+_active_progress = None
+_progress_enabled = False
+_listener = None
+
+
+def get_logger(name=None):
+    """Logger under the project's 'churches' namespace"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """Writes log lines above the progress line, which is redrawn after each record"""
+
+    def emit(self, record):
+        # Progress records only go to the JSON-lines log
+        if getattr(record, 'progress', None):
+            return
+        with _console_lock:
+            progress = _active_progress
+            if progress and progress.tty:
+                progress.clear()
+            super().emit(record)
+            if progress and progress.tty:
+                progress.draw()
+
+
+def setup_logging(level='INFO', json_file=None, progress=True, stream=None):
+    """
+    Route the 'churches' loggers through a queue to the console and, optionally, a JSON-lines file.
+    Safe to call more than once; later calls replace the earlier setup.
+    """
+    global _listener, _progress_enabled
+    stop_logging()
+
+    stream = stream or sys.stderr
+    console = ConsoleHandler(stream)
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    handlers = [console]
+    if json_file:
+        file_handler = logging.FileHandler(json_file, encoding='utf-8')
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    records = queue.SimpleQueue()
+    logger = get_logger()
+    logger.handlers = [logging.handlers.QueueHandler(records)]
+    # Let DEBUG through to the JSON-lines file even when the console shows less
+    logger.setLevel(logging.DEBUG if json_file else level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    _progress_enabled = progress
+    return logger
+
+
+def stop_logging():
+    """Flush the queue and stop the listener thread"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def add_logging_arguments(parser):
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Console log level; DEBUG shows every church (default: %(default)s)")
+    parser.add_argument('--log-json', metavar='FILE', help="Also write all log records to FILE as JSON lines")
+    parser.add_argument('--no-progress', dest='progress', action='store_false', help="Hide the progress line")
+
+
+def setup_from_args(args):
+    return setup_logging(args.log_level, args.log_json, args.progress)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class Progress:
+    """
+    Single-line progress display: done/total, pages/sec, ETA, cache hit rate and errors.
+    Redrawn in place on a terminal; on a pipe a plain line is written every log_interval
+    seconds instead. Progress snapshots also go to the JSON-lines log.
+    """
+
+    def __init__(self, total, label='', stream=None, interval=0.2, log_interval=10.0, enabled=None):
+        self.total = total
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.log_interval = log_interval
+        self.enabled = _progress_enabled if enabled is None else enabled
+        self.tty = self.enabled and hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self.done = 0
+        self.cached = 0
+        self.errors = 0
+        self.start = time.monotonic()
+        self.last_draw = 0.0
+        self.last_log = self.start
+        self.logger = get_logger('progress')
+
+    def __enter__(self):
+        global _active_progress
+        with _console_lock:
+            _active_progress = self
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, count=1, cached=False, error=False):
+        """Record finished items; cached items did not need a page fetch"""
+        self.done += count
+        if cached:
+            self.cached += count
+        if error:
+            self.errors += count
+
+        now = time.monotonic()
+        if now - self.last_log >= self.log_interval:
+            self.last_log = now
+            self.log_snapshot()
+            if self.enabled and not self.tty:
+                with _console_lock:
+                    self.stream.write(self.line() + '\n')
+                    self.stream.flush()
+        if self.tty and now - self.last_draw >= self.interval:
+            with _console_lock:
+                self.clear()
+                self.draw()
+
+    def rates(self):
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        fetched = self.done - self.cached
+        pages_per_sec = fetched / elapsed
+        remaining = self.total - self.done
+        eta = remaining / pages_per_sec if pages_per_sec > 0 else None
+        hit_rate = self.cached / self.done if self.done else 0.0
+        return elapsed, pages_per_sec, eta, hit_rate
+
+    def line(self):
+        elapsed, pages_per_sec, eta, hit_rate = self.rates()
+        percent = self.done / self.total if self.total else 1.0
+        eta_text = format_duration(eta) if eta is not None else '--:--'
+        return (f"{self.label} {self.done}/{self.total} {percent:.0%} | {pages_per_sec:.1f} pages/s | "
+                f"ETA {eta_text} | cache {hit_rate:.0%} | errors {self.errors}").strip()
+
+    def draw(self):
+        self.stream.write(self.line())
+        self.stream.flush()
+        self.last_draw = time.monotonic()
+
+    def clear(self):
+        self.stream.write('\r\x1b[K')
+
+    def log_snapshot(self):
+        elapsed, pages_per_sec, eta, hit_rate = self.rates()
+        self.logger.info(self.line(), extra={
+            "progress": self.label or True, "done": self.done, "total": self.total,
+            "pages_per_sec": round(pages_per_sec, 2), "eta_seconds": round(eta, 1) if eta is not None else None,
+            "cache_hit_rate": round(hit_rate, 3), "errors": self.errors, "elapsed": round(elapsed, 1)
+        })
+
+    def close(self):
+        global _active_progress
+        with _console_lock:
+            if self.tty:
+                self.clear()
+                self.draw()
+                self.stream.write('\n')
+                self.stream.flush()
+            if _active_progress is self:
+                _active_progress = None
+        self.log_snapshot()
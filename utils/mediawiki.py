@@ -0,0 +1,78 @@
+# Batched MediaWiki action API queries (up to 50 titles per request) through the shared
+# request controller. Maps every requested title through the API's normalization and
+# redirects back to its page, so callers can look results up by the title they asked for.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.request_controller import get_controller
+
+API_URL = "https://fi.wikipedia.org/w/api.php"
+BATCH_SIZE = 50
+
+
+def batches(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class MediaWikiClient:
+    def __init__(self, api_url=API_URL):
+        self.api_url = api_url
+        self.stats = {"requests": 0, "bytes": 0}
+
+    def get(self, params):
+        params = dict(params, format='json', formatversion='2')
+        response = get_controller().get(self.api_url, params=params)
+        response.raise_for_status()
+        self.stats["requests"] += 1
+        self.stats["bytes"] += len(response.content)
+        data = response.json()
+        if 'error' in data:
+            raise ValueError(f"MediaWiki API error: {data['error'].get('info')}")
+        return data
+
+    def query_titles(self, titles, params, resolve_redirects=True):
+        """
+        Run action=query for the titles in batches of 50.
+
+        Returns {requested title: page dict}, with None for missing pages.
+        Continuation (e.g. when revision contents do not fit in one response)
+        is followed and merged into the same page dicts.
+        """
+        results = {}
+        for batch in batches(dict.fromkeys(titles)):
+            query_params = dict(params, action='query', titles='|'.join(batch))
+            if resolve_redirects:
+                query_params['redirects'] = '1'
+
+            pages = {}
+            mapping = {}
+            continue_params = {}
+            while True:
+                data = self.get(dict(query_params, **continue_params))
+                query = data.get('query', {})
+                for item in query.get('normalized', []) + query.get('redirects', []):
+                    mapping[item['from']] = item['to']
+                for page in query.get('pages', []):
+                    merged = pages.setdefault(page['title'], {})
+                    for key, value in page.items():
+                        if isinstance(value, list) and isinstance(merged.get(key), list):
+                            merged[key].extend(value)
+                        else:
+                            merged[key] = value
+                if 'continue' not in data:
+                    break
+                continue_params = data['continue']
+
+            for title in batch:
+                target = title
+                # normalized -> redirect target, at most a couple of hops
+                for _ in range(3):
+                    if target not in mapping:
+                        break
+                    target = mapping[target]
+                page = pages.get(target)
+                results[title] = None if not page or page.get('missing') else page
+        return results
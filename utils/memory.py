@@ -0,0 +1,132 @@
+# Memory instrumentation and budgeting for the extraction stage.
+# A parsed BeautifulSoup tree is many times larger than the HTML it came from, so with several
+# pages in flight peak memory grows with the number of trees alive at once. MemoryBudget caps
+# the parsed documents in flight by an RSS budget, and StageMemory reports the peak traced
+# memory of each stage with tracemalloc. Its stages are also the stages of a --profile run.
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import profiling
+
+# Estimated parse tree size relative to the HTML bytes (typically 10-20x)
+TREE_FACTOR = 15
+MIB = 2 ** 20
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Without /proc only the peak is available (kilobytes on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryBudget:
+    """
+    Admits parsed documents only while the process RSS plus the estimated size of the
+    trees in flight stays under the budget. One document is always admitted when none
+    are in flight, so extraction keeps going (one page at a time) over the budget.
+    """
+
+    def __init__(self, budget_mb, tree_factor=TREE_FACTOR):
+        self.budget = budget_mb * MIB
+        self.tree_factor = tree_factor
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.reserved = 0
+        self.stats = {"documents": 0, "waits": 0, "peak_in_flight": 0, "peak_rss": 0}
+
+    def fits(self, cost):
+        rss = current_rss() or 0
+        self.stats["peak_rss"] = max(self.stats["peak_rss"], rss)
+        return rss + self.reserved + cost <= self.budget
+
+    def admit(self, html_bytes):
+        """Block until a document of html_bytes may be parsed; returns its reserved cost"""
+        cost = html_bytes * self.tree_factor
+        with self.cond:
+            if self.in_flight and not self.fits(cost):
+                self.stats["waits"] += 1
+                while self.in_flight and not self.fits(cost):
+                    self.cond.wait(0.5)
+            self.in_flight += 1
+            self.reserved += cost
+            self.stats["documents"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+        return cost
+
+    def release(self, cost):
+        with self.cond:
+            self.in_flight -= 1
+            self.reserved -= cost
+            self.cond.notify_all()
+
+    @contextmanager
+    def document(self, html_bytes):
+        cost = self.admit(html_bytes)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+    def report(self):
+        print(f"- Memory budget {self.budget / MIB:.0f} MiB: {self.stats['documents']} documents, "
+              f"at most {self.stats['peak_in_flight']} in flight, {self.stats['waits']} waits, "
+              f"peak RSS {self.stats['peak_rss'] / MIB:.0f} MiB")
+
+
+class StageMemory:
+    """Peak traced Python memory per named stage; does nothing unless enabled"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.peaks = {}
+        self.started = False
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started = True
+
+    @contextmanager
+    def stage(self, name):
+        with profiling.stage(name):
+            if not self.enabled:
+                yield
+                return
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            try:
+                yield
+            finally:
+                current, peak = tracemalloc.get_traced_memory()
+                previous = self.peaks.get(name, {"peak": 0, "growth": 0})
+                self.peaks[name] = {
+                    "peak": max(previous["peak"], peak),
+                    "growth": max(previous["growth"], peak - start),
+                    "rss": current_rss()
+                }
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("\nPeak memory per stage (tracemalloc):")
+        for name, values in self.peaks.items():
+            rss = f", RSS {values['rss'] / MIB:.0f} MiB" if values['rss'] else ''
+            print(f"- {name}: peak {values['peak'] / MIB:.1f} MiB "
+                  f"(+{values['growth'] / MIB:.1f} MiB during the stage){rss}")
+
+    def stop(self):
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
@@ -0,0 +1,121 @@
+# Persistent cache of pages that gave neither coordinates nor an address.
+# Each entry keeps the page revision it was recorded for and expires after a TTL; a page is
+# fetched again when its entry expires or Wikipedia reports a newer revision. Churches marked
+# permanently closed in churches_without_location.json are never fetched again; the addresses
+# found there by hand (manual_verification "address") are merged into the records instead.
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.canonicalize import normalize_link
+from utils.logging_setup import get_logger
+
+logger = get_logger('negative_cache')
+
+DEFAULT_CACHE_FILE = 'output/.negative_cache.json'
+MANUAL_FILE = 'churches_without_location.json'
+DEFAULT_TTL_DAYS = 30
+# manual_verification values meaning there is nothing left to find on the page
+TERMINAL_VERIFICATIONS = {'permanently closed'}
+# Fields of a hand-checked entry copied to a church record without an address / coordinates
+ADDRESS_FIELDS = ('address', 'detailed_address', 'address_fields')
+
+
+def cache_key(url):
+    """Locally normalized link, so percent-encoding and underscores do not matter"""
+    return normalize_link(url)
+
+
+def load_manual(manual_file=MANUAL_FILE):
+    """{cache key: entry} of the hand-checked churches in manual_file"""
+    if not manual_file or not os.path.exists(manual_file):
+        return {}
+    with open(manual_file, 'r', encoding='utf-8') as f:
+        return {cache_key(church['wikipedia_link']): church for church in json.load(f)
+                if church.get('manual_verification') and church.get('wikipedia_link')}
+
+
+def merge_manual(churches, manual):
+    """Copy the hand-checked fields to the churches that lack them; returns the number of churches changed"""
+    merged = 0
+    for church in churches:
+        entry = manual.get(cache_key(church['wikipedia_link'])) if church.get('wikipedia_link') else None
+        if not entry:
+            continue
+        fields = []
+        if entry.get('address') and not church.get('address'):
+            fields += [key for key in ADDRESS_FIELDS if key in entry]
+        if entry.get('coordinates') and not church.get('coordinates'):
+            fields.append('coordinates')
+        for key in fields:
+            church[key] = entry[key]
+        church['manual_verification'] = entry['manual_verification']
+        merged += bool(fields)
+    return merged
+
+
+class NegativeCache:
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl_days=DEFAULT_TTL_DAYS, manual_file=MANUAL_FILE):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.entries = {}
+        self.manual = {}
+        self.stats = {"skipped": 0, "manual": 0, "expired": 0, "revised": 0, "recorded": 0, "cleared": 0}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                logger.warning("Ignoring unreadable negative cache %s", path)
+        for key, church in load_manual(manual_file).items():
+            if church['manual_verification'] in TERMINAL_VERIFICATIONS:
+                self.manual[key] = church['manual_verification']
+
+    def needs_revision(self, url):
+        """Whether the page's current revision is needed to decide on it"""
+        return cache_key(url) in self.entries
+
+    def skip(self, url, revid=None, now=None):
+        """True if the page is known to give no data; expired or revised entries are dropped"""
+        key = cache_key(url)
+        if key in self.manual:
+            self.stats["manual"] += 1
+            self.stats["skipped"] += 1
+            return True
+        entry = self.entries.get(key)
+        if not entry:
+            return False
+        now = now or time.time()
+        if now >= entry["recorded"] + self.ttl:
+            self.stats["expired"] += 1
+            del self.entries[key]
+            return False
+        if revid is not None and entry.get("revid") is not None and revid != entry["revid"]:
+            self.stats["revised"] += 1
+            del self.entries[key]
+            return False
+        self.stats["skipped"] += 1
+        return True
+
+    def record(self, url, revid=None):
+        """Remember that the page gave no data at this revision"""
+        self.entries[cache_key(url)] = {"recorded": time.time(), "revid": revid}
+        self.stats["recorded"] += 1
+
+    def clear(self, url):
+        if self.entries.pop(cache_key(url), None) is not None:
+            self.stats["cleared"] += 1
+
+    def save(self):
+        if not self.path:
+            return
+        # Drop expired entries while writing
+        cutoff = time.time() - self.ttl
+        self.entries = {key: entry for key, entry in self.entries.items() if entry["recorded"] > cutoff}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -0,0 +1,107 @@
+# Streamed article fetch that stops reading once the coordinate sources have been seen.
+# Byte-level detectors run over the page as it arrives: a complete coordinatespan element (what
+# extraction methods 1 and 2 read) ends the read at once, and the end of the infobox ends it when
+# the <head> already carries coordinates (wgCoordinates or geo.position). Pages without either are
+# read to the end, since a coordinate span or geo microformat may still follow further down.
+# The bytes reported are those that came over the wire, i.e. still gzip-compressed when the server
+# compressed the page.
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.http_transport import Http2Response
+from utils.request_controller import get_controller
+
+CHUNK_SIZE = 16 * 1024
+
+COORDINATESPAN = re.compile(rb'<span\b[^>]*\bid="coordinatespan"')
+INFOBOX = re.compile(rb'<table\b[^>]*\bclass="[^"]*\binfobox\b')
+HEAD_COORDINATES = re.compile(rb'"wgCoordinates"\s*:\s*\{|<meta\b[^>]*\bname="geo\.position"')
+HEAD_END = re.compile(rb'</head\s*>', re.IGNORECASE)
+TAGS = {tag: re.compile(rb'<(/?)' + tag + rb'\b[^>]*>') for tag in (b'span', b'table')}
+# Markers are searched again this far back, in case one was split between chunks
+OVERLAP = 256
+
+
+def element_end(data, start, tag):
+    """Offset just past the element opened at start, or None if it is not complete yet"""
+    depth = 0
+    for match in TAGS[tag].finditer(data, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return None
+
+
+def wire_bytes(response):
+    """Body bytes read off the connection so far, before any Content-Encoding is undone"""
+    if isinstance(response, Http2Response):
+        return response.response.num_bytes_downloaded
+    return response.raw.tell()
+
+
+class EarlyStop:
+    """Decides, as chunks arrive, whether the rest of the page is needed"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.scanned = 0
+        self.head_end = None
+        self.head_coordinates = False
+        self.coordinatespan = None
+        self.infobox = None
+        # Where the content can be cut once a detector has fired
+        self.end = None
+
+    def feed(self, chunk):
+        """Add a chunk; returns the reason to stop reading, or None"""
+        data = self.data
+        data.extend(chunk)
+        start = max(0, self.scanned - OVERLAP)
+        self.scanned = len(data)
+
+        if self.head_end is None:
+            match = HEAD_END.search(data, start)
+            if match:
+                self.head_end = match.end()
+            if HEAD_COORDINATES.search(data, start, self.head_end or len(data)):
+                self.head_coordinates = True
+        if self.coordinatespan is None:
+            match = COORDINATESPAN.search(data, start)
+            self.coordinatespan = match.start() if match else None
+        if self.infobox is None:
+            match = INFOBOX.search(data, start)
+            self.infobox = match.start() if match else None
+
+        if self.coordinatespan is not None:
+            self.end = element_end(data, self.coordinatespan, b'span')
+            if self.end:
+                return "coordinatespan"
+        if self.head_coordinates and self.infobox is not None:
+            self.end = element_end(data, self.infobox, b'table')
+            if self.end:
+                return "infobox"
+        return None
+
+
+def fetch_until_located(url, headers=None, chunk_size=CHUNK_SIZE):
+    """
+    GET an article and read it only as far as the coordinate sources go.
+    Returns (content, stopped, received): stopped is the detector that ended the read early (None
+    if the whole page was read), received the bytes read off the wire (compressed, if the page was).
+    Raises requests.RequestException like a plain get.
+    """
+    response = get_controller().get(url, headers=headers, stream=True)
+    try:
+        response.raise_for_status()
+        detector = EarlyStop()
+        for chunk in response.iter_content(chunk_size):
+            stopped = detector.feed(chunk)
+            if stopped:
+                # Cut at a tag boundary, so no multi-byte character is left half-read
+                return bytes(detector.data[:detector.end]), stopped, wire_bytes(response)
+        return bytes(detector.data), None, wire_bytes(response)
+    finally:
+        # Closing an unread response drops the connection instead of downloading the rest
+        response.close()
@@ -0,0 +1,354 @@
+# Per-stage profiling for the entry points (--profile). Two modes:
+# - 'sample' (default): a background thread reads the stack of every thread about 100 times a
+#   second and counts them as collapsed stacks, attributed to the stage running at the time. It
+#   measures its own cost and samples less often whenever that would exceed the overhead budget
+#   (1% of the run by default), so it can stay on in production runs. Wall-clock: network waits
+#   show up as time in socket reads, worker threads as their own root frame.
+# - 'cprofile': the deterministic cProfile, one profile per stage and thread. It sees every call but
+#   slows Python-heavy code down severalfold, and only covers threads while they are inside a stage,
+#   so worker threads enter one themselves (pipeline stages, the extractor's fetch workers).
+# Stages are entered with stage(name), which does nothing while no profiler runs; StageMemory
+# stages are profiled too. The files go to output/profiles/<entry point>-<timestamp>/: per stage
+# a .collapsed flame-graph file (flamegraph.pl, speedscope, inferno) or a .prof file (snakeviz,
+# pstats) and a .txt summary of the hottest functions.
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_OUTPUT_DIR = 'output/profiles'
+DEFAULT_INTERVAL = 0.01
+MAX_INTERVAL = 1.0
+DEFAULT_OVERHEAD_BUDGET = 0.01
+# Stack of code outside any stage
+ROOT_STAGE = 'main'
+TOP_FUNCTIONS = 25
+# Frames every thread starts with, left out of the stacks
+BOOTSTRAP_FRAMES = {'threading.py:_bootstrap', 'threading.py:_bootstrap_inner', 'threading.py:run'}
+# Innermost frames of a thread blocked waiting for work (pool workers, the log listener)
+IDLE_FRAMES = {'threading.py:wait', 'queue.py:get', 'thread.py:_worker', 'handlers.py:dequeue'}
+
+_active = None
+
+
+def frame_label(code):
+    """'file.py:function' of a code object; without line numbers so versions can be compared"""
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def thread_group(thread):
+    """Name of a thread without its numbers, so a pool shows as one root frame"""
+    return re.sub(r'[-_]\d+', '', thread.name) if thread else 'Thread'
+
+
+class SamplingProfiler:
+    """
+    Collapsed wall-clock stacks of all threads per stage. The interval between samples is
+    stretched to keep the mean cost of a sample under overhead_budget of the interval.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, overhead_budget=DEFAULT_OVERHEAD_BUDGET):
+        self.min_interval = self.interval = interval
+        self.overhead_budget = overhead_budget
+        self.labels = {}
+        self.stacks = defaultdict(Counter)
+        # Stage of each thread inside one; other threads count towards the main thread's stage
+        self.thread_stage = {}
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.started = None
+        self.elapsed = 0.0
+        self.main_ident = threading.main_thread().ident
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+
+    def enter(self, ident, name, outer):
+        self.thread_stage[ident] = name
+
+    def leave(self, ident, name, outer):
+        if outer:
+            self.thread_stage[ident] = outer
+        else:
+            self.thread_stage.pop(ident, None)
+
+    def label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            label = self.labels[code] = frame_label(code)
+        return label
+
+    def sample(self):
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        default = self.thread_stage.get(self.main_ident, ROOT_STAGE)
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self.label(frame.f_code))
+                frame = frame.f_back
+            if ident != self.main_ident and labels[0] in IDLE_FRAMES:
+                continue
+            labels = [label for label in labels if label not in BOOTSTRAP_FRAMES]
+            labels.append(thread_group(threads.get(ident)))
+            self.stacks[self.thread_stage.get(ident, default)][';'.join(reversed(labels))] += 1
+        self.samples += 1
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            start = time.perf_counter()
+            self.sample()
+            self.sampling_time += time.perf_counter() - start
+            cost = self.sampling_time / self.samples
+            self.interval = min(max(self.min_interval, cost / self.overhead_budget), MAX_INTERVAL)
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def overhead(self):
+        return self.sampling_time / self.elapsed if self.elapsed else 0.0
+
+    def write(self, directory):
+        """Write <stage>.collapsed and <stage>.txt per stage and all.collapsed; returns the paths"""
+        paths = []
+        combined = Counter()
+        for name, stacks in self.stacks.items():
+            path = os.path.join(directory, f"{name}.collapsed")
+            write_collapsed(stacks, path)
+            paths.append(path)
+            with open(os.path.join(directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+                f.write(top_frames(stacks))
+            for stack, count in stacks.items():
+                combined[f"{name};{stack}"] += count
+        if combined:
+            path = os.path.join(directory, "all.collapsed")
+            write_collapsed(combined, path)
+            paths.append(path)
+        return paths
+
+    def summary(self):
+        lines = [f"{self.samples} samples over {self.elapsed:.1f}s, final interval {self.interval * 1000:.0f} ms, "
+                 f"sampling overhead {self.overhead():.2%} (budget {self.overhead_budget:.0%})"]
+        for name, stacks in self.stacks.items():
+            total = sum(stacks.values())
+            (leaf, count), = top_leaves(stacks, 1)
+            lines.append(f"- {name}: {total} thread samples, hottest {leaf} ({count / total:.0%})")
+        return lines
+
+
+class DeterministicProfiler:
+    """
+    cProfile per stage and thread, merged per stage when written. A nested stage pauses the
+    profile of the stage around it, so each function is counted in the innermost stage only.
+    """
+
+    def __init__(self):
+        self.profiles = defaultdict(list)
+        # One profile per (thread, stage), reused each time the thread enters the stage again
+        self.thread_profiles = {}
+        self.running = defaultdict(list)
+        self.times = Counter()
+        self.started = None
+        self.elapsed = 0.0
+        self.main_ident = threading.main_thread().ident
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.enter(self.main_ident, ROOT_STAGE, None)
+
+    def pause(self, ident):
+        name, profile, since = self.running[ident][-1]
+        profile.disable()
+        self.times[name] += time.perf_counter() - since
+
+    def resume(self, ident):
+        name, profile, _ = self.running[ident][-1]
+        self.running[ident][-1] = (name, profile, time.perf_counter())
+        profile.enable()
+
+    def enter(self, ident, name, outer):
+        if self.running[ident]:
+            self.pause(ident)
+        profile = self.thread_profiles.get((ident, name))
+        if profile is None:
+            profile = self.thread_profiles[(ident, name)] = cProfile.Profile()
+            self.profiles[name].append(profile)
+        self.running[ident].append((name, profile, time.perf_counter()))
+        profile.enable()
+
+    def leave(self, ident, name, outer):
+        self.pause(ident)
+        self.running[ident].pop()
+        if self.running[ident]:
+            self.resume(ident)
+
+    def stop(self):
+        while self.running[self.main_ident]:
+            self.leave(self.main_ident, None, None)
+        self.elapsed = time.perf_counter() - self.started
+
+    def write(self, directory):
+        """Write <stage>.prof and <stage>.txt per stage; returns the paths"""
+        paths = []
+        for name, profiles in self.profiles.items():
+            for profile in profiles:
+                profile.create_stats()
+            # pstats refuses profiles that saw no calls
+            profiles = [profile for profile in profiles if profile.stats]
+            if not profiles:
+                continue
+            stats = pstats.Stats(*profiles, stream=io.StringIO())
+            path = os.path.join(directory, f"{name}.prof")
+            stats.dump_stats(path)
+            paths.append(path)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            with open(os.path.join(directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+                f.write(stats.stream.getvalue())
+        return paths
+
+    def summary(self):
+        lines = [f"cProfile over {self.elapsed:.1f}s"]
+        for name, seconds in self.times.items():
+            lines.append(f"- {name}: {seconds:.2f}s in the stage")
+        return lines
+
+
+def write_collapsed(stacks, path):
+    """One 'frame;frame;frame count' line per distinct stack, as flamegraph.pl reads them"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def top_leaves(stacks, n):
+    """[(frame, samples)] of the frames most often at the top of the stack"""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(';', 1)[-1]] += count
+    return leaves.most_common(n)
+
+
+def top_frames(stacks, n=TOP_FUNCTIONS):
+    """Text table of the frames with the most self and total samples"""
+    total = sum(stacks.values())
+    inclusive = Counter()
+    for stack, count in stacks.items():
+        for frame in set(stack.split(';')):
+            inclusive[frame] += count
+    self_samples = dict(top_leaves(stacks, len(inclusive)))
+    lines = [f"{total} thread samples\n", f"{'self':>7} {'total':>7}  frame"]
+    for frame, count in inclusive.most_common(n):
+        lines.append(f"{self_samples.get(frame, 0) / total:>7.1%} {count / total:>7.1%}  {frame}")
+    return '\n'.join(lines) + '\n'
+
+
+class Profiler:
+    """A sampling or cProfile run of one entry point and the directory its files go to"""
+
+    def __init__(self, mode, name, output_dir=DEFAULT_OUTPUT_DIR, **options):
+        if mode not in ('sample', 'cprofile'):
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        self.mode = mode
+        self.directory = os.path.join(output_dir, f"{name}-{datetime.now():%Y%m%d-%H%M%S}")
+        self.backend = SamplingProfiler(**options) if mode == 'sample' else DeterministicProfiler()
+        self.lock = threading.Lock()
+        # Stage names entered by each thread, outermost first
+        self.paths = {}
+
+    def start(self):
+        self.backend.start()
+
+    @contextmanager
+    def stage(self, name):
+        ident = threading.get_ident()
+        with self.lock:
+            path = self.paths.setdefault(ident, [])
+            outer = '.'.join(path)
+            path.append(name)
+            full = '.'.join(path)
+            self.backend.enter(ident, full, outer)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.backend.leave(ident, full, outer)
+                path.pop()
+                if not path:
+                    del self.paths[ident]
+
+    def stop(self):
+        self.backend.stop()
+        # Two runs of an entry point within the same second get their own directories
+        directory, n = self.directory, 1
+        while os.path.exists(self.directory):
+            n += 1
+            self.directory = f"{directory}-{n}"
+        os.makedirs(self.directory)
+        paths = self.backend.write(self.directory)
+        print(f"\nProfile ({self.mode}) written to {self.directory} ({len(paths)} files):")
+        for line in self.backend.summary():
+            print(line)
+        return paths
+
+
+def start_profiling(mode, name, output_dir=DEFAULT_OUTPUT_DIR, **options):
+    """Start profiling the current run; returns the Profiler, or None when mode is None"""
+    global _active
+    if not mode:
+        return None
+    stop_profiling()
+    _active = Profiler(mode, name, output_dir or DEFAULT_OUTPUT_DIR, **options)
+    _active.start()
+    return _active
+
+
+def stop_profiling():
+    """Stop the running profiler and write its files"""
+    global _active
+    profiler, _active = _active, None
+    return profiler.stop() if profiler else []
+
+
+@contextmanager
+def stage(name):
+    """Attribute the time spent in the block to the stage name; a no-op without --profile"""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
+
+
+@contextmanager
+def profiling(mode, name, output_dir=DEFAULT_OUTPUT_DIR, **options):
+    """Profile the block as one run of the entry point name"""
+    start_profiling(mode, name, output_dir, **options)
+    try:
+        yield
+    finally:
+        stop_profiling()
+
+
+def add_profiling_arguments(parser):
+    parser.add_argument('--profile', nargs='?', const='sample', choices=['sample', 'cprofile'],
+                        help="Profile the run per stage: 'sample' (default, low overhead) or 'cprofile'")
+    parser.add_argument('--profile-dir', default=DEFAULT_OUTPUT_DIR,
+                        help="Directory for the profile files (default: %(default)s)")
+
+
+def profiling_from_args(args, name):
+    return profiling(args.profile, name, args.profile_dir)
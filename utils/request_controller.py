@@ -0,0 +1,282 @@
+# Shared request controller for every HTTP client in the project.
+# Adapts the request rate and concurrency per host (additive increase, multiplicative
+# decrease), honors Retry-After, retries with jittered backoff and opens a circuit
+# for hosts that keep failing. Requests go out through the pooled sessions of
+# utils/http_transport.py.
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from utils.http_transport import get_transport
+from utils.logging_setup import get_logger
+
+logger = get_logger('requests')
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised when a host's circuit is open and requests to it are refused"""
+
+
+class HostState:
+    """Rate, concurrency and failure bookkeeping for a single host"""
+
+    def __init__(self, rate, concurrency, max_rate, max_concurrency):
+        self.cond = threading.Condition()
+        self.rate = rate                    # requests per second
+        self.concurrency = concurrency      # allowed requests in flight (float, floored when used)
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.next_allowed = 0.0             # monotonic time when the next request may start
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0.0
+        self.half_open_probe = False
+        self.latency = None                 # moving average of successful request latency
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0, "circuit_opened": 0}
+
+
+class RequestController:
+    """
+    Paces and retries HTTP requests. One controller is shared by all fetchers
+    (see get_controller) so that parallel stages hitting the same host
+    share one budget.
+    """
+
+    def __init__(self, initial_rate=2.0, max_rate=20.0, min_rate=0.05,
+                 initial_concurrency=2, max_concurrency=8,
+                 rate_increase=0.5, decrease_factor=0.5, latency_target=2.0,
+                 max_retries=4, backoff_base=1.0, backoff_max=60.0,
+                 failure_threshold=5, circuit_cooldown=60.0, send=None):
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.rate_increase = rate_increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.circuit_cooldown = circuit_cooldown
+        # None sends through the shared transport, looked up per request so that
+        # configure_transport() also applies to an existing controller
+        self.send = send
+        self.hosts = {}
+        self.host_limits = {}
+        self.lock = threading.Lock()
+
+    def set_host_limit(self, host, max_rate=None, max_concurrency=None):
+        """Cap the rate or concurrency for a host, e.g. Nominatim's 1 request/second policy"""
+        self.host_limits[host] = (max_rate, max_concurrency)
+        with self.lock:
+            self.hosts.pop(host, None)
+
+    def host_state(self, host):
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None:
+                max_rate, max_concurrency = self.host_limits.get(host, (None, None))
+                max_rate = max_rate or self.max_rate
+                max_concurrency = max_concurrency or self.max_concurrency
+                state = HostState(
+                    min(self.initial_rate, max_rate),
+                    min(self.initial_concurrency, max_concurrency),
+                    max_rate, max_concurrency
+                )
+                self.hosts[host] = state
+            return state
+
+    def acquire(self, host, state):
+        """Wait for a free concurrency slot and the next rate-limited start time"""
+        probing = False
+        with state.cond:
+            while True:
+                now = time.monotonic()
+
+                if state.circuit_open_until and not probing:
+                    if now < state.circuit_open_until:
+                        raise CircuitOpenError(
+                            f"Circuit open for {host} for another {state.circuit_open_until - now:.0f}s")
+                    # Cooldown over: let a single probe request through
+                    if state.half_open_probe or state.in_flight:
+                        state.cond.wait(0.5)
+                        continue
+                    state.half_open_probe = True
+                    probing = True
+
+                if state.in_flight >= max(1, int(state.concurrency)):
+                    state.cond.wait()
+                    continue
+
+                if now < state.next_allowed:
+                    state.cond.wait(state.next_allowed - now)
+                    continue
+
+                state.next_allowed = max(now, state.next_allowed) + 1.0 / state.rate
+                state.in_flight += 1
+                state.stats["requests"] += 1
+                return
+
+    def release(self, state):
+        with state.cond:
+            state.in_flight -= 1
+            state.cond.notify_all()
+
+    def on_success(self, state, latency):
+        """Additive increase, unless latency is already above the target"""
+        with state.cond:
+            state.consecutive_failures = 0
+            state.circuit_open_until = 0.0
+            state.half_open_probe = False
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+
+            if state.latency > self.latency_target:
+                self.decrease(state, factor=0.9)
+            else:
+                state.rate = min(state.max_rate, state.rate + self.rate_increase / max(state.rate, 1.0))
+                state.concurrency = min(state.max_concurrency, state.concurrency + 1.0 / state.concurrency)
+            state.cond.notify_all()
+
+    def on_failure(self, host, state, throttled, retry_after=None):
+        """Multiplicative decrease, and open the circuit after too many failures in a row"""
+        with state.cond:
+            self.decrease(state)
+            now = time.monotonic()
+            if retry_after:
+                state.next_allowed = max(state.next_allowed, now + retry_after)
+            if throttled:
+                state.stats["throttled"] += 1
+            else:
+                state.stats["errors"] += 1
+
+            state.consecutive_failures += 1
+            if state.half_open_probe or state.consecutive_failures >= self.failure_threshold:
+                cooldown = max(self.circuit_cooldown, retry_after or 0)
+                state.circuit_open_until = now + cooldown
+                state.half_open_probe = False
+                state.stats["circuit_opened"] += 1
+                logger.warning("Opening circuit for %s for %.0fs after %d failures", host, cooldown,
+                               state.consecutive_failures, extra={"host": host})
+            state.cond.notify_all()
+
+    def decrease(self, state, factor=None):
+        factor = factor or self.decrease_factor
+        state.rate = max(self.min_rate, state.rate * factor)
+        state.concurrency = max(1.0, state.concurrency * factor)
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the controller.
+
+        Retries throttled (429), 5xx and connection errors; other errors count
+        as failures and are raised at once. Returns the final response, which
+        may still be an error response once retries are exhausted, so callers
+        keep using raise_for_status(). Raises CircuitOpenError if the host's
+        circuit is open.
+        """
+        host = urlparse(url).netloc
+        state = self.host_state(host)
+
+        for attempt in range(self.max_retries + 1):
+            self.acquire(host, state)
+            start = time.monotonic()
+            try:
+                try:
+                    response = (self.send or get_transport().request)(method, url, **kwargs)
+                finally:
+                    # Whatever happened, the slot is free again
+                    self.release(state)
+            except (requests.ConnectionError, requests.Timeout):
+                self.on_failure(host, state, throttled=False)
+                if attempt == self.max_retries:
+                    raise
+                state.stats["retries"] += 1
+                time.sleep(self.backoff(attempt))
+                continue
+            except Exception:
+                # Not retried (redirect loop, invalid URL, broken body...), but still a failed request,
+                # so a half-open probe does not stay outstanding
+                self.on_failure(host, state, throttled=False)
+                raise
+
+            latency = time.monotonic() - start
+
+            if response.status_code not in RETRY_STATUSES:
+                self.on_success(state, latency)
+                return response
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.on_failure(host, state, response.status_code in THROTTLE_STATUSES, retry_after)
+            if attempt == self.max_retries:
+                return response
+            state.stats["retries"] += 1
+            # The Retry-After wait is enforced by acquire() through next_allowed
+            if not retry_after:
+                time.sleep(self.backoff(attempt))
+
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def stats(self):
+        """Current rate, concurrency and counters for each host"""
+        return {
+            host: dict(state.stats, rate=round(state.rate, 2), concurrency=round(state.concurrency, 2))
+            for host, state in self.hosts.items()
+        }
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def new_controller(**kwargs):
+    controller = RequestController(**kwargs)
+    # Nominatim's usage policy allows at most one request per second
+    controller.set_host_limit('nominatim.openstreetmap.org', max_rate=1.0, max_concurrency=1)
+    return controller
+
+
+def configure_controller(**kwargs):
+    """Replace the shared controller, e.g. with higher limits for a local stand-in server"""
+    global _controller
+    with _controller_lock:
+        _controller = new_controller(**kwargs)
+        return _controller
+
+
+def get_controller():
+    """The process-wide controller shared by all fetchers"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = new_controller()
+        return _controller
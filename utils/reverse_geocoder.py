@@ -0,0 +1,182 @@
+# Offline reverse geocoder that assigns a municipality and region to each church coordinate
+# from a local boundary GeoJSON file (e.g. Statistics Finland's municipality boundaries).
+# Points are matched through a uniform grid index with a bounding box prefilter, so each
+# point is only tested against the few polygons whose boxes cover it.
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.exporters import load_churches, export_all
+from utils.geo_validation import PolygonIndex, polygon_rings, coordinate_arrays
+
+DEFAULT_MUNICIPALITY_FILE = 'data/municipalities.geojson'
+
+# Property names tried in order when reading the boundary file
+MUNICIPALITY_KEYS = ['municipality', 'kunta', 'nimi', 'namefin', 'name']
+REGION_KEYS = ['region', 'maakunta', 'maakunta_nimi', 'region_name']
+
+
+def first_property(properties, keys):
+    for key in keys:
+        if properties.get(key):
+            return properties[key]
+    return None
+
+
+class MunicipalityIndex:
+    """Uniform grid of polygon bounding boxes for point-in-polygon lookups"""
+
+    def __init__(self, features, cell_size=0.25, municipality_keys=MUNICIPALITY_KEYS, region_keys=REGION_KEYS):
+        self.names = []
+        self.regions = []
+        self.polygons = []
+        boxes = []
+        for feature in features:
+            rings = polygon_rings(feature['geometry'])
+            if not rings:
+                continue
+            properties = feature.get('properties') or {}
+            self.names.append(first_property(properties, municipality_keys))
+            self.regions.append(first_property(properties, region_keys))
+            # Roughly a handful of edges per latitude band
+            edge_count = sum(len(ring) for ring in rings)
+            self.polygons.append(PolygonIndex(rings, bands=max(1, min(256, edge_count // 8))))
+            points = np.vstack(rings)
+            boxes.append([points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()])
+
+        self.boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.cell_size = cell_size
+        if not len(self.boxes):
+            self.origin = (0.0, 0.0)
+            self.shape = (1, 1)
+            self.cell_offsets = np.zeros(2, dtype=int)
+            self.cell_polygons = np.empty(0, dtype=int)
+            return
+
+        self.origin = (self.boxes[:, 0].min(), self.boxes[:, 1].min())
+        cols = int(np.ceil((self.boxes[:, 2].max() - self.origin[0]) / cell_size)) + 1
+        rows = int(np.ceil((self.boxes[:, 3].max() - self.origin[1]) / cell_size)) + 1
+        self.shape = (rows, cols)
+
+        # Register each polygon in every grid cell its bounding box touches
+        cells = [[] for _ in range(rows * cols)]
+        for i, (x_min, y_min, x_max, y_max) in enumerate(self.boxes):
+            c0, r0 = self.cell_of(x_min, y_min)
+            c1, r1 = self.cell_of(x_max, y_max)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    cells[r * cols + c].append(i)
+        self.cell_offsets = np.concatenate([[0], np.cumsum([len(cell) for cell in cells])]).astype(int)
+        self.cell_polygons = np.asarray([i for cell in cells for i in cell], dtype=int)
+
+    @classmethod
+    def from_file(cls, boundary_file, **kwargs):
+        with open(boundary_file, 'r', encoding='utf-8') as f:
+            collection = json.load(f)
+        return cls(collection['features'], **kwargs)
+
+    def cell_of(self, lon, lat):
+        return (int((lon - self.origin[0]) // self.cell_size), int((lat - self.origin[1]) // self.cell_size))
+
+    def lookup(self, lat, lon):
+        """Index of the polygon containing each point, -1 where none does"""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        result = np.full(lat.shape, -1, dtype=int)
+        if not len(self.polygons):
+            return result
+
+        rows, cols = self.shape
+        col = np.floor((lon - self.origin[0]) / self.cell_size)
+        row = np.floor((lat - self.origin[1]) / self.cell_size)
+        valid = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+        points = np.nonzero(valid)[0]
+        cell = (row[points] * cols + col[points]).astype(int)
+
+        # Candidate (point, polygon) pairs from the grid cells
+        starts = self.cell_offsets[cell]
+        counts = self.cell_offsets[cell + 1] - starts
+        pair_points = np.repeat(points, counts)
+        pair_slots = np.repeat(starts, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        pair_polygons = self.cell_polygons[pair_slots]
+
+        # Bounding box prefilter
+        boxes = self.boxes[pair_polygons]
+        px = lon[pair_points]
+        py = lat[pair_points]
+        in_box = (px >= boxes[:, 0]) & (px <= boxes[:, 2]) & (py >= boxes[:, 1]) & (py <= boxes[:, 3])
+        pair_points = pair_points[in_box]
+        pair_polygons = pair_polygons[in_box]
+
+        # Exact test, one vectorized call per polygon with candidates
+        order = np.argsort(pair_polygons, kind='stable')
+        pair_points = pair_points[order]
+        pair_polygons = pair_polygons[order]
+        bounds = np.searchsorted(pair_polygons, np.arange(len(self.polygons) + 1))
+        for i in range(len(self.polygons)):
+            candidates = pair_points[bounds[i]:bounds[i + 1]]
+            if not len(candidates):
+                continue
+            # Neighbouring polygons share edges, keep the first match
+            candidates = candidates[result[candidates] == -1]
+            inside = self.polygons[i].contains(lat[candidates], lon[candidates])
+            result[candidates[inside]] = i
+
+        return result
+
+
+class ReverseGeocoder:
+    def __init__(self, boundary_file=DEFAULT_MUNICIPALITY_FILE, **kwargs):
+        self.index = MunicipalityIndex.from_file(boundary_file, **kwargs)
+
+    def enrich(self, churches):
+        """Set 'municipality' and 'region' on every church whose coordinates fall inside a polygon"""
+        lat, lon = coordinate_arrays(churches)
+        matches = self.index.lookup(lat, lon)
+        found = 0
+        for church, match in zip(churches, matches):
+            if match < 0:
+                continue
+            found += 1
+            church['municipality'] = self.index.names[match]
+            if self.index.regions[match]:
+                church['region'] = self.index.regions[match]
+        return found
+
+
+def enrich_file(input_file, output_file, boundary_file=DEFAULT_MUNICIPALITY_FILE):
+    """
+    Add municipality and region fields to the churches in input_file.
+    Without a boundary file the churches are copied through unchanged.
+    """
+    churches = load_churches(input_file)
+
+    if os.path.exists(boundary_file):
+        found = ReverseGeocoder(boundary_file).enrich(churches)
+        print(f"Assigned a municipality to {found}/{len(churches)} churches")
+    else:
+        print(f"Warning: boundary file {boundary_file} not found, skipping municipality lookup")
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(churches, f, ensure_ascii=False, indent=4)
+    export_all(churches, output_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign municipality and region to church coordinates")
+    parser.add_argument('input', nargs='?', default='output/churches_with_coordinates_updated_from_addresses.json')
+    parser.add_argument('output', nargs='?', default='output/churches_with_municipalities.json')
+    parser.add_argument('--boundaries', default=DEFAULT_MUNICIPALITY_FILE,
+                        help="GeoJSON file with one (Multi)Polygon feature per municipality")
+    args = parser.parse_args()
+
+    enrich_file(args.input, args.output, args.boundaries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Yield-prioritized ordering of the pages to extract, and the time/request budget of a run.
+# Every extraction attempt is recorded on the church ('extraction': attempts, last attempt,
+# outcome and the page revision seen), so a later run can start with the pages most likely to
+# give new data: never attempted, then revised (or failed) since the last attempt, then pages that
+# only gave an undetailed address, then the rest.
+import os
+import sys
+import time
+from collections import defaultdict
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.canonicalize import wiki_base
+from utils.helpers import title_from_link
+from utils.logging_setup import get_logger
+from utils.mediawiki import MediaWikiClient
+
+logger = get_logger('scheduler')
+
+TIERS = ["never attempted", "revised or failed", "undetailed address", "attempted before"]
+
+
+class Budget:
+    """Wall-clock and page-request limits of a run; None means unlimited"""
+
+    def __init__(self, time_budget=None, max_requests=None):
+        self.start = time.monotonic()
+        self.deadline = self.start + time_budget if time_budget else None
+        self.max_requests = max_requests
+        self.requests = 0
+        self.exhausted = None
+
+    @property
+    def limited(self):
+        return self.deadline is not None or self.max_requests is not None
+
+    @property
+    def remaining(self):
+        """Page requests left, or None without a request limit"""
+        return None if self.max_requests is None else max(0, self.max_requests - self.requests)
+
+    def used_up(self):
+        """True once the budget is used up, without claiming a request"""
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            self.exhausted = f"{self.max_requests} requests"
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.exhausted = f"{self.deadline - self.start:.0f}s"
+            return True
+        return False
+
+    def take(self):
+        """Claim one page request; False once the budget is used up"""
+        if self.used_up():
+            return False
+        self.requests += 1
+        return True
+
+
+def page_revisions(urls, api_url=None):
+    """{page url: current revision id} through the API, 50 titles per request"""
+    titles_by_base = defaultdict(dict)
+    for url in urls:
+        titles_by_base[wiki_base(url)][url] = title_from_link(url)
+
+    revisions = {}
+    for base, titles in titles_by_base.items():
+        client = MediaWikiClient(api_url or f"{base}/w/api.php")
+        try:
+            pages = client.query_titles(titles.values(), {'prop': 'revisions', 'rvprop': 'ids|timestamp'})
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Could not fetch page revisions through %s: %s", client.api_url, e)
+            continue
+        for url, title in titles.items():
+            page = pages.get(title)
+            if page and page.get('revisions'):
+                revisions[url] = page['revisions'][0]['revid']
+    return revisions
+
+
+def record_attempt(church, outcome, revid=None):
+    previous = church.get('extraction') or {}
+    church['extraction'] = {
+        "attempts": previous.get("attempts", 0) + 1,
+        "last_attempt": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "outcome": outcome,
+        "revid": revid or previous.get("revid")
+    }
+
+
+def tier(records, revid):
+    """Priority tier (index into TIERS) of a page from its churches' extraction records"""
+    if any(record is None for record in records):
+        return 0
+    if any(record.get("outcome") == "error" for record in records):
+        return 1
+    if revid is not None and any(record.get("revid") not in (None, revid) for record in records):
+        return 1
+    if any(record.get("outcome") == "address" for record in records):
+        return 2
+    return 3
+
+
+def prioritize(groups, churches, revisions):
+    """
+    Page urls of groups ({url: [church indexes]}) in priority order, and the number of pages per tier.
+    Within a tier, pages attempted fewer times and longer ago come first.
+    """
+    keyed = []
+    counts = [0] * len(TIERS)
+    for position, (url, indexes) in enumerate(groups.items()):
+        records = [churches[i].get('extraction') for i in indexes]
+        page_tier = tier(records, revisions.get(url))
+        counts[page_tier] += 1
+        known = [record for record in records if record]
+        attempts = max((record.get("attempts", 0) for record in known), default=0)
+        last = min((record.get("last_attempt") or '' for record in known), default='')
+        keyed.append(((page_tier, attempts, last, position), url))
+    keyed.sort()
+    return [url for _, url in keyed], dict(zip(TIERS, counts))
@@ -0,0 +1,214 @@
+# Imports coordinates (P625) and street addresses (P6375, P281) from a local Wikidata JSON dump
+# (latest-all.json.gz / .bz2, one entity per line) for churches that have none on fi.wikipedia.
+# Every line is prefiltered on the raw bytes by its fiwiki sitelink title, so only the lines of our
+# churches are JSON-decoded. An uncompressed dump is split into byte ranges that worker processes
+# scan in parallel; a .gz/.bz2 dump can only be decompressed from the start, so it is scanned
+# serially in this process (decompress it first to use --workers).
+import argparse
+import bz2
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.helpers import normalize_title, title_from_link
+from utils.exporters import load_churches, export_all
+
+FIWIKI_TITLE_RE = re.compile(rb'"fiwiki"\s*:\s*\{\s*"site"\s*:\s*"fiwiki"\s*,\s*"title"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+def open_dump(dump_path):
+    if dump_path.endswith('.gz'):
+        return gzip.open(dump_path, 'rb')
+    if dump_path.endswith('.bz2'):
+        return bz2.open(dump_path, 'rb')
+    return open(dump_path, 'rb')
+
+
+def candidate_title(line, titles):
+    """The fiwiki title of a raw entity line if it is one of titles, else None"""
+    # Cheap byte-level prefilter before any regex or JSON
+    if b'"fiwiki"' not in line:
+        return None
+    match = FIWIKI_TITLE_RE.search(line)
+    if not match:
+        return None
+    title = normalize_title(json.loads(b'"' + match.group(1) + b'"'))
+    return title if title in titles else None
+
+
+def iter_range(dump_path, start, end):
+    """Raw lines of an uncompressed dump that start at a byte offset in [start, end)"""
+    with open(dump_path, 'rb') as f:
+        if start:
+            # The line running over start belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+def scan_lines(lines, titles):
+    """(number of lines, {title: entity data}) of the entities in lines whose fiwiki title is in titles"""
+    count = 0
+    candidates = []
+    for line in lines:
+        count += 1
+        title = candidate_title(line, titles)
+        if title is not None:
+            candidates.append((title, line))
+    return count, decode_entities(candidates)
+
+
+def scan_range(dump_path, titles, start, end):
+    """scan_lines over one byte range; runs in a worker process"""
+    return scan_lines(iter_range(dump_path, start, end), titles)
+
+
+def claim_values(entity, prop):
+    """Data values of the non-deprecated statements of a property, preferred rank first"""
+    statements = entity.get('claims', {}).get(prop, [])
+    statements = sorted(statements, key=lambda s: s.get('rank') != 'preferred')
+    values = []
+    for statement in statements:
+        if statement.get('rank') == 'deprecated':
+            continue
+        snak = statement.get('mainsnak', {})
+        if snak.get('snaktype') == 'value':
+            values.append(snak['datavalue']['value'])
+    return values
+
+
+def entity_data(entity):
+    """Coordinates and address fields of a Wikidata entity"""
+    data = {"qid": entity['id']}
+
+    for value in claim_values(entity, 'P625'):
+        if value.get('globe', '').endswith('Q2'):
+            data['coordinates'] = (value['latitude'], value['longitude'])
+            break
+
+    for value in claim_values(entity, 'P6375'):
+        data['street_address'] = value.get('text')
+        break
+
+    for value in claim_values(entity, 'P281'):
+        data['postal_code'] = value
+        break
+
+    return data
+
+
+def decode_entities(candidates):
+    """{title: entity data} of a batch of (title, raw line)"""
+    found = {}
+    for title, line in candidates:
+        line = line.strip().rstrip(b',')
+        try:
+            entity = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        found[title] = entity_data(entity)
+    return found
+
+
+def scan_dump(dump_path, titles, workers=None, ranges_per_worker=4):
+    """Scan the whole dump and return {title: entity data}"""
+    workers = workers or os.cpu_count()
+    results = {}
+    start = time.time()
+    lines = 0
+
+    if dump_path.endswith(('.gz', '.bz2')) or workers == 1:
+        with open_dump(dump_path) as f:
+            lines, results = scan_lines(f, titles)
+    else:
+        size = os.path.getsize(dump_path)
+        step = max(1, -(-size // (workers * ranges_per_worker)))
+        offsets = list(range(0, size, step)) + [size]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(scan_range, dump_path, titles, a, b) for a, b in zip(offsets, offsets[1:])]
+            for done, future in enumerate(as_completed(futures), 1):
+                count, found = future.result()
+                lines += count
+                results.update(found)
+                print(f"  {done}/{len(futures)} ranges, {lines} entities scanned, "
+                      f"{lines / (time.time() - start):.0f}/s, {len(results)} matches")
+
+    print(f"Scanned {lines} entities in {time.time() - start:.1f}s, "
+          f"found {len(results)} of {len(titles)} churches")
+    return results
+
+
+def merge_wikidata(churches, results):
+    """
+    Fill in missing coordinates and addresses from Wikidata, recording the
+    entity and property they came from. Existing values are never replaced.
+    """
+    stats = {"coordinates": 0, "addresses": 0}
+    for church in churches:
+        data = results.get(title_from_link(church['wikipedia_link']))
+        if not data:
+            continue
+        church['wikidata_id'] = data['qid']
+
+        coords = church.get('coordinates') or {}
+        if data.get('coordinates') and (coords.get('lat') is None or coords.get('lon') is None):
+            lat, lon = data['coordinates']
+            church['coordinates'] = {
+                "lat": lat,
+                "lon": lon,
+                "format": "decimal",
+                "original": f"wikidata P625: {lat}, {lon}",
+                "method": "wikidata",
+                "source": {"provider": "wikidata", "qid": data['qid'], "property": "P625"}
+            }
+            stats["coordinates"] += 1
+
+        if data.get('street_address') and not church.get('address'):
+            address = data['street_address']
+            if data.get('postal_code') and data['postal_code'] not in address:
+                address = f"{address}, {data['postal_code']}"
+            church['address'] = address
+            church['detailed_address'] = bool(',' in address and re.search(r'\d+', address))
+            church['address_source'] = {"provider": "wikidata", "qid": data['qid'], "property": "P6375"}
+            stats["addresses"] += 1
+
+    return stats
+
+
+def import_wikidata(dump_path, input_file, output_file, workers=None):
+    churches = load_churches(input_file)
+    titles = {title_from_link(church['wikipedia_link']) for church in churches}
+
+    results = scan_dump(dump_path, titles, workers)
+    stats = merge_wikidata(churches, results)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(churches, f, ensure_ascii=False, indent=4)
+    export_all(churches, output_file)
+
+    print(f"Added coordinates to {stats['coordinates']} and addresses to {stats['addresses']} churches")
+    print(f"Results saved to {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import coordinates and addresses from a Wikidata JSON dump")
+    parser.add_argument('dump', help="Wikidata JSON dump (.json, .json.gz or .json.bz2)")
+    parser.add_argument('input', nargs='?', default='output/all_churches_with_coordinates.json')
+    parser.add_argument('output', nargs='?', default=None, help="Defaults to overwriting the input file")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes scanning an uncompressed dump (compressed dumps are scanned serially)")
+    args = parser.parse_args()
+
+    import_wikidata(args.dump, args.input, args.output or args.input, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Small wikitext helpers: template parsing, {{Coord}} conversion, markup stripping
+# and wikitable rows. Used by the dump ingestion and the wikitext address backend.
+import re
+
+LINK_RE = re.compile(r'\[\[([^\[\]|]+)(?:\|([^\[\]]*))?\]\]')
+REF_RE = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', re.DOTALL | re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+FOOTNOTE_RE = re.compile(r'\s*\[\d+\]')
+# Lower-case names of the coordinate templates fi.wikipedia uses
+COORD_TEMPLATES = {'coord', 'koord', 'coordinates'}
+
+
+def find_templates(text, names=None):
+    """
+    Top-level and nested templates in text as (name, positional, named) tuples.
+
+    names is an optional set of lower-case template names to keep. Nested
+    templates are returned after the template that contains them.
+    """
+    results = []
+    stack = []
+    i = 0
+    length = len(text)
+    while i < length - 1:
+        pair = text[i:i + 2]
+        if pair == '{{':
+            stack.append(i + 2)
+            i += 2
+        elif pair == '}}' and stack:
+            start = stack.pop()
+            name, positional, named = parse_template(text[start:i])
+            if names is None or name.lower() in names:
+                results.append((name, positional, named))
+            i += 2
+        else:
+            i += 1
+    # Outer templates close last, return them first
+    results.reverse()
+    return results
+
+
+def split_top_level(body, separator='|'):
+    """Split at separators that are not inside nested templates or links"""
+    parts = []
+    depth = 0
+    current = []
+    i = 0
+    while i < len(body):
+        pair = body[i:i + 2]
+        if pair in ('{{', '[['):
+            depth += 1
+            current.append(pair)
+            i += 2
+            continue
+        if pair in ('}}', ']]') and depth:
+            depth -= 1
+            current.append(pair)
+            i += 2
+            continue
+        if body[i] == separator and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(body[i])
+        i += 1
+    parts.append(''.join(current))
+    return parts
+
+
+def parse_template(body):
+    """Name, positional parameters and named parameters (keys lower-cased) of a template body"""
+    parts = split_top_level(body)
+    name = parts[0].strip()
+    positional = []
+    named = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition('=')
+        # "=" inside a nested template or link does not make a named parameter
+        if sep and '{{' not in key and '[[' not in key:
+            named[key.strip().lower()] = value.strip()
+        else:
+            positional.append(part.strip())
+    return name, positional, named
+
+
+def strip_markup(value):
+    """Plain text of a wikitext value: links, refs, templates, tags and bold/italics removed"""
+    value = COMMENT_RE.sub('', value)
+    value = REF_RE.sub('', value)
+    value = LINK_RE.sub(lambda m: m.group(2) if m.group(2) is not None else m.group(1), value)
+    # Drop remaining templates
+    while True:
+        stripped = re.sub(r'\{\{[^{}]*\}\}', '', value)
+        if stripped == value:
+            break
+        value = stripped
+    value = TAG_RE.sub(' ', value)
+    value = value.replace("'''", '').replace("''", '')
+    return re.sub(r'\s+', ' ', value).strip()
+
+
+def _number(value):
+    return float(value.strip().replace(',', '.'))
+
+
+def coord_from_template(positional):
+    """
+    Decimal (lat, lon) from {{Coord}} positional parameters:
+    {{Coord|60.16|24.95}}, {{Coord|60|9|33.2|N|24|57|15|E}}, {{Coord|60|9|N|24|57|E}}
+    or {{Coord|60.16|N|24.95|E}}. Returns None when the parameters do not parse.
+    """
+    params = [p for p in positional if p and '=' not in p and ':' not in p]
+    directions = [i for i, p in enumerate(params) if p.upper() in ('N', 'S', 'E', 'W')]
+    try:
+        if len(directions) >= 2:
+            lat_end, lon_end = directions[0], directions[1]
+            lat_parts = [_number(p) for p in params[:lat_end]]
+            lon_parts = [_number(p) for p in params[lat_end + 1:lon_end]]
+            lat = sum(v / 60 ** i for i, v in enumerate(lat_parts))
+            lon = sum(v / 60 ** i for i, v in enumerate(lon_parts))
+            if params[lat_end].upper() == 'S':
+                lat = -lat
+            if params[lon_end].upper() == 'W':
+                lon = -lon
+        elif len(params) >= 2:
+            lat, lon = _number(params[0]), _number(params[1])
+        else:
+            return None
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def wikilink(cell):
+    """(target, label) of the first wikilink in a wikitext cell, or None"""
+    match = LINK_RE.search(cell)
+    if not match:
+        return None
+    target = match.group(1).strip()
+    label = match.group(2) if match.group(2) is not None else target
+    return target, strip_markup(label)
+
+
+def wikitable_rows(text):
+    """
+    Data rows of every wikitable in text as lists of raw cell strings.
+    Header cells (lines starting with '!') are skipped.
+    """
+    for table in re.finditer(r'^\{\|[^\n]*wikitable[^\n]*\n(.*?)^\|\}', text, re.DOTALL | re.MULTILINE):
+        for row in re.split(r'^\|-[^\n]*$', table.group(1), flags=re.MULTILINE):
+            cells = []
+            for line in row.split('\n'):
+                if not line.startswith('|') or line.startswith('|+'):
+                    continue
+                for cell in split_top_level(line[1:].replace('||', '\x00'), separator='\x00'):
+                    # Drop cell attributes like 'style="..." | value'
+                    parts = split_top_level(cell)
+                    cells.append(parts[-1].strip() if len(parts) > 1 and '=' in parts[0] else cell.strip())
+            if cells:
+                yield cells
@@ -0,0 +1,172 @@
+# Backend that reads the articles' raw wikitext instead of the rendered HTML.
+# Wikitext for up to 50 articles is fetched per API request from each link's own wiki; the
+# coordinates come from the {{Coord}} template and the infobox is parsed with the small template
+# parser in utils/wikitext.py into street, number, postcode and municipality fields.
+import os
+import re
+import sys
+from collections import defaultdict
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.canonicalize import wiki_base
+from utils.helpers import title_from_link
+from utils.logging_setup import get_logger
+from utils.mediawiki import MediaWikiClient
+from utils.wikitext import COORD_TEMPLATES, coord_from_template, find_templates, strip_markup
+
+logger = get_logger('wikitext')
+
+# Infobox parameters holding the address, most specific first
+ADDRESS_PARAMS = ['osoite', 'katuosoite', 'sijainti']
+POSTCODE_PARAMS = ['postinumero']
+MUNICIPALITY_PARAMS = ['kunta', 'paikkakunta', 'kaupunki']
+
+STREET_RE = re.compile(r'^(?P<street>[^\d,]+?)\s+(?P<number>\d+\s?[a-zA-Z]?(?:\s?[-–]\s?\d+)?)\b')
+POSTCODE_RE = re.compile(r'\b(\d{5})\b')
+
+
+def parse_address(text):
+    """Split an address like 'Puistokatu 1, 00140 Helsinki' into its parts"""
+    fields = {"street": None, "number": None, "postcode": None, "municipality": None}
+    parts = [part.strip() for part in text.split(',') if part.strip()]
+    if not parts:
+        return fields
+
+    match = STREET_RE.match(parts[0])
+    if match:
+        fields["street"] = match.group('street').strip()
+        fields["number"] = match.group('number').replace(' ', '')
+
+    postcode = POSTCODE_RE.search(text)
+    if postcode:
+        fields["postcode"] = postcode.group(1)
+        # The municipality follows the postcode: "00140 Helsinki"
+        after = text[postcode.end():].split(',')[0].strip()
+        if after:
+            fields["municipality"] = after
+    if not fields["municipality"] and len(parts) > 1:
+        fields["municipality"] = POSTCODE_RE.sub('', parts[-1]).strip() or None
+    return fields
+
+
+def infobox_params(wikitext):
+    """Named parameters of the first infobox-like template (the first one with named parameters)"""
+    for name, positional, named in find_templates(wikitext[:30000]):
+        if named and any(key in named for key in ADDRESS_PARAMS):
+            return named
+    return {}
+
+
+def extract_address(wikitext):
+    """
+    Structured address from an article's infobox, or None.
+    Returns a dict with 'address' (display string) and the street/number/postcode/municipality fields.
+    """
+    params = infobox_params(wikitext)
+    if not params:
+        return None
+
+    address = None
+    for key in ADDRESS_PARAMS:
+        value = strip_markup(params.get(key, ''))
+        if value:
+            address = value
+            break
+    if not address:
+        return None
+
+    fields = parse_address(address)
+    for key in POSTCODE_PARAMS:
+        value = strip_markup(params.get(key, ''))
+        if value and not fields["postcode"]:
+            fields["postcode"] = value
+    for key in MUNICIPALITY_PARAMS:
+        value = strip_markup(params.get(key, ''))
+        if value and not fields["municipality"]:
+            fields["municipality"] = value
+
+    # Build the display address from the parts when the parameter only had the street
+    if fields["municipality"] and fields["municipality"] not in address:
+        tail = ' '.join(part for part in (fields["postcode"], fields["municipality"]) if part)
+        address = f"{address}, {tail}"
+
+    return dict(fields, address=address)
+
+
+def is_detailed(fields):
+    """Same idea as the HTML rule (street number and a place): street number and a municipality"""
+    return bool(fields.get("number") and fields.get("municipality"))
+
+
+def extract_coordinates(wikitext):
+    """Coordinates of the first {{Coord}} template in an article, or None"""
+    for name, positional, named in find_templates(wikitext):
+        if name.lower() in COORD_TEMPLATES:
+            coords = coord_from_template(positional)
+            if coords:
+                return {
+                    "lat": coords[0],
+                    "lon": coords[1],
+                    "format": "decimal",
+                    "original": '{{' + '|'.join([name] + positional) + '}}',
+                    "method": "wikitext"
+                }
+    return None
+
+
+def extract_page(wikitext):
+    """The fields the extractor keeps of a page, read from its wikitext instead of its HTML"""
+    fields = extract_address(wikitext)
+    return {
+        "coordinates": extract_coordinates(wikitext),
+        "address": fields["address"] if fields else None,
+        "address_fields": {k: fields[k] for k in ('street', 'number', 'postcode', 'municipality')} if fields else None
+    }
+
+
+def page_content(page):
+    """Wikitext of the main slot of a prop=revisions page, or None"""
+    revisions = (page or {}).get('revisions') or []
+    return revisions[0].get('slots', {}).get('main', {}).get('content') if revisions else None
+
+
+class WikitextAddressBackend:
+    def __init__(self, api_url=None):
+        # None: the API of each link's own wiki, so stand-in servers and other editions keep their host
+        self.api_url = api_url
+        self.stats = {"requests": 0, "bytes": 0}
+
+    def fetch_wikitext(self, links):
+        """
+        {link: wikitext} for the given article links, 50 titles per request.
+        Missing pages and wikis whose API cannot be reached are left out.
+        """
+        titles_by_base = defaultdict(dict)
+        for link in dict.fromkeys(links):
+            titles_by_base[wiki_base(link)][link] = title_from_link(link)
+
+        texts = {}
+        for base, titles in titles_by_base.items():
+            client = MediaWikiClient(self.api_url or f"{base}/w/api.php")
+            try:
+                pages = client.query_titles(titles.values(), {
+                    'prop': 'revisions',
+                    'rvprop': 'content',
+                    'rvslots': 'main'
+                })
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("Could not fetch wikitext through %s: %s", client.api_url, e)
+                pages = {}
+            for key in self.stats:
+                self.stats[key] += client.stats[key]
+            for link, title in titles.items():
+                content = page_content(pages.get(title))
+                if content is not None:
+                    texts[link] = content
+        return texts
+
+    def fetch_pages(self, links):
+        """{link: {'coordinates', 'address', 'address_fields'}} read from the articles' wikitext"""
+        return {link: extract_page(text) for link, text in self.fetch_wikitext(links).items()}
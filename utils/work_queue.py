@@ -0,0 +1,154 @@
+# Durable work queue of article pages to extract, shared by any number of worker processes.
+# Backed by one SQLite file: a coordinator enqueues the pages, workers claim batches under a lease
+# that they keep alive with heartbeats, and commit each result. A lease that is not renewed in time
+# (a crashed or stuck worker) expires and its page goes back to the queue, up to max_attempts tries.
+# Commits are idempotent: the first result committed for a page wins, later ones are ignored.
+# Workers on other machines need the file on a shared filesystem with working locks.
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    url TEXT PRIMARY KEY,
+    want_address INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',   -- pending, leased, done or failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    seq INTEGER                              -- order in which tasks finished
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires);
+CREATE INDEX IF NOT EXISTS tasks_seq ON tasks (seq);
+"""
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path, lease_seconds=60.0, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # One connection per queue object, used from several threads under the lock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def transaction(self, function, *args):
+        """Run function(*args) inside a write transaction"""
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                value = function(*args)
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+            return value
+
+    def next_seq(self):
+        return self.db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks").fetchone()[0]
+
+    def enqueue(self, targets):
+        """Add (url, want_address) targets; pages already queued, done or failed are left as they are"""
+        def insert():
+            before = self.db.total_changes
+            self.db.executemany("INSERT OR IGNORE INTO tasks (url, want_address) VALUES (?, ?)",
+                                ((url, int(want_address)) for url, want_address in targets))
+            return self.db.total_changes - before
+        return self.transaction(insert)
+
+    def requeue_expired(self):
+        """Return pages whose lease has run out to the queue, or fail them after max_attempts"""
+        now = time.time()
+        expired = self.db.execute("SELECT COUNT(*) FROM tasks WHERE state = 'leased' AND lease_expires < ?",
+                                  (now,)).fetchone()[0]
+        if expired:
+            self.db.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "seq = CASE WHEN attempts >= ? THEN ? END, owner = NULL, lease_expires = NULL "
+                "WHERE state = 'leased' AND lease_expires < ?",
+                (self.max_attempts, self.max_attempts, self.next_seq(), now))
+        return expired
+
+    def claim(self, owner, limit):
+        """Lease up to limit pending pages to owner; returns [(url, want_address)]"""
+        def lease():
+            self.requeue_expired()
+            rows = self.db.execute("SELECT url, want_address FROM tasks WHERE state = 'pending' LIMIT ?",
+                                   (limit,)).fetchall()
+            expires = time.time() + self.lease_seconds
+            self.db.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE url = ?", ((owner, expires, url) for url, _ in rows))
+            return [(url, bool(want_address)) for url, want_address in rows]
+        return self.transaction(lease)
+
+    def heartbeat(self, owner):
+        """Extend every lease held by owner"""
+        with self.lock:
+            self.db.execute("UPDATE tasks SET lease_expires = ? WHERE owner = ? AND state = 'leased'",
+                            (time.time() + self.lease_seconds, owner))
+
+    def complete(self, owner, url, result):
+        """Commit a page's result; False if it had already been committed"""
+        def commit():
+            cursor = self.db.execute(
+                "UPDATE tasks SET state = 'done', result = ?, seq = ?, owner = NULL, lease_expires = NULL "
+                "WHERE url = ? AND state NOT IN ('done', 'failed')",
+                (json.dumps(result, ensure_ascii=False), self.next_seq(), url))
+            return cursor.rowcount == 1
+        return self.transaction(commit)
+
+    def fail(self, owner, url):
+        """Give a page back after a failed attempt; it is retried until max_attempts"""
+        def release():
+            self.db.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "seq = CASE WHEN attempts >= ? THEN ? END, owner = NULL, lease_expires = NULL "
+                "WHERE url = ? AND owner = ? AND state = 'leased'",
+                (self.max_attempts, self.max_attempts, self.next_seq(), url, owner))
+        self.transaction(release)
+
+    def withdraw(self, urls):
+        """Take the given pages off the queue unless someone already holds or finished them"""
+        def delete():
+            before = self.db.total_changes
+            self.db.executemany("DELETE FROM tasks WHERE url = ? AND state = 'pending'", ((url,) for url in urls))
+            return self.db.total_changes - before
+        return self.transaction(delete)
+
+    def last_seq(self):
+        """seq of the page finished last so far (0 for none), for finished_since"""
+        with self.lock:
+            return self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM tasks").fetchone()[0]
+
+    def finished_since(self, seq):
+        """[(seq, url, result)] of the pages done or failed after seq; result is None for failed pages"""
+        with self.lock:
+            rows = self.db.execute("SELECT seq, url, result FROM tasks WHERE seq > ? ORDER BY seq",
+                                   (seq,)).fetchall()
+        return [(s, url, json.loads(result) if result is not None else None) for s, url, result in rows]
+
+    def active(self):
+        """Number of pages still pending or leased"""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.db.close()